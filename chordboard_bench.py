@@ -0,0 +1,320 @@
+# chordboard_bench.py
+# 백엔드 벤치마크 (Windows 훅/keyboard 모듈 없이 실행 가능) — 성능 변경의 회귀 기준
+#   py -3 chordboard_bench.py [--suite emit|replay|roll|record|spec|all] [--n 200000] [--chords 1000000]
+#
+# emit   : 기존 emit()의 조회 경로(bstr join → MAP 중첩 dict 2회 → HINT 스캔 → send_value 정규화)
+#          vs 컴파일된 평면 테이블(배열 인덱스 1회 + kind 디스패치)
+#          출력(print/keyboard)은 양쪽 모두 제외하고 조회·정규화 비용만 비교
+# replay : 전 레이어 합성 타이핑 트레이스를 가상 시계로 재생 (chordboard_replay)
+#          events/s, emits/s (실시간 처리량)와 시뮬레이션 지연(release→주입 p50/p95/p99) 보고
+# roll   : 같은 합주열을 "다 떼고 누르기"(일반 모드)와 "겹쳐 누르기"(롤링 모드) 트레이스로 재생
+#          정확도, 트레이스 시간 기준 합주/분, release→주입 지연 비교 + 교차 재생(모드 호환성) 불일치 수
+# record : 세션 녹화(chordboard_record) Recorder.add() ns/레코드, 녹화 켜고/끄고 재생 처리량 차이,
+#          녹화 → 트레이스 내보내기 → 재생 왕복 불일치 수
+# spec   : 같은 트레이스를 잠정 출력 off/on으로 재생 — release→주입 지연, 그대로 확정/되돌림 비율,
+#          최종 화면 텍스트(백스페이스 적용) 일치 여부
+
+import argparse, json, os, random, sys, tempfile, time
+
+from chordboard_mapping import (A_CMD, A_KEY, A_TEXT, WORDS_TO_CHARS, MASK_BITS,
+                                compile_mapping, normalize_value)
+
+BASE_DIR = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+MAPPING_PATH = os.path.join(BASE_DIR, "mapping_clean.json")
+
+# ── 기존 경로 (chordboard_win11.emit/send_value 에서 I/O만 뺀 복제) ─────────
+def legacy_emit(MAP, lang, mode, fn_mode, bits_list, count_int):
+    bstr = "".join(str(b) for b in bits_list)
+    cnt_key = str(max(1, min(3, count_int)))
+    for mode_to_use in (('Fn' if fn_mode else None), mode):
+        if mode_to_use is None:
+            continue
+        modesect = MAP.get(lang, {}).get(mode_to_use, {})
+        val = modesect.get(cnt_key, {}).get(bstr)
+        if val is not None:
+            return legacy_send_value(val)
+        else:
+            for other_cnt, group in modesect.items():
+                if other_cnt != cnt_key and bstr in group:
+                    break
+    return None
+
+def legacy_send_value(val):
+    if val in ("shift", "switch", "ctrl", "Fn", "fn"):
+        return val
+    if isinstance(val, str) and val.startswith('cmd:'):
+        return val[4:]
+    raw = WORDS_TO_CHARS.get(val, val)
+    if isinstance(raw, str) and len(raw) == 1:
+        return raw
+    return normalize_value(raw)
+
+# ── 컴파일 경로 ────────────────────────────────────────────────
+def compiled_emit(table, slot_base, mask, count_int):
+    cnt = 1 if count_int < 1 else (3 if count_int > 3 else count_int)
+    act = table[slot_base | (cnt << 5) | mask]
+    if act is None:
+        return None
+    kind = act.kind
+    if kind == A_TEXT:
+        return act.value
+    if kind == A_KEY:
+        return act.value
+    if kind == A_CMD:
+        return act.value
+    return act.value  # A_TOGGLE — 실제 백엔드처럼 kind별 분기 비용 포함
+
+def _workload(MAP, n, seed=1):
+    """(lang, mode, fn, mask, count) 무작위 시퀀스 — 모든 레이어에 걸쳐 적중/미스 혼합."""
+    rnd = random.Random(seed)
+    combos = [(lg, md) for lg in MAP for md in MAP[lg] if md != "CROSS"]
+    out = []
+    for _ in range(n):
+        lg, md = rnd.choice(combos)
+        out.append((lg, md, rnd.random() < 0.1, rnd.randrange(1, 32), rnd.choice((1, 1, 1, 2, 3))))
+    return out
+
+def bench_emit(MAP, n):
+    cm = compile_mapping(MAP)
+    work = _workload(MAP, n)
+    legacy_work = [(lg, md, fn, MASK_BITS[m], c) for lg, md, fn, m, c in work]
+    compiled_work = [(cm.slot(lg, md, fn) << 7, m, c) for lg, md, fn, m, c in work]
+
+    # 결과 동일성 확인
+    for (lg, md, fn, bl, c), (sb, m, _) in zip(legacy_work[:5000], compiled_work[:5000]):
+        a = legacy_emit(MAP, lg, md, fn, bl, c)
+        b = compiled_emit(cm.table, sb, m, c)
+        if a != b and not (isinstance(a, str) and a.partition('=')[0] == b):
+            raise AssertionError(f"mismatch {lg},{md},fn={fn},{bl},cnt={c}: {a!r} != {b!r}")
+
+    t0 = time.perf_counter()
+    for lg, md, fn, bl, c in legacy_work:
+        legacy_emit(MAP, lg, md, fn, bl, c)
+    t_legacy = time.perf_counter() - t0
+
+    table = cm.table
+    t0 = time.perf_counter()
+    for sb, m, c in compiled_work:
+        compiled_emit(table, sb, m, c)
+    t_compiled = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(20):
+        compile_mapping(MAP)
+    t_compile = (time.perf_counter() - t0) / 20
+    return t_legacy, t_compiled, t_compile
+
+def bench_replay(n_chords, chunk=50000, seed=1):
+    """합성 트레이스를 chunk 단위로 생성·재생 (메모리 제한). 반환 dict."""
+    import chordboard_replay as replay
+    import chordboard_win11 as backend
+    from chordboard_latency import LatencyRing, percentile
+
+    old_ring = backend.LATENCY
+    backend.LATENCY = LatencyRing(min(chunk, 65536))
+    events = emits = mismatches = 0
+    t_gen = t_run = 0.0
+    response = []
+    try:
+        done, k = 0, 0
+        while done < n_chords:
+            n = min(chunk, n_chords - done)
+            t0 = time.perf_counter()
+            tr = replay.generate_trace(n, seed=seed + k)
+            t1 = time.perf_counter()
+            res = replay.replay(tr)
+            t2 = time.perf_counter()
+            t_gen += t1 - t0; t_run += t2 - t1
+            events += res.events; emits += res.emits; mismatches += len(res.mismatches)
+            response += backend.LATENCY.values("response")
+            done += n; k += 1
+    finally:
+        backend.LATENCY = old_ring
+    response.sort()
+    return {
+        "chords": n_chords, "events": events, "emits": emits, "mismatches": mismatches,
+        "gen_s": t_gen, "run_s": t_run,
+        "p50": percentile(response, 50), "p95": percentile(response, 95), "p99": percentile(response, 99),
+    }
+
+def _replay_stats(tr, roll):
+    """트레이스 1개 재생 (roll: 헤더의 @roll 지시를 덮어씀). 반환 (Result, 재생 초, release→주입 정렬 목록)."""
+    import chordboard_replay as replay
+    import chordboard_win11 as backend
+    items = [x for x in tr.items if not (x[1] == "@" and x[2][0] == "roll")]
+    items.insert(1, (0.0, "@", ("roll", "on" if roll else "off")))
+    t0 = time.perf_counter()
+    res = replay.replay(replay.Trace(items, tr.expect))
+    return res, time.perf_counter() - t0, backend.LATENCY.values("response")
+
+def bench_roll(n_chords, seed=1):
+    """같은 seed(같은 합주열)로 lift/rolling 트레이스를 만들어 각 모드로 재생. 반환 dict."""
+    import chordboard_replay as replay
+    import chordboard_win11 as backend
+    from chordboard_latency import LatencyRing, percentile
+
+    old_ring = backend.LATENCY
+    backend.LATENCY = LatencyRing(min(n_chords, 65536))
+    out = {}
+    try:
+        for style in ("lift", "rolling"):
+            tr = replay.generate_trace(n_chords, seed=seed, rolling=style == "rolling")
+            span_min = (tr.items[-1][0] - tr.items[0][0]) / 60000.0
+            res, run_s, resp = _replay_stats(tr, style == "rolling")
+            cross, _, _ = _replay_stats(tr, style != "rolling")
+            out[style] = {
+                "chords": len(tr.expect), "events": res.events, "mismatches": len(res.mismatches),
+                "cross_mismatches": len(cross.mismatches), "run_s": run_s,
+                "cpm": len(tr.expect) / span_min if span_min else 0.0,
+                "p50": percentile(resp, 50), "p95": percentile(resp, 95),
+            }
+    finally:
+        backend.LATENCY = old_ring
+    return out
+
+def bench_record(n, n_chords, seed=1):
+    """Recorder.add() 단독 비용 + 재생(녹화 off/on) + 왕복. 반환 dict."""
+    import chordboard_record as record
+    import chordboard_replay as replay
+    import chordboard_win11 as backend
+
+    tr = replay.generate_trace(n_chords, seed=seed)
+    old = (backend.RECORD_DIR, backend.RECORD_FILE_BYTES)
+    with tempfile.TemporaryDirectory() as d:
+        rec = record.Recorder(d, 16 << 20, 4, lambda: {})
+        add = rec.add
+        t0 = time.perf_counter()
+        for i in range(n):
+            add(i * 1e-4, record.K_DOWN, i & 7, 0, i & 1023)
+        t_add = time.perf_counter() - t0
+        rec.close()
+        files = len(rec.files)
+
+        backend.RECORD_DIR, backend.RECORD_FILE_BYTES = d, 64 << 20
+        try:
+            t0 = time.perf_counter()
+            replay.replay(tr)
+            t_off = time.perf_counter() - t0
+            for p in os.listdir(d):
+                os.remove(os.path.join(d, p))
+            backend.set_recording(True)
+            t0 = time.perf_counter()
+            res = replay.replay(tr)
+            t_on = time.perf_counter() - t0
+            written = backend.REC.written
+            backend.set_recording(False)
+            paths = [os.path.join(d, p) for p in os.listdir(d)]
+            exported, _ = record.export_trace(*record.open_session(paths))
+            back = replay.replay(exported)
+        finally:
+            backend.RECORD_DIR, backend.RECORD_FILE_BYTES = old
+    return {
+        "n": n, "add_ns": t_add * 1e9 / n, "files": files, "events": res.events, "written": written,
+        "off_s": t_off, "on_s": t_on, "mismatches": len(res.mismatches), "roundtrip_mismatches": len(back.mismatches),
+        "roundtrip_expect": len(exported.expect),
+    }
+
+def _screen(output):
+    """FakeKeyboard.output → 백스페이스를 적용한 최종 화면 (키 조합은 <이름>으로)."""
+    out = []
+    for op, v in output:
+        if op == "write":
+            out.extend(v)
+        elif v == "backspace":
+            if out: out.pop()
+        else:
+            out.append(f"<{v}>")
+    return "".join(out)
+
+def bench_spec(n_chords, seed=1):
+    """잠정 출력 off/on 비교. 반환 {"off"|"on": dict}."""
+    import chordboard_replay as replay
+    import chordboard_win11 as backend
+    from chordboard_latency import LatencyRing, percentile
+
+    tr = replay.generate_trace(n_chords, seed=seed)
+    old_ring = backend.LATENCY
+    backend.LATENCY = LatencyRing(min(n_chords * 2, 65536))
+    out = {}
+    try:
+        for name in ("off", "on"):
+            items = [x for x in tr.items if not (x[1] == "@" and x[2][0] == "speculate")]
+            items.insert(1, (0.0, "@", ("speculate", name)))
+            hits, rolled = backend.speculation_stats()
+            res = replay.replay(replay.Trace(items, tr.expect))
+            resp = sorted(backend.LATENCY.values("response"))
+            h, r = backend.speculation_stats()
+            out[name] = {"chords": len(tr.expect), "mismatches": len(res.mismatches), "screen": _screen(res.kb.output),
+                         "hits": h - hits, "rollbacks": r - rolled,
+                         "p50": percentile(resp, 50), "p95": percentile(resp, 95)}
+    finally:
+        backend.LATENCY = old_ring
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ChordBoard backend benchmarks")
+    ap.add_argument("--suite", choices=("emit", "replay", "roll", "record", "spec", "all"), default="all")
+    ap.add_argument("--mapping", default=MAPPING_PATH)
+    ap.add_argument("--n", type=int, default=200000, help="emit calls per variant")
+    ap.add_argument("--chords", type=int, default=100000, help="synthetic chords for the replay suite")
+    args = ap.parse_args(argv)
+
+    if args.suite in ("emit", "all"):
+        with open(args.mapping, encoding="utf-8") as f:
+            MAP = json.load(f)
+        t_legacy, t_compiled, t_compile = bench_emit(MAP, args.n)
+        n = args.n
+        print(f"emit  n={n}")
+        print(f"  legacy   : {t_legacy*1e9/n:8.1f} ns/call  ({n/t_legacy:,.0f}/s)")
+        print(f"  compiled : {t_compiled*1e9/n:8.1f} ns/call  ({n/t_compiled:,.0f}/s)")
+        print(f"  speedup  : {t_legacy/t_compiled:8.2f}x")
+        print(f"  compile_mapping(): {t_compile*1e3:.2f} ms")
+
+    if args.suite in ("replay", "all"):
+        r = bench_replay(args.chords)
+        print(f"replay  chords={r['chords']:,}  events={r['events']:,}  emits={r['emits']:,}  mismatches={r['mismatches']}")
+        print(f"  throughput : {r['events']/r['run_s']:,.0f} events/s   {r['emits']/r['run_s']:,.0f} emits/s   (gen {r['gen_s']:.1f}s, run {r['run_s']:.1f}s)")
+        if r["p50"] is not None:
+            print(f"  simulated release→inject : p50 {r['p50']*1e3:.1f}  p95 {r['p95']*1e3:.1f}  p99 {r['p99']*1e3:.1f} ms")
+        if r["mismatches"]:
+            return 1
+
+    if args.suite in ("roll", "all"):
+        rr = bench_roll(min(args.chords, 20000))
+        lift, roll = rr["lift"], rr["rolling"]
+        print(f"roll  chords={lift['chords']:,} (같은 합주열)")
+        for name, r, mode_name, other in (("lift   ", lift, "normal", "roll"), ("rolling", roll, "roll", "normal")):
+            p = f"p50 {r['p50']*1e3:.1f}  p95 {r['p95']*1e3:.1f} ms" if r["p50"] is not None else "-"
+            print(f"  {name} @ {mode_name:6s}: {r['cpm']:6.0f} chords/min   mismatches={r['mismatches']}   "
+                  f"release→inject {p}   {r['events']/r['run_s']:,.0f} events/s   "
+                  f"(@ {other}: {r['cross_mismatches']} mismatches)")
+        if lift["mismatches"] or roll["mismatches"] or lift["cross_mismatches"]:
+            return 1
+
+    if args.suite in ("record", "all"):
+        r = bench_record(args.n, min(args.chords, 20000))
+        print(f"record  n={r['n']:,} ({r['files']} file(s))")
+        print(f"  Recorder.add()  : {r['add_ns']:8.1f} ns/record")
+        print(f"  replay off / on : {r['events']/r['off_s']:,.0f} / {r['events']/r['on_s']:,.0f} events/s"
+              f"   ({r['written']:,} records, mismatches={r['mismatches']})")
+        print(f"  round trip      : {r['roundtrip_expect']:,} emits, mismatches={r['roundtrip_mismatches']}")
+        if r["mismatches"] or r["roundtrip_mismatches"]:
+            return 1
+
+    if args.suite in ("spec", "all"):
+        rs = bench_spec(min(args.chords, 20000))
+        off, on = rs["off"], rs["on"]
+        same = off["screen"] == on["screen"]
+        print(f"spec  chords={off['chords']:,} (같은 트레이스)")
+        for name, r in (("off", off), ("on ", on)):
+            p = f"p50 {r['p50']*1e3:.1f}  p95 {r['p95']*1e3:.1f} ms" if r["p50"] is not None else "-"
+            print(f"  speculate {name}: release→inject {p}   mismatches={r['mismatches']}")
+        n = on["hits"] + on["rollbacks"]
+        print(f"  speculative outputs {n:,}: kept {on['hits']:,} / rolled back {on['rollbacks']:,}"
+              f" ({on['hits'] / n * 100 if n else 0:.0f}% kept)   final text {'identical' if same else 'DIFFERS'}")
+        if off["mismatches"] or on["mismatches"] or not same:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# chordboard_daemon.py
+# 헤드리스 실행 — tkinter를 import하지 않고 엔진(훅·worker·injector)만 (창을 보지 않는 키오스크 자리 등)
+#   - 학습 모드·상태는 명령으로: cmd:learn[=LEFT|RIGHT] / cmd:cancel_learn / cmd:status (STATUS 로그 레코드)
+#     단축키: Ctrl+Alt+S = 상태, Ctrl+Alt+U = UI 열기, Ctrl+Alt+Q = 종료 (엔진 단축키는 그대로)
+#   - cmd:open_ui: 필요할 때만 이 프로세스의 메인 스레드에서 UI를 엶 (그때 처음 tkinter import)
+#     UI의 Close UI는 창만 닫고 엔진은 계속
+#   - --measure N: 시작 후 N초 동안의 RSS·스레드 수·CPU 사용률을 한 줄 출력하고 종료 (--ui와 함께 = UI 모드 측정)
+#
+#   py -3 chordboard_daemon.py
+#   py -3 chordboard_ui_multiwin.py --headless          # 같은 것 (빌드된 exe: chordboard_ui_multiwin.exe --headless)
+#   py -3 chordboard_daemon.py --measure 10 [--ui]
+#   python3 chordboard_daemon.py --fake --measure 5     # 가짜 키보드 (리눅스)
+
+import argparse, os, queue, sys, threading, time
+
+import chordboard_win11 as backend
+
+WARMUP = 2.0        # --measure: 시작 직후(매핑 로드·매크로 스레드 등)를 빼고 재기 시작할 때까지(초)
+
+def _open_ui():
+    """(메인 스레드) UI 창을 열고 닫힐 때까지 실행."""
+    import chordboard_ui_multiwin as ui
+    ui.MultiWinApp(embedded=True).run()
+
+def _measure(seconds, with_ui):
+    try:
+        time.sleep(WARMUP)
+        line = backend.status_line(seconds)
+        tk = "loaded" if "tkinter" in sys.modules else "not loaded"
+        print(f"[MEASURE] {'ui' if with_ui else 'headless'} ({seconds:g} s idle, tkinter {tk}): {line}", flush=True)
+    finally:
+        os._exit(0)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ChordBoard engine without windows")
+    ap.add_argument("--ui", action="store_true", help="open the UI right away (same process)")
+    ap.add_argument("--measure", type=float, metavar="SECONDS", help="print RSS / threads / CPU after SECONDS idle, then exit")
+    ap.add_argument("--fake", action="store_true", help="in-memory fake keyboard (no hook; for measuring on Linux)")
+    args = ap.parse_args(argv)
+
+    if args.fake:
+        from chordboard_replay import FakeKeyboard
+        backend.use_io(FakeKeyboard(time.perf_counter))
+    if backend.keyboard is None:
+        print("python-keyboard 모듈이 필요합니다 (py -3 -m pip install keyboard)", file=sys.stderr)
+        return 1
+
+    requests = queue.SimpleQueue()
+    backend.UI_OPENER = lambda: requests.put("ui")
+    threading.Thread(target=backend.main, daemon=True).start()
+    backend.keyboard.add_hotkey("ctrl+alt+u", backend.UI_OPENER)
+    backend.keyboard.add_hotkey("ctrl+alt+s", lambda: threading.Thread(target=backend.report_status, daemon=True).start())
+    print(" - Status            : Ctrl+Alt+S (cmd:status)")
+    print(" - Open UI           : Ctrl+Alt+U (cmd:open_ui)")
+    print(" - Learn 5 keys      : cmd:learn / cmd:learn=LEFT (ESC to cancel)")
+    if args.measure:
+        threading.Thread(target=_measure, args=(args.measure, args.ui), daemon=True).start()
+    if args.ui:
+        requests.put("ui")
+    while True:
+        # 메인 스레드는 UI 요청만 기다림 (유휴 중 깨어남 없음). 종료는 Ctrl+Alt+Q / cmd:exit
+        if requests.get() == "ui":
+            try:
+                _open_ui()
+            except Exception as e:
+                backend.LOG.add(backend.WARN, "UI", value=f"open failed: {e}")
+            while not requests.empty():     # 열려 있는 동안 들어온 요청은 버림
+                requests.get_nowait()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# chordboard_engine.py
+# 합주 상태머신의 상태 객체 (훅 콜백·worker가 갱신, UI는 스냅샷으로 읽음)
+#   - 비트패턴은 5비트 int 마스크 (b1=엄지가 최상위, chordboard_mapping.mask_of와 같은 배치)
+#     패턴 비교는 int 비교, "전부 뗌"은 mask == 0, 눌린 수는 POPCOUNT[mask]
+#   - 키 이벤트당 할당 없음: __slots__ 대입과 int 연산만 (합주가 확정될 때 fires 레코드 1개 제외)
+#   - 쓰기는 호출자가 _cv를 잡은 상태에서만 (쓰는 쪽은 항상 하나)
+#   - 읽기는 seqlock: 쓰는 쪽이 변경 전후로 seq를 홀수/짝수로 올리고,
+#     snapshot()은 seq가 짝수이고 읽기 전후로 같을 때까지 재시도 → 락 없이 찢어지지 않은 불변 스냅샷
+#   - 확정 시점: 일반 모드는 전체 릴리즈, 롤링 모드(roll=True)는 안정 캡처 후 첫 릴리즈 또는
+#     roll_overlap 이후의 새 키 누름(롤오버). 그때 아직 눌린 키는 stale — 뗄 때까지 다음 합주에서 제외
+#   - 두 손 모드는 손마다 엔진 하나. 교차 합주로 넘어가면 abandon()으로 지금 프레스를 버림 (키는 stale)
+#   - speculate=True: TAP_GAP을 기다리는 탭마다 잠정 레코드 (mask, count | SPECULATIVE, ts)도 fires에 넣음
+#     (백엔드가 릴리즈 즉시 잠정 출력, 다음 탭이 오면 되돌림). 최종 확정은 평소대로 나중에 따로
+
+import time
+from collections import namedtuple
+
+from chordboard_mapping import POPCOUNT
+
+KEY_BITS = (16, 8, 4, 2, 1)     # 키 인덱스(버튼1..5) → 마스크 비트
+SPECULATIVE = 4                 # fires count 플래그: 잠정 탭 (시리즈는 계속)
+
+# 불변 스냅샷 (UI·진단용). last = 마지막 확정 (mask, cnt, value|None, time.time()) 또는 None
+Snapshot = namedtuple("Snapshot", "seq mask held pending_mask series_mask tap_count series_deadline last")
+
+class ChordEngine:
+    __slots__ = ("seq", "mask", "last_change_ts", "press_ts", "stable_ts",
+                 "pending", "pending_mask", "series_mask", "tap_count", "series_deadline",
+                 "s_press", "s_stable", "s_release",
+                 "fires", "last", "reach", "reach_base", "debounce", "tap_gap",
+                 "roll", "roll_overlap", "stale", "speculate")
+
+    def __init__(self, reach, debounce, tap_gap, roll_overlap=0.015):
+        self.seq = 0
+        self.reach = reach              # CompiledMap.reach — 마스크별 도달 가능한 최대 count
+        self.reach_base = 0             # 현재 (lang, mode, fn) 슬롯 << 5
+        self.debounce = debounce
+        self.tap_gap = tap_gap
+        self.roll = False               # 롤링 합주 인식 (손별 설정, set_hand가 교체)
+        self.roll_overlap = roll_overlap   # 캡처 후 이 시간 안에 눌린 키는 같은 합주에 합류 (그 뒤는 롤오버)
+        self.speculate = False          # 대기하는 탭도 잠정 레코드로 알림 (백엔드 SPECULATE, 한 손 모드만)
+        self.fires = []                 # 확정된 (mask, count, (press, stable, release)) — worker가 emit
+        self.last = None                # emit이 통째로 교체 (참조 대입 = 원자적 게시)
+        self.reset()
+
+    def reset(self):
+        self.seq += 1
+        self.mask = 0                   # 현재 눌린 비트
+        self.stale = 0                  # 눌려 있지만 이미 확정된 합주의 비트 (롤링 모드)
+        self.last_change_ts = 0.0
+        self.press_ts = 0.0             # 이번 프레스의 첫 키 누름 시각
+        self.stable_ts = 0.0            # 이번 프레스의 DEBOUNCE 안정화 시각
+        self.pending = False            # 이번 프레스에서 안정화된 패턴을 캡처했는가
+        self.pending_mask = 0
+        self.series_mask = 0            # 멀티탭 시리즈의 기준 패턴 (0 = 시리즈 없음)
+        self.tap_count = 0
+        self.series_deadline = 0.0      # 이 시각까지 다음 탭이 없으면 확정
+        self.s_press = self.s_stable = self.s_release = 0.0   # 시리즈 마지막 탭의 시각
+        self.fires.clear()
+        self.seq += 1
+
+    # ── 훅 콜백 (호출자가 _cv 보유) ─────────────────────────────
+    def down(self, bit, t):
+        """키 누름. 상태가 바뀌었으면 True."""
+        m = self.mask
+        if m & bit:
+            return False
+        self.seq += 1
+        live = m & ~self.stale
+        if self.roll and self.pending:
+            if t - self.stable_ts >= self.roll_overlap:
+                # 롤오버: 새 합주 시작 → 이전 합주를 지금 확정, 아직 눌린 키는 stale
+                self._commit(t)
+                self.stale = m
+                live = 0
+            else:
+                self.pending = False    # 늦게 합류한 키 → DEBOUNCE 후 다시 캡처
+        if not live:
+            self.press_ts = t
+        self.mask = m | bit
+        self.last_change_ts = t
+        self.seq += 1
+        return True
+
+    def up(self, bit, t):
+        """키 뗌. 확정 시점(일반: 전체 릴리즈, 롤링: 캡처 후 첫 릴리즈)이면 탭 누적."""
+        m = self.mask
+        if not m & bit:
+            return False
+        self.seq += 1
+        m ^= bit
+        self.mask = m
+        if self.stale & bit:
+            self.stale ^= bit           # 이미 확정된 합주의 키
+        else:
+            self.last_change_ts = t
+            if self.pending and (self.roll or not m):
+                self._commit(t)
+                self.stale = m
+        self.seq += 1
+        return True
+
+    def _commit(self, t):
+        """캡처된 패턴을 탭 하나로 누적. 더 높은 count가 매핑에 없으면 즉시 확정."""
+        p = self.pending_mask
+        s = self.series_mask
+        if s and s != p:
+            self.fires.append((s, self.tap_count, (self.s_press, self.s_stable, self.s_release)))
+            self.tap_count = 0
+        cnt = self.tap_count + 1 if self.tap_count < 3 else 3
+        self.tap_count = cnt
+        self.s_press = self.press_ts; self.s_stable = self.stable_ts; self.s_release = t
+        self.pending = False
+        if cnt >= 3 or cnt >= self.reach[self.reach_base | p]:
+            # 더 높은 count가 매핑에 없음 → TAP_GAP 대기 없이 즉시 확정
+            self.fires.append((p, cnt, (self.s_press, self.s_stable, t)))
+            self.series_mask = 0; self.tap_count = 0; self.series_deadline = 0.0
+        else:
+            self.series_mask = p
+            self.series_deadline = t + self.tap_gap
+            if self.speculate:
+                self.fires.append((p, cnt | SPECULATIVE, (self.s_press, self.s_stable, t)))
+
+    def abandon(self):
+        """지금 프레스를 이 엔진에서 떼어 냄 (두 손 교차 합주). 진행 중인 시리즈는 확정, 눌린 키는 stale.
+        반환: 떼어 낸 (stale이 아니던) 눌린 비트."""
+        live = self.mask & ~self.stale
+        self.seq += 1
+        if self.series_mask:
+            self.fires.append((self.series_mask, self.tap_count, (self.s_press, self.s_stable, self.s_release)))
+            self.series_mask = 0; self.tap_count = 0; self.series_deadline = 0.0
+        self.pending = False
+        self.stale = self.mask
+        self.seq += 1
+        return live
+
+    # ── worker (호출자가 _cv 보유) ──────────────────────────────
+    def next_deadline(self):
+        """다음 DEBOUNCE/TAP_GAP 데드라인. 없으면 None."""
+        if self.mask & ~self.stale:
+            return None if self.pending else self.last_change_ts + self.debounce
+        if self.series_mask and self.series_deadline > 0:
+            return self.series_deadline
+        return None
+
+    def collect(self, now):
+        """now 시각까지의 DEBOUNCE 캡처·TAP_GAP 만료 처리 후 확정 목록을 떼어 반환 (없으면 빈 튜플)."""
+        live = self.mask & ~self.stale
+        if live:
+            if not self.pending and now >= self.last_change_ts + self.debounce:   # next_deadline()과 같은 식 (부동소수 오차 방지)
+                self.seq += 1
+                self.pending_mask = live
+                self.pending = True
+                self.stable_ts = now
+                self.seq += 1
+        elif self.series_mask and self.series_deadline > 0 and now >= self.series_deadline:
+            self.seq += 1
+            self.fires.append((self.series_mask, self.tap_count, (self.s_press, self.s_stable, self.s_release)))
+            self.series_mask = 0; self.tap_count = 0; self.series_deadline = 0.0
+            self.seq += 1
+        fires = self.fires
+        if not fires:
+            return ()
+        self.fires = []
+        return fires
+
+    # ── 읽기 (아무 스레드) ──────────────────────────────────────
+    def snapshot(self):
+        while True:
+            s = self.seq
+            if s & 1:
+                time.sleep(0)           # 쓰는 중 → 양보 후 재시도
+                continue
+            mask = self.mask
+            snap = Snapshot(s, mask, POPCOUNT[mask], self.pending_mask if self.pending else 0,
+                            self.series_mask, self.tap_count, self.series_deadline, self.last)
+            if self.seq == s:
+                return snap
@@ -0,0 +1,148 @@
+# chordboard_hangul.py
+# 한글 음절 조합 오토마타 — KO 레이어의 호환 자모(ㄱ, ㅏ, ...)를 완성형 음절로 조합 (OS IME와 무관)
+#   - 초성/중성/종성, 된소리(ㄲ ㄸ ㅃ ㅆ ㅉ), 겹모음(ㅘ ㅙ ㅚ ㅝ ㅞ ㅟ ㅢ), 겹받침(ㄳ ㄵ ... ㅄ)
+#   - 종성 뒤 모음은 받침을 다음 음절 초성으로 넘김 (각+ㅏ → 가가, 닭+ㅏ → 달가)
+#   - 결과는 편집 (지울 글자 수, 쓸 텍스트) — 키 입력 하나당 백스페이스 최대 1개 + 교체
+#   - backspace: 조합 중이면 자모 하나만 되돌림 (각 → 가 → ㄱ → 없음), 아니면 None (원래 키 그대로)
+#   - mark/undo: feed 한 번을 정확히 되돌림 (받침 넘김 포함 — 각+ㅏ → 가가 → 각). 잠정 출력 되돌리기용
+#   - 조합표는 import 시 한 번만 구성, feed()는 dict 조회와 int 연산만
+#
+#   python3 chordboard_hangul.py ㄷㅏㄹㄱㅏ     # 조합 결과 확인
+
+CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONG = "\0ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"     # 0 = 받침 없음
+SYLLABLE_BASE = 0xAC00
+
+# ── 조합표 (import 시 1회) ─────────────────────────────────────
+CHO_INDEX = {c: i for i, c in enumerate(CHO)}
+JUNG_INDEX = {c: i for i, c in enumerate(JUNG)}
+JONG_INDEX = {c: i for i, c in enumerate(JONG) if i}
+
+def _pairs(spec, left, right, out):
+    """"ㅗㅏㅘ ..." → {(left[a], right[b]): out[c]}."""
+    return {(left[w[0]], right[w[1]]): out[w[2]] for w in spec.split()}
+
+# (중성, 모음) → 겹모음
+VOWEL_PAIR = _pairs("ㅗㅏㅘ ㅗㅐㅙ ㅗㅣㅚ ㅜㅓㅝ ㅜㅔㅞ ㅜㅣㅟ ㅡㅣㅢ", JUNG_INDEX, JUNG_INDEX, JUNG_INDEX)
+# (종성, 자음) → 겹받침
+JONG_PAIR = _pairs("ㄱㅅㄳ ㄴㅈㄵ ㄴㅎㄶ ㄹㄱㄺ ㄹㅁㄻ ㄹㅂㄼ ㄹㅅㄽ ㄹㅌㄾ ㄹㅍㄿ ㄹㅎㅀ ㅂㅅㅄ",
+                   JONG_INDEX, CHO_INDEX, JONG_INDEX)
+# 종성 → (남는 종성, 다음 음절 초성) — 받침 뒤에 모음이 오면 넘김
+JONG_SPLIT = {j: (0, CHO_INDEX[c]) for c, j in JONG_INDEX.items() if c in CHO_INDEX}
+JONG_SPLIT.update({j: (a, b) for (a, b), j in JONG_PAIR.items()})
+
+def syllable(cho, jung, jong=0):
+    return chr(SYLLABLE_BASE + (cho * 21 + jung) * 28 + jong)
+
+def render(cho, jung, jong):
+    """조합 상태 → 화면 글자 (없으면 "")."""
+    if cho >= 0:
+        return syllable(cho, jung, jong) if jung >= 0 else CHO[cho]
+    return JUNG[jung] if jung >= 0 else ""
+
+EMPTY = (-1, -1, 0)
+
+class HangulComposer:
+    """조합 중인 음절 하나의 상태. 호출은 한 스레드(worker)에서만."""
+    __slots__ = ("cho", "jung", "jong", "history", "interrupted")
+
+    def __init__(self):
+        self.history = []               # 이번 음절에서 자모마다의 (cho, jung, jong) — backspace가 되돌림
+        self.interrupted = False        # 다른 키 입력·포커스 이동 등 (훅 스레드가 세움) → 다음 feed에서 확정
+        self.commit()
+
+    def commit(self):
+        """조합 확정 (화면 글자는 그대로, 이후 입력은 새 음절)."""
+        self.cho, self.jung, self.jong = EMPTY
+        self.history.clear()
+        self.interrupted = False
+
+    def _set(self, cho, jung, jong):
+        self.cho, self.jung, self.jong = cho, jung, jong
+        self.history.append((cho, jung, jong))
+        return render(cho, jung, jong)
+
+    def _start(self, cho, jung):
+        self.commit()
+        return self._set(cho, jung, 0)
+
+    def feed(self, ch):
+        """자모 하나 입력. 반환 (지울 글자 수 0|1, 쓸 텍스트). 자모가 아니면 조합 확정 후 None."""
+        if self.interrupted:
+            self.commit()
+        cho, jung, jong = self.cho, self.jung, self.jong
+        c = CHO_INDEX.get(ch)
+        if c is not None:
+            if cho >= 0 and jung >= 0:
+                if not jong:
+                    j = JONG_INDEX.get(ch)               # ㄸ ㅃ ㅉ 는 받침 불가 → 새 음절
+                else:
+                    j = JONG_PAIR.get((jong, c))
+                if j is not None:
+                    return 1, self._set(cho, jung, j)
+            return 0, self._start(c, -1)
+        v = JUNG_INDEX.get(ch)
+        if v is None:
+            self.commit()
+            return None
+        if jung >= 0 and not jong:
+            pair = VOWEL_PAIR.get((jung, v))
+            if pair is not None:
+                return 1, self._set(cho, pair, 0)
+            return 0, self._start(-1, v)
+        if jong:                                         # 받침을 다음 음절 초성으로
+            keep, nxt = JONG_SPLIT[jong]
+            head = syllable(cho, jung, keep)
+            self.commit()
+            self._set(nxt, -1, 0)
+            return 1, head + self._set(nxt, v, 0)
+        if cho >= 0:
+            return 1, self._set(cho, v, 0)
+        return 0, self._start(-1, v)
+
+    def backspace(self):
+        """조합 중이면 자모 하나 되돌림 → (1, 남은 글자). 조합 중이 아니면 None (원래 backspace)."""
+        if self.interrupted:
+            self.commit()
+        h = self.history
+        if not h:
+            return None
+        h.pop()
+        self.cho, self.jung, self.jong = h[-1] if h else EMPTY
+        return 1, render(self.cho, self.jung, self.jong)
+
+    def mark(self):
+        """지금 상태 (undo()에 넘김)."""
+        return self.cho, self.jung, self.jong, tuple(self.history), self.interrupted
+
+    def undo(self, mark, edit):
+        """mark() 뒤의 입력 하나를 되돌림. edit = 그 입력의 편집 (지울 글자 수, 쓸 텍스트) — 조합 밖 글자는 (0, 글자).
+        반환: 화면을 mark 때로 돌리는 편집."""
+        cho, jung, jong, history, self.interrupted = mark
+        self.cho, self.jung, self.jong = cho, jung, jong
+        self.history[:] = history
+        back, text = edit
+        return len(text), render(cho, jung, jong) if back else ""
+
+def compose(text, composer=None):
+    """자모 문자열을 편집 적용한 최종 문자열 ("\b" = backspace 키). 헤드리스 확인용."""
+    hc = composer or HangulComposer()
+    out = []
+    for ch in text:
+        edit = hc.backspace() if ch == "\b" else hc.feed(ch)
+        if edit is None:
+            if ch == "\b":
+                if out: out.pop()
+            else:
+                out.append(ch)
+            continue
+        back, s = edit
+        del out[len(out) - back:]
+        out.extend(s)
+    return "".join(out)
+
+if __name__ == "__main__":
+    import sys
+    for arg in sys.argv[1:]:
+        print(f"{arg} → {compose(arg.replace('<', chr(8)))}")
@@ -0,0 +1,79 @@
+# chordboard_latency.py
+# 합주 1회당 단계별 지연 측정용 고정 크기 링버퍼
+#   press   : 첫 키 누름
+#   stable  : DEBOUNCE 안정화 캡처 (pending_chord_seen)
+#   release : 전체 릴리즈
+#   emit    : 확정(emit) 결정
+#   done    : 주입 완료 (injector)
+# 단계: debounce(stable-press) / hold(release-stable) / decide(emit-release)
+#       inject(done-emit) / response(done-release) / total(done-press)
+
+import itertools
+
+STAGES = ("debounce", "hold", "decide", "inject", "response", "total")
+_STAGE_INDEX = {name: i + 1 for i, name in enumerate(STAGES)}   # 레코드 튜플 내 위치 (0번은 layer)
+
+def percentile(sorted_vals, q):
+    """nearest-rank 백분위 (sorted_vals는 오름차순). 비어 있으면 None."""
+    if not sorted_vals:
+        return None
+    k = int(round(q / 100.0 * (len(sorted_vals) - 1)))
+    return sorted_vals[k]
+
+class LatencyRing:
+    """최근 size개 합주의 단계별 지연(초). 여러 스레드가 add해도 인덱스는 itertools.count로 원자적으로 증가."""
+    __slots__ = ("size", "buf", "_seq", "count")
+
+    def __init__(self, size=2048):
+        self.size = size
+        self.buf = [None] * size
+        self._seq = itertools.count()
+        self.count = 0            # 누적 기록 수 (UI가 변경 여부 판단용)
+
+    def add(self, layer, t_press, t_stable, t_release, t_emit, t_done):
+        i = next(self._seq)
+        self.buf[i % self.size] = (layer,
+                                   t_stable - t_press, t_release - t_stable, t_emit - t_release,
+                                   t_done - t_emit, t_done - t_release, t_done - t_press)
+        self.count = i + 1
+
+    def records(self, layer=None):
+        recs = [r for r in self.buf if r is not None]
+        if layer is not None:
+            recs = [r for r in recs if r[0] == layer]
+        return recs
+
+    def values(self, stage, layer=None):
+        j = _STAGE_INDEX[stage]
+        return sorted(r[j] for r in self.records(layer))
+
+    def stats(self, layer=None):
+        """{stage: (p50, p95, p99, n)} — 초 단위."""
+        recs = self.records(layer)
+        out = {}
+        for stage, j in _STAGE_INDEX.items():
+            vals = sorted(r[j] for r in recs)
+            out[stage] = (percentile(vals, 50), percentile(vals, 95), percentile(vals, 99), len(vals))
+        return out
+
+    def stats_by_layer(self):
+        """{layer: stats()} — layer는 "EN/기본" 형태."""
+        return {lay: self.stats(lay) for lay in sorted({r[0] for r in self.buf if r is not None})}
+
+    def histogram(self, stage="response", bins=24, hi=None):
+        """(bin 경계 상한[초], 개수 리스트). hi 미지정 시 p99 기준."""
+        vals = self.values(stage)
+        if not vals:
+            return 0.0, [0] * bins
+        if hi is None:
+            hi = max(percentile(vals, 99), 1e-3)
+        counts = [0] * bins
+        for v in vals:
+            b = int(v / hi * bins)
+            counts[b if b < bins else bins - 1] += 1
+        return hi, counts
+
+    def clear(self):
+        self.buf = [None] * self.size
+        self._seq = itertools.count()
+        self.count = 0
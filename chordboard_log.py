@@ -0,0 +1,158 @@
+# chordboard_log.py
+# 구조화 이벤트 로그 — 훅/worker 경로에서 print() 대신 레코드 튜플만 링버퍼에 기록
+#   - 레코드: (seq, time.time(), level, kind, lang, mode, mask, cnt, value, extra) — 문자열 포맷은 기록 시 하지 않음
+#   - 기록은 락 없음: 인덱스는 itertools.count (GIL 아래 원자적), 슬롯 대입 1회 (LatencyRing과 같은 방식)
+#   - 레벨 필터: 호출자가 bool 속성(log.debug / log.info / log.warn)만 확인 → 꺼진 레벨은 호출 자체가 없음
+#   - flusher 스레드가 주기적으로 새 레코드를 포맷해 회전 파일(+콘솔이 있으면 stdout)에 씀
+#     flusher가 따라잡기 전에 덮어쓰인 레코드는 "dropped N"으로 표시
+#   - UI·진단은 recent()로 링버퍼를 직접 읽음
+
+import itertools, os, sys, threading, time
+
+DEBUG, INFO, WARN, ERROR, OFF = 10, 20, 30, 40, 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": OFF}
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+
+def format_record(r):
+    """레코드 → 한 줄 (시각 제외). SEND/MISS는 "EN/기본 bits=00110 cnt=1 → l" 형태."""
+    _, _, level, kind, lang, mode, mask, cnt, value, extra = r
+    parts = [kind]
+    if kind == "STATE":
+        parts.append(f"{value} = {extra}")
+        return " ".join(parts)
+    if lang:
+        parts.append(f"{lang}/{mode}" if mode else lang)
+    if cnt:
+        parts.append(f"bits={mask:05b} cnt={cnt}")
+    if kind == "MISS":
+        parts.append("→ (MISS)")
+    elif value is not None:
+        parts.append(f"→ {value}" if cnt else str(value))
+    if extra is not None:
+        parts.append(f"({extra})" if cnt else str(extra))
+    return " ".join(parts)
+
+def format_line(r):
+    t = r[1]
+    return (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) + f".{int(t * 1000) % 1000:03d} "
+            + f"{LEVEL_NAMES.get(r[2], r[2]):5s} " + format_record(r))
+
+class EventLog:
+    """최근 size개 레코드 링버퍼 + 백그라운드 flusher (start() 후)."""
+    __slots__ = ("size", "buf", "_seq", "count", "level", "debug", "info", "warn",
+                 "flushed", "dropped", "path", "max_bytes", "backups", "echo", "interval", "_file", "_lock")
+
+    def __init__(self, size=4096, level=INFO):
+        self.size = size
+        self.buf = [None] * size
+        self._seq = itertools.count()
+        self.count = 0              # 누적 기록 수
+        self.flushed = 0            # 여기까지 파일/콘솔에 씀
+        self.dropped = 0
+        self.path = None            # None이면 파일 없음 (flush()는 echo만)
+        self.max_bytes = 1 << 20
+        self.backups = 3
+        self.echo = sys.stdout is not None   # 창 모드 exe는 stdout이 None
+        self.interval = 0.5
+        self._file = None
+        self._lock = threading.Lock()        # flush() 직렬화 (기록 쪽은 락 없음)
+        self.set_level(level)
+
+    def set_level(self, level):
+        if isinstance(level, str):
+            level = LEVELS[level.lower()]
+        self.level = level
+        self.debug = level <= DEBUG
+        self.info = level <= INFO
+        self.warn = level <= WARN
+
+    def add(self, level, kind, lang="", mode="", mask=0, cnt=0, value=None, extra=None):
+        """레코드 1개 기록 (레벨 확인은 호출자가 bool 속성으로)."""
+        i = next(self._seq)
+        self.buf[i % self.size] = (i, time.time(), level, kind, lang, mode, mask, cnt, value, extra)
+        self.count = i + 1
+
+    def recent(self, n=20, kinds=None):
+        """최근 레코드 최대 n개 (오래된 것 → 최신). kinds: 종류 필터 (예: ("SEND", "MISS"))."""
+        out = []
+        end = self.count
+        i = end - 1
+        while i >= 0 and i >= end - self.size and len(out) < n:
+            r = self.buf[i % self.size]
+            if r is not None and r[0] == i and (kinds is None or r[3] in kinds):
+                out.append(r)
+            i -= 1
+        out.reverse()
+        return out
+
+    # ── 출력 (flusher 스레드 / 동기 flush) ─────────────────────
+    def start(self, path=None, max_bytes=None, backups=None, interval=None):
+        """회전 파일 경로 지정 후 flusher 데몬 스레드 시작."""
+        self.path = path
+        if max_bytes is not None: self.max_bytes = max_bytes
+        if backups is not None: self.backups = backups
+        if interval is not None: self.interval = interval
+        threading.Thread(target=self._run, name="chordboard-log", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def flush(self):
+        """아직 안 쓴 레코드를 포맷해 파일/콘솔에 씀. 반환: 쓴 줄 수."""
+        with self._lock:
+            end = self.count
+            start = self.flushed
+            if start >= end:
+                return 0
+            lines = []
+            if end - start > self.size:
+                lost = end - start - self.size
+                self.dropped += lost
+                lines.append(f"... dropped {lost} records")
+                start = end - self.size
+            for i in range(start, end):
+                r = self.buf[i % self.size]
+                if r is None or r[0] != i:          # flush 중에 덮어쓰임
+                    self.dropped += 1
+                    continue
+                lines.append(format_line(r))
+            self.flushed = end
+            text = "\n".join(lines) + "\n"
+            if self.echo and sys.stdout is not None:
+                try:
+                    sys.stdout.write(text)
+                except Exception:
+                    pass
+            if self.path:
+                self._write_file(text)
+            return len(lines)
+
+    def _write_file(self, text):
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(text)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            self._file = None
+
+    def _rotate(self):
+        """chordboard.log → .1 → .2 ... (backups개 유지)."""
+        self._file.close()
+        self._file = None
+        for k in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{k}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{k + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
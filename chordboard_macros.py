@@ -0,0 +1,146 @@
+# chordboard_macros.py
+# 합주열 매크로 — 연속된 합주 (bits, count) 열 → 문자열/키 시퀀스 (약어 확장)
+#   - macros.json (mapping_clean.json과 같은 폴더): {lang: {"bits[/count] bits[/count] ...": 확장}}
+#       확장이 문자열이면 그대로 입력, 목록이면 매핑 값 시퀀스 (한 글자 = TEXT, 그 외 = 키 조합 — cmd:·토글은 불가)
+#   - 접두사 트라이: 노드 = {토큰: 자식 노드}, 노드의 확장은 키 None에. 토큰 = count << 5 | mask
+#     (매핑 테이블 인덱스의 하위 7비트와 같은 배치) — 한 단계 = dict 조회 1회
+#   - MacroMatcher: 합주 하나마다 한 단계 전진 (worker 스레드만 호출)
+#       루트에서 시작하지 않는 합주 → None (버퍼 없음, 평소대로 emit — 매크로가 없는 합주는 지연 없음)
+#       자식이 있으면 버퍼에 넣고 대기. 자식 없는 확장 노드는 즉시 확정 (policy="shortest"면 확장이 있는 첫 노드에서)
+#       막힘·시간 초과·다른 레이어 → 버퍼에서 가장 긴 확장 접두사를 확정, 나머지 합주는 원래 값으로 내보냄
+#   - 트라이 구성은 항목당 dict 조회 몇 번 (5만 항목 수백 ms) — 백엔드는 시작 후 별도 스레드에서 로드 (시작 경로 밖)
+#
+#   {"EN": {"01100 01111": "the ", "01100 01111 10000": "that ", "10011/2 10011/2": ["ctrl+s", "ctrl+w"]}}
+#
+#   python3 chordboard_macros.py macros.json        # 검사 + 항목 수·구성 시간
+
+import json, sys, time
+from collections import namedtuple
+
+from chordboard_mapping import A_KEY, A_TEXT, KIND_NAMES, compile_value
+
+# seq: 원문 키, items: ((A_TEXT|A_KEY, 값), ...) — 출력 큐에 한 묶음으로, raw: 로그·리플레이용 원문
+Macro = namedtuple("Macro", "seq items raw")
+
+# "bits" / "bits/count" → 토큰 (import 시 1회, 파싱은 단어마다 dict 조회 1회)
+CHORD_TOKENS = {format(m, "05b") + sfx: (c << 5) | m
+                for m in range(1, 32) for c in (1, 2, 3) for sfx in (("", f"/{c}") if c == 1 else (f"/{c}",))}
+
+def parse_sequence(spec):
+    """"01100 10000/2" → 토큰 튜플 (count << 5 | mask). 형식이 틀리면 ValueError."""
+    tokens = tuple(map(CHORD_TOKENS.get, spec.split()))
+    if not tokens or None in tokens:
+        bad = next((w for w in spec.split() if w not in CHORD_TOKENS), "")
+        raise ValueError(f"macros: bad chord {bad!r} in {spec!r} (bits[/1|2|3])" if bad else "macros: empty sequence")
+    return tokens
+
+def compile_expansion(seq, val):
+    if isinstance(val, str):
+        if not val:
+            raise ValueError(f"macros: {seq!r} expands to an empty string")
+        return Macro(seq, ((A_TEXT, val),), val)
+    if not isinstance(val, list) or not val or not all(isinstance(v, str) and v for v in val):
+        raise ValueError(f"macros: {seq!r} must expand to a string or a list of mapping values")
+    items = []
+    for v in val:
+        a = compile_value(v)
+        if a.kind not in (A_TEXT, A_KEY):
+            raise ValueError(f"macros: {seq!r}: {v!r} is {KIND_NAMES[a.kind]} (only text and keys)")
+        items.append((a.kind, a.value))
+    return Macro(seq, tuple(items), " ".join(val))
+
+def build_tries(raw):
+    """{lang: {시퀀스: 확장}} → ({lang: 트라이}, 항목 수). 같은 시퀀스가 두 번이면 ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("macros: top level must be an object {lang: {...}}")
+    tries, n = {}, 0
+    for lang, entries in raw.items():
+        if not isinstance(entries, dict):
+            raise ValueError(f"macros[{lang!r}]: must be an object {{sequence: expansion}}")
+        root = tries[lang] = {}
+        for seq, val in entries.items():
+            node = root
+            for tok in parse_sequence(seq):
+                nxt = node.get(tok)
+                if nxt is None:
+                    nxt = node[tok] = {}
+                node = nxt
+            if None in node:
+                raise ValueError(f"macros[{lang!r}]: {seq!r} duplicates {node[None].seq!r}")
+            node[None] = compile_expansion(seq, val)
+            n += 1
+    return tries, n
+
+def load_macros(path):
+    """macros.json → ({lang: 트라이}, 항목 수). 형식 오류는 ValueError (json 오류 포함)."""
+    with open(path, encoding="utf-8") as f:
+        return build_tries(json.load(f))
+
+class MacroMatcher:
+    """트라이 위 진행 상태. 버퍼 항목은 호출자가 준 그대로 (백엔드: (mask, cnt, ts)) 돌려줌.
+    결과 목록의 원소는 (Macro|None, 항목) — None이면 그 합주를 원래 값으로 emit."""
+    __slots__ = ("tries", "policy", "timeout", "trie", "node", "buf", "term", "deadline")
+
+    def __init__(self, tries=None, policy="longest", timeout=0.6):
+        self.tries = tries or {}        # {lang: 트라이} — 비어 있으면 백엔드는 matcher를 건너뜀
+        self.policy = policy            # "longest": 더 긴 매크로를 기다림 / "shortest": 첫 확장에서 확정
+        self.timeout = timeout          # 마지막 합주 후 이 시간(초) 동안 다음 합주가 없으면 확정
+        self.buf = []
+        self._reset()
+
+    def _reset(self):
+        self.trie = self.node = None
+        self.buf = []
+        self.term = None                # (버퍼 길이, Macro) — 지금까지 지난 가장 긴 확장
+        self.deadline = 0.0
+
+    def feed(self, trie, tok, item, now):
+        """합주 하나. 소비하지 않으면 None (버퍼가 비어 있고 루트에 없는 토큰), 아니면 내보낼 목록."""
+        buf = self.buf
+        if not buf:
+            child = trie.get(tok)
+            if child is None:
+                return None
+            out = []
+        else:
+            out = [] if trie is self.trie else self.flush()
+            child = (self.node if trie is self.trie else trie).get(tok)
+            if child is None:
+                if not out:
+                    out = self.flush()
+                child = trie.get(tok)
+                if child is None:
+                    out.append((None, item))
+                    return out
+        self.buf.append(item)
+        self.trie, self.node = trie, child
+        m = child.get(None)
+        if m is not None:
+            self.term = (len(self.buf), m)
+            if len(child) == 1 or self.policy == "shortest":
+                out.append((m, item))
+                self._reset()
+                return out
+        self.deadline = now + self.timeout
+        return out
+
+    def flush(self):
+        """버퍼 정리: 가장 긴 확장 접두사 → (Macro, 그 마지막 합주), 나머지 → (None, 합주)."""
+        buf, term = self.buf, self.term
+        self._reset()
+        if term is None:
+            return [(None, x) for x in buf]
+        n, m = term
+        return [(m, buf[n - 1])] + [(None, x) for x in buf[n:]]
+
+    def expire(self, now):
+        """시간 초과면 flush() 결과, 아니면 빈 목록."""
+        if self.buf and now >= self.deadline:
+            return self.flush()
+        return []
+
+if __name__ == "__main__":
+    for p in sys.argv[1:]:
+        t0 = time.perf_counter()
+        tries, n = load_macros(p)
+        print(f"{p}: {n} macros in {', '.join(tries)} ({(time.perf_counter() - t0) * 1e3:.1f} ms)")
@@ -0,0 +1,314 @@
+# chordboard_mapping.py
+# mapping_clean.json 컴파일러
+# - (lang, layer, Fn오버레이, count, 5비트 mask) → 정수 인덱스 평면 테이블
+# - Fn→기본 폴백은 컴파일 시점에 해결 (조회는 배열 인덱스 1회)
+# - 값은 미리 정규화된 타입 액션으로 변환: TEXT / KEY / TOGGLE / CMD
+# - 두 손 교차 레이어: mode "CROSS"의 10비트 키(왼손 5비트 + 오른손 5비트, count 1만) → lang별 dict (평면 테이블 밖)
+# - 재컴파일(핫 리로드)은 원본 섹션이 바뀐 slot만: 나머지 slot 블록은 직전 테이블에서 복사
+# - 컴파일 결과 캐시(marshal): JSON 내용 해시가 맞으면 파싱·컴파일 없이 바로 로드 (빌드 시 생성 + 사용자 폴더)
+#     py -3 chordboard_mapping.py mapping_clean.json mapping_clean.bin
+# - keyboard 모듈에 의존하지 않음 (벤치마크·검증용으로 단독 import 가능)
+
+import hashlib, json, marshal, os, sys
+from collections import namedtuple
+
+# ── 액션 ───────────────────────────────────────────────────────
+A_TEXT, A_KEY, A_TOGGLE, A_CMD = range(4)
+KIND_NAMES = ("TEXT", "KEY", "TOGGLE", "CMD")
+
+# kind  : A_TEXT(한 글자 write) / A_KEY(keyboard.send 조합) / A_TOGGLE(모드 토글) / A_CMD(cmd:...)
+# value : TEXT→문자, KEY→정규화된 키 이름, TOGGLE→'shift'/'switch'/'ctrl'/'fn', CMD→명령 이름
+# arg   : CMD의 '=' 뒤 인자 (없으면 '')
+# layer : 이 값을 찾은 모드 이름 (Fn 폴백 결과 포함, 로그용)
+# raw   : 매핑 원문 값
+Action = namedtuple("Action", "kind value arg layer raw")
+
+WORDS_TO_CHARS = {"backslash": "\\"}
+TOGGLE_VALUES = {"shift": "shift", "switch": "switch", "ctrl": "ctrl", "Fn": "fn", "fn": "fn"}
+
+COUNTS = (1, 2, 3)
+CROSS = "CROSS"         # 두 손 교차 합주 섹션 이름 (bits 10자리 = 왼손 b1..b5 + 오른손 b1..b5)
+NMASK = 32              # 5비트 패턴
+SLOT_SIZE = 4 * NMASK   # count 0..3 (0은 미사용) × mask
+
+def normalize_value(v: str) -> str:
+    nv = v
+    if isinstance(nv, str) and nv.lower().startswith("window+"):
+        nv = "windows+" + nv.split("+", 1)[1]
+    if isinstance(nv, str) and nv.lower() in ("window+tap", "windows+tap"):
+        nv = "windows+tab"
+    nv = (nv
+          .replace("Arrow Left", "left")
+          .replace("Arrow Right", "right")
+          .replace("Arrow Up", "up")
+          .replace("Arrow Down", "down"))
+    return nv
+
+def compile_value(val: str, layer=None) -> Action:
+    """매핑 값 하나를 타입 액션으로 변환 (send_value()의 분기를 미리 수행)."""
+    if val in TOGGLE_VALUES:
+        return Action(A_TOGGLE, TOGGLE_VALUES[val], "", layer, val)
+    if val.startswith("cmd:"):
+        name, _, arg = val[4:].partition("=")
+        return Action(A_CMD, name.strip(), arg.strip(), layer, val)
+    raw = WORDS_TO_CHARS.get(val, val)
+    if len(raw) == 1:
+        return Action(A_TEXT, raw, "", layer, val)
+    return Action(A_KEY, normalize_value(raw), "", layer, val)
+
+# ── 비트 ↔ mask ────────────────────────────────────────────────
+# b1(엄지)이 최상위 비트: "10000" → 16
+def mask_of(bstr: str) -> int:
+    return int(bstr, 2)
+
+def bits_str(mask: int) -> str:
+    return format(mask, "05b")
+
+MASK_BITS = [[(m >> (4 - i)) & 1 for i in range(5)] for m in range(NMASK)]  # mask → [b1..b5] (공유 객체, 읽기 전용)
+POPCOUNT = tuple(bin(m).count("1") for m in range(NMASK))                  # mask → 눌린 버튼 수
+
+def bits_to_mask(bits_list) -> int:
+    return (bits_list[0] << 4) | (bits_list[1] << 3) | (bits_list[2] << 2) | (bits_list[3] << 1) | bits_list[4]
+
+# ── 컴파일 결과 ────────────────────────────────────────────────
+class CompiledMap:
+    """평면 테이블.
+
+    slot  = (lang_i * len(layers) + layer_i) * 2 + fn
+    table[(slot << 7) | (count << 5) | mask] → Action 또는 None
+    reach[(slot << 5) | mask]                → 도달 가능한 최대 count (없으면 0)
+    마지막 slot(empty_slot)은 항상 비어 있음 (알 수 없는 lang/mode용).
+    cross[lang][10비트 mask] → Action (CROSS 섹션이 있는 lang만).
+    src는 컴파일에 쓴 원본 dict, rebuilt/reused는 새로 컴파일한/복사한 slot 수.
+    """
+    __slots__ = ("langs", "layers", "lang_index", "layer_index", "table", "reach", "hints", "empty_slot",
+                 "cross", "src", "rebuilt", "reused")
+
+    def __init__(self, langs, layers):
+        self.langs = tuple(langs)
+        self.layers = tuple(layers)
+        self.lang_index = {lg: i for i, lg in enumerate(self.langs)}
+        self.layer_index = {md: i for i, md in enumerate(self.layers)}
+        self.empty_slot = len(self.langs) * len(self.layers) * 2
+        self.table = [None] * ((self.empty_slot + 1) * SLOT_SIZE)
+        self.reach = [0] * ((self.empty_slot + 1) * NMASK)
+        self.hints = {}   # 미스 인덱스 → (layer, 다른 count) : 같은 bits가 다른 count에만 있을 때
+        self.cross = {}
+        self.src = None
+        self.rebuilt = self.reused = 0
+
+    def slot(self, lang, mode, fn) -> int:
+        li = self.lang_index.get(lang)
+        mi = self.layer_index.get(mode)
+        if li is None or mi is None:
+            return self.empty_slot
+        return (li * len(self.layers) + mi) * 2 + (1 if fn else 0)
+
+    def lookup(self, lang, mode, fn, count, mask):
+        return self.table[(self.slot(lang, mode, fn) << 7) | (count << 5) | mask]
+
+    def entries(self):
+        """(lang, mode, fn, count, mask, Action) 순회 (디버깅/도구용)."""
+        for li, lg in enumerate(self.langs):
+            for mi, md in enumerate(self.layers):
+                for fn in (0, 1):
+                    base = ((li * len(self.layers) + mi) * 2 + fn) << 7
+                    for c in COUNTS:
+                        for m in range(NMASK):
+                            a = self.table[base | (c << 5) | m]
+                            if a is not None:
+                                yield lg, md, fn, c, m, a
+
+def _layer_order(raw):
+    layers = []
+    for modes in raw.values():
+        for md in modes:
+            if md not in layers and md != CROSS:
+                layers.append(md)
+    for md in ("기본", "SHIFT", "SWITCH", "Fn"):   # set_mode로 선택 가능한 모드는 항상 slot 보장
+        if md not in layers:
+            layers.append(md)
+    return layers
+
+def validate_mapping(raw):
+    """구조 검사. 문제가 있으면 ValueError (경로 포함). 핫 리로드 시 교체 전에 호출."""
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError("mapping: top level must be a non-empty object {lang: {...}}")
+    for lg, modes in raw.items():
+        if not isinstance(modes, dict):
+            raise ValueError(f"mapping[{lg!r}]: must be an object {{mode: {{...}}}}")
+        for md, groups in modes.items():
+            if not isinstance(groups, dict):
+                raise ValueError(f"mapping[{lg!r}][{md!r}]: must be an object {{count: {{...}}}}")
+            for cnt_key, group in groups.items():
+                if cnt_key not in (("1",) if md == CROSS else ("1", "2", "3")):
+                    raise ValueError(f"mapping[{lg!r}][{md!r}]: count key {cnt_key!r} is not "
+                                     + ("1 (cross chords are single taps)" if md == CROSS else "1/2/3"))
+                if not isinstance(group, dict):
+                    raise ValueError(f"mapping[{lg!r}][{md!r}][{cnt_key!r}]: must be an object {{bits: value}}")
+                for b, v in group.items():
+                    if md == CROSS:
+                        bad = len(b) != 10 or b.strip("01") or "1" not in b[:5] or "1" not in b[5:]
+                    else:
+                        bad = len(b) != 5 or b.strip("01") or b == "00000"
+                    if bad:
+                        raise ValueError(f"mapping[{lg!r}][{md!r}][{cnt_key!r}]: bad bits {b!r}"
+                                         + (" (10 bits, both hands)" if md == CROSS else ""))
+                    if not isinstance(v, str) or not v:
+                        raise ValueError(f"mapping[{lg!r}][{md!r}][{cnt_key!r}][{b!r}]: value must be a non-empty string")
+
+def compile_mapping(raw, prev=None) -> CompiledMap:
+    """{lang: {mode: {"1|2|3": {bits: value}}}} → CompiledMap
+
+    prev: 직전 CompiledMap. slot이 의존하는 원본 섹션(mode, Fn slot은 Fn도)이 prev.src와 같으면
+    그 slot의 table/reach/hints 블록을 복사하고 컴파일을 건너뜀.
+    """
+    cm = CompiledMap(raw.keys(), _layer_order(raw))
+    cm.src = raw
+    nl = len(cm.layers)
+    psrc = prev.src if prev is not None else None
+    phints = {}
+    if psrc is not None:
+        for idx, h in prev.hints.items():
+            phints.setdefault(idx >> 7, []).append((idx, h))
+    for li, lg in enumerate(cm.langs):
+        modes = raw[lg]
+        pmodes = psrc.get(lg) if psrc is not None and lg in prev.lang_index else None
+        # 레이어별 액션 캐시: 같은 값이 Fn/기본 slot 양쪽에 들어가도 한 번만 컴파일
+        compiled = {}
+        for mi, md in enumerate(cm.layers):
+            for fn in (0, 1):
+                slot = (li * nl + mi) * 2 + fn
+                order = (("Fn", md) if fn else (md,))
+                if (pmodes is not None and md in prev.layer_index
+                        and all(modes.get(d) == pmodes.get(d) for d in order)):
+                    _copy_slot(cm, slot, prev, prev.slot(lg, md, fn), phints)
+                    cm.reused += 1
+                    continue
+                for d in order:
+                    if d not in compiled:
+                        per = compiled[d] = {}
+                        for cnt_key, group in modes.get(d, {}).items():
+                            c = int(cnt_key)
+                            for b, v in group.items():
+                                per[(c, mask_of(b))] = compile_value(v, d)
+                _fill_slot(cm, slot, order, compiled)
+                cm.rebuilt += 1
+        if CROSS in modes:
+            cm.cross[lg] = {mask_of(b): compile_value(v, CROSS) for b, v in modes[CROSS].get("1", {}).items()}
+    return cm
+
+def _fill_slot(cm, slot, order, compiled):
+    base = slot << 7
+    rbase = slot << 5
+    for c in COUNTS:
+        for m in range(NMASK):
+            for mode_to_use in order:
+                a = compiled[mode_to_use].get((c, m))
+                if a is not None:
+                    cm.table[base | (c << 5) | m] = a
+                    if cm.reach[rbase | m] < c:
+                        cm.reach[rbase | m] = c
+                    break
+            else:
+                for mode_to_use in order:
+                    other = next((oc for oc in COUNTS if oc != c and (oc, m) in compiled[mode_to_use]), None)
+                    if other is not None:
+                        cm.hints[base | (c << 5) | m] = (mode_to_use, other)
+                        break
+
+def _copy_slot(cm, slot, prev, pslot, phints):
+    base, pbase = slot << 7, pslot << 7
+    cm.table[base:base + SLOT_SIZE] = prev.table[pbase:pbase + SLOT_SIZE]
+    cm.reach[slot << 5:(slot << 5) + NMASK] = prev.reach[pslot << 5:(pslot << 5) + NMASK]
+    for idx, h in phints.get(pslot, ()):
+        cm.hints[base | (idx & (SLOT_SIZE - 1))] = h
+
+def load_mapping(path, prev=None):
+    """JSON 파일 → (원본 dict, CompiledMap). 구조가 잘못됐으면 ValueError."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    validate_mapping(raw)
+    return raw, compile_mapping(raw, prev)
+
+# ── 컴파일 캐시 ────────────────────────────────────────────────
+# marshal 튜플: (CACHE_VERSION, 해시, langs, layers, 고유 액션 튜플들, table 인덱스(-1=None), reach, hints, 원본, cross)
+CACHE_VERSION = 2
+
+def mapping_digest(data: bytes) -> str:
+    """JSON 파일 바이트의 내용 해시 (캐시 키)."""
+    return hashlib.sha256(data).hexdigest()
+
+def save_compiled(cm, digest, path):
+    uniq, index, idx = [], {}, []
+    for a in cm.table:
+        if a is None:
+            idx.append(-1)
+            continue
+        i = index.get(a)
+        if i is None:
+            i = index[a] = len(uniq)
+            uniq.append(tuple(a))
+        idx.append(i)
+    cross = {lg: {m: tuple(a) for m, a in d.items()} for lg, d in cm.cross.items()}
+    blob = marshal.dumps((CACHE_VERSION, digest, cm.langs, cm.layers, tuple(uniq), idx,
+                          cm.reach, cm.hints, cm.src, cross))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)
+
+def load_compiled(path, digest):
+    """캐시 → CompiledMap. 없거나 해시/버전/크기가 안 맞으면 None."""
+    try:
+        with open(path, "rb") as f:
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 10 or data[0] != CACHE_VERSION or data[1] != digest:
+        return None
+    _, _, langs, layers, uniq, idx, reach, hints, src, cross = data
+    cm = CompiledMap(langs, layers)
+    if len(idx) != len(cm.table) or len(reach) != len(cm.reach):
+        return None
+    acts = [Action._make(t) for t in uniq]
+    cm.table = [acts[i] if i >= 0 else None for i in idx]
+    cm.reach, cm.hints, cm.src = reach, hints, src
+    cm.cross = {lg: {m: Action._make(t) for m, t in d.items()} for lg, d in cross.items()}
+    return cm
+
+def load_mapping_cached(path, caches=(), save_to=None):
+    """JSON 파일 → (원본 dict, CompiledMap, 출처). 출처는 해시가 맞은 캐시 경로 또는 "json".
+    캐시가 모두 안 맞으면 JSON을 검증·컴파일하고 save_to에 캐시를 남김 (실패해도 무시)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = mapping_digest(data)
+    for c in caches:
+        cm = load_compiled(c, digest)
+        if cm is not None:
+            return cm.src, cm, c
+    raw = json.loads(data.decode("utf-8"))
+    validate_mapping(raw)
+    cm = compile_mapping(raw)
+    if save_to:
+        try:
+            os.makedirs(os.path.dirname(save_to), exist_ok=True)
+            save_compiled(cm, digest, save_to)
+        except OSError:
+            pass
+    return raw, cm, "json"
+
+def build_cache(json_path, out_path):
+    """빌드 단계: JSON을 검증·컴파일해 캐시 파일 생성. 반환: 해시."""
+    with open(json_path, "rb") as f:
+        data = f.read()
+    raw = json.loads(data.decode("utf-8"))
+    validate_mapping(raw)
+    digest = mapping_digest(data)
+    save_compiled(compile_mapping(raw), digest, out_path)
+    return digest
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "mapping_clean.json"
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".bin"
+    print(f"{out}: {build_cache(src, out)}")
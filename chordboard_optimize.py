@@ -0,0 +1,311 @@
+# chordboard_optimize.py
+# 사용 빈도 기반 배치 최적화 — 항목별 빈도(usage.json 또는 텍스트 코퍼스)와 합주 비용 모델로
+# 글자당 기대 입력 시간을 줄이는 mapping_clean.json 재배치를 제안
+#   - 위치 = (count, bits). 비용(ms) = count × (TAP + FINGER × (눌린 버튼 수 - 1)) + 대기
+#       대기 = TAP_GAP — 같은 bits에 더 높은 count 항목이 있으면 엔진이 시리즈 만료를 기다린 뒤 확정
+#       (count ≥ min(3, 그 bits의 최대 count)면 마지막 탭에서 바로 확정 → 대기 없음)
+#   - 값은 섹션(lang, mode) 안에서만 이동. cmd:·토글(shift/switch/ctrl/Fn)·--pin 값의 위치는 고정
+#     두 손 CROSS 섹션은 다른 비용 모델이라 그대로 둠
+#   - SHIFT는 기본과 같은 교환을 함께 적용 (대소문자·된소리 쌍이 같은 합주에 유지), --no-tie로 해제
+#   - 탐색: 현재 배치에서 시작해 "가장 이득이 큰 두 위치 교환"을 반복 (--max-moves까지, 이득 < --min-gain이면 중단)
+#     → 전면 재배치 대신 적은 수의 이동으로 대부분의 이득 (다시 익힐 합주 수 제한)
+#   - 빈도: usage.json(백엔드 emit 카운터, 실제 찾은 mode 기준) 또는 --corpus 텍스트
+#     코퍼스의 한글 음절은 자모로 분해 (매핑에 없는 겹모음·겹받침은 구성 자모로), 언어·모드 전환 비용은 제외
+#
+#   py -3 chordboard_optimize.py                                   # USER_DIR/usage.json 기준, 제안만 출력
+#   py -3 chordboard_optimize.py --corpus notes.txt --out mapping_proposed.json
+#   py -3 chordboard_optimize.py --max-moves 10 --pin space --pin backspace
+
+import argparse, json, os, sys
+from collections import namedtuple
+
+import chordboard_win11 as backend
+from chordboard_hangul import CHO, JUNG, JONG, JONG_PAIR, SYLLABLE_BASE, VOWEL_PAIR
+from chordboard_mapping import CROSS, POPCOUNT, TOGGLE_VALUES, WORDS_TO_CHARS, bits_str, compile_mapping, mask_of, validate_mapping
+
+Cost = namedtuple("Cost", "tap_ms finger_ms tap_gap_ms")
+TIE = {"SHIFT": "기본"}              # 따라가는 mode → 기준 mode
+POSITIONS = [(c << 5) | m for c in (1, 2, 3) for m in range(1, 32)]   # 셀 인덱스 = count << 5 | mask
+SPECIAL_CHARS = {" ": "space", "\n": "enter", "\t": "tab"}
+MODE_ORDER = ("기본", "SHIFT", "SWITCH")   # 코퍼스 문자를 찾을 mode 우선순위 (그 외 mode는 마지막)
+
+def position_cost(cell, reach, cost):
+    cnt, mask = cell >> 5, cell & 31
+    t = cnt * (cost.tap_ms + cost.finger_ms * (POPCOUNT[mask] - 1))
+    if cnt < min(3, reach):
+        t += cost.tap_gap_ms
+    return t
+
+# ── 섹션 ───────────────────────────────────────────────────────
+class Section:
+    """(lang, mode) 하나의 배치: 셀 인덱스 → 값 / 빈도. 교환은 values·weights를 함께."""
+    __slots__ = ("lang", "mode", "values", "weights", "origin", "src")
+
+    def __init__(self, lang, mode, groups):
+        self.lang, self.mode, self.src = lang, mode, groups
+        self.values = [None] * 128
+        self.weights = [0.0] * 128
+        self.origin = list(range(128))      # 셀에 있는 값의 원래 셀 (이동 목록용)
+        for cnt_key, group in groups.items():
+            for b, v in group.items():
+                self.values[(int(cnt_key) << 5) | mask_of(b)] = v
+
+    @property
+    def name(self):
+        return f"{self.lang}/{self.mode}"
+
+    def mask_cost(self, mask, cost):
+        cells = (32 | mask, 64 | mask, 96 | mask)
+        reach = max((c >> 5 for c in cells if self.values[c] is not None), default=0)
+        return sum(self.weights[c] * position_cost(c, reach, cost) for c in cells if self.weights[c])
+
+    def swap(self, p, q):
+        for a in (self.values, self.weights, self.origin):
+            a[p], a[q] = a[q], a[p]
+
+    def to_json(self):
+        """현재 배치 → {"count": {bits: 값}} (원본의 bits 순서 유지, 새 위치는 뒤에)."""
+        out = {}
+        for c in (1, 2, 3):
+            group = {}
+            for b in self.src.get(str(c), {}):
+                v = self.values[(c << 5) | mask_of(b)]
+                if v is not None:
+                    group[b] = v
+            for m in range(31, 0, -1):
+                v = self.values[(c << 5) | m]
+                if v is not None and bits_str(m) not in group:
+                    group[bits_str(m)] = v
+            if group:
+                out[str(c)] = group
+        return out
+
+def load_sections(raw):
+    return {(lg, md): Section(lg, md, groups) for lg, modes in raw.items() for md, groups in modes.items()
+            if md != CROSS}
+
+# ── 빈도 ───────────────────────────────────────────────────────
+def weights_from_usage(sections, usage):
+    """usage {lang: {mode: {"count": {bits: n}}}} → 섹션 weights. 반환: 매핑에서 찾은 횟수."""
+    total = 0
+    for lg, modes in usage.items():
+        for md, groups in modes.items():
+            sec = sections.get((lg, md))
+            if sec is None:
+                continue
+            for cnt_key, group in groups.items():
+                for b, n in group.items():
+                    cell = (int(cnt_key) << 5) | mask_of(b)
+                    if sec.values[cell] is not None:
+                        sec.weights[cell] += n
+                        total += n
+    return total
+
+def select_usage(data, mapping_path):
+    """usage.json {매핑 경로: {...}} 에서 이 매핑의 횟수. 같은 경로가 없으면 파일 이름이 같은 것들의 합."""
+    key = os.path.abspath(mapping_path)
+    if key in data:
+        return data[key]
+    merged = {}
+    for path, langs in data.items():
+        if os.path.basename(path) != os.path.basename(mapping_path):
+            continue
+        for lg, modes in langs.items():
+            for md, groups in modes.items():
+                for cnt_key, group in groups.items():
+                    dst = merged.setdefault(lg, {}).setdefault(md, {}).setdefault(cnt_key, {})
+                    for b, n in group.items():
+                        dst[b] = dst.get(b, 0) + n
+    return merged
+
+def _split_jamo(ch):
+    """호환 자모 하나 → 입력 자모열 (겹모음·겹받침은 구성 자모로)."""
+    v = JUNG.find(ch)
+    for (a, b), j in VOWEL_PAIR.items():
+        if j == v:
+            return [JUNG[a], JUNG[b]]
+    k = JONG.find(ch)
+    for (a, b), j in JONG_PAIR.items():
+        if j == k and k > 0:
+            return [JONG[a], CHO[b]]
+    return [ch]
+
+def _keys_of(ch):
+    """코퍼스 문자 → 매핑 값 후보 목록 (한글 음절은 자모열)."""
+    code = ord(ch)
+    if SYLLABLE_BASE <= code < SYLLABLE_BASE + 11172:
+        s = code - SYLLABLE_BASE
+        jamo = [CHO[s // 588], JUNG[(s % 588) // 28]] + ([JONG[s % 28]] if s % 28 else [])
+        return [("KO", j) for j in jamo]
+    if 0x3131 <= code <= 0x318E:
+        return [("KO", ch)]
+    return [(None, SPECIAL_CHARS.get(ch, ch))]
+
+def weights_from_corpus(sections, text, cost, lang=None):
+    """텍스트 → 섹션 weights. 같은 값이 여러 곳에 있으면 MODE_ORDER가 앞선 mode, 그 안에서 현재 비용이 낮은 곳으로.
+    반환: (찾은 입력 수, 못 찾은 문자 → 횟수)."""
+    index = {}
+    for (lg, md), sec in sections.items():
+        rank = MODE_ORDER.index(md) if md in MODE_ORDER else len(MODE_ORDER)
+        reach = [0] * 32
+        for cell in POSITIONS:
+            if sec.values[cell] is not None:
+                reach[cell & 31] = max(reach[cell & 31], cell >> 5)
+        for cell in POSITIONS:
+            v = sec.values[cell]
+            if v is None:
+                continue
+            v = WORDS_TO_CHARS.get(v, v)
+            c = (rank, position_cost(cell, reach[cell & 31], cost))
+            best = index.get((lg, v))
+            if best is None or c < best[0]:
+                index[(lg, v)] = (c, sec, cell)
+    found, missing = 0, {}
+    for ch in text:
+        for lg, v in _keys_of(ch):
+            keys = [v] if (lg or lang or "EN", v) in index else _split_jamo(v)
+            for k in keys:
+                hit = index.get((lg or lang or "EN", k))
+                if hit is None:
+                    missing[k] = missing.get(k, 0) + 1
+                    continue
+                hit[1].weights[hit[2]] += 1
+                found += 1
+    return found, missing
+
+# ── 탐색 ───────────────────────────────────────────────────────
+def groups_of(sections, tie=True):
+    """함께 교환할 섹션 묶음 목록 (SHIFT는 같은 lang의 기본에 묶음). 빈도가 없는 묶음은 제외."""
+    out = []
+    for (lg, md), sec in sections.items():
+        lead = TIE.get(md) if tie else None
+        if lead is not None and (lg, lead) in sections:
+            continue
+        group = [sec] + [s for (l2, m2), s in sections.items() if tie and l2 == lg and TIE.get(m2) == md]
+        if any(any(s.weights) for s in group):
+            out.append(group)
+    return out
+
+def _fixed(group, pins):
+    fixed = set()
+    for sec in group:
+        for cell in POSITIONS:
+            v = sec.values[cell]
+            if v is not None and (v.startswith("cmd:") or v in TOGGLE_VALUES or v in pins):
+                fixed.add(cell)
+    return fixed
+
+def group_cost(group, cost):
+    return sum(sec.mask_cost(m, cost) for sec in group for m in range(1, 32))
+
+def optimize_group(group, cost, pins=(), max_moves=50, min_gain=1e-9):
+    """두 위치 교환 반복 (매 단계 최대 이득). 반환: 적용한 교환 [(p, q, 이득)]."""
+    fixed = _fixed(group, set(pins))
+    movable = [c for c in POSITIONS if c not in fixed]
+    mc = {(i, m): sec.mask_cost(m, cost) for i, sec in enumerate(group) for m in range(1, 32)}
+    swaps = []
+    while len(swaps) < max_moves:
+        best = None
+        for a, p in enumerate(movable):
+            for q in movable[a + 1:]:
+                if all(s.values[p] is None and s.values[q] is None for s in group):
+                    continue
+                masks = {p & 31, q & 31}
+                before = sum(mc[(i, m)] for i in range(len(group)) for m in masks)
+                for s in group: s.swap(p, q)
+                after = sum(s.mask_cost(m, cost) for s in group for m in masks)
+                for s in group: s.swap(p, q)
+                gain = before - after
+                if gain > min_gain and (best is None or gain > best[2]):
+                    best = (p, q, gain)
+        if best is None:
+            break
+        p, q, gain = best
+        for i, s in enumerate(group):
+            s.swap(p, q)
+            for m in {p & 31, q & 31}:
+                mc[(i, m)] = s.mask_cost(m, cost)
+        swaps.append(best)
+    return swaps
+
+def moves(sec):
+    """원래 셀 → 새 셀이 바뀐 값 [(값, 원래 셀, 새 셀, 빈도)] (빈도 내림차순)."""
+    out = [(sec.values[c], sec.origin[c], c, sec.weights[c]) for c in POSITIONS
+           if sec.values[c] is not None and sec.origin[c] != c]
+    out.sort(key=lambda x: -x[3])
+    return out
+
+def _cell(c):
+    return f"{c >> 5}/{bits_str(c & 31)}"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Propose a faster mapping from usage counts or a text corpus")
+    ap.add_argument("--mapping", default=backend.MAPPING_PATH)
+    ap.add_argument("--usage", help=f"usage counts (default {backend.USAGE_PATH})")
+    ap.add_argument("--corpus", nargs="+", metavar="FILE", help="text files to count characters from instead of usage")
+    ap.add_argument("--lang", choices=("EN", "KO"), help="layer for non-Hangul corpus characters (default EN)")
+    ap.add_argument("--out", help="write the proposed mapping here")
+    ap.add_argument("--max-moves", type=int, default=40, help="swaps per layer (default 40)")
+    ap.add_argument("--min-gain", type=float, default=0.01, help="stop when a swap saves less (ms per entry)")
+    ap.add_argument("--tap-ms", type=float, default=120.0, help="time per tap of a one-button chord")
+    ap.add_argument("--finger-ms", type=float, default=25.0, help="extra time per additional button")
+    ap.add_argument("--tap-gap", type=float, default=backend.TAP_GAP * 1e3, help="series timeout wait in ms")
+    ap.add_argument("--pin", action="append", default=[], help="keep this value where it is (repeatable)")
+    ap.add_argument("--no-tie", action="store_true", help="optimize SHIFT independently of 기본")
+    args = ap.parse_args(argv)
+    cost = Cost(args.tap_ms, args.finger_ms, args.tap_gap)
+
+    with open(args.mapping, encoding="utf-8") as f:
+        raw = json.load(f)
+    validate_mapping(raw)
+    sections = load_sections(raw)
+    if args.corpus:
+        text = ""
+        for p in args.corpus:
+            with open(p, encoding="utf-8") as f:
+                text += f.read()
+        total, missing = weights_from_corpus(sections, text, cost, args.lang)
+        print(f"corpus  {len(text):,} chars → {total:,} entries"
+              + (f"   (not in mapping: {' '.join(f'{k!r}×{n}' for k, n in sorted(missing.items(), key=lambda x: -x[1])[:10])})" if missing else ""))
+    else:
+        path = args.usage or backend.USAGE_PATH
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except OSError:
+            print(f"no usage counts at {path} (type for a while, or cmd:save_usage, or use --corpus)")
+            return 2
+        total = weights_from_usage(sections, select_usage(data, args.mapping))
+        print(f"usage  {path}: {total:,} entries")
+    if not total:
+        print("nothing to optimize")
+        return 2
+
+    groups = groups_of(sections, tie=not args.no_tie)
+    before = sum(group_cost(g, cost) for g in groups) / total
+    for group in groups:
+        g0 = group_cost(group, cost)
+        swaps = optimize_group(group, cost, args.pin, args.max_moves, args.min_gain * total)
+        if not swaps:
+            continue
+        g1 = group_cost(group, cost)
+        names = "+".join(s.name for s in group)
+        print(f"{names}: {len(swaps)} swaps, {g0 / total:.1f} → {g1 / total:.1f} ms per entry (share of total)")
+        for sec in group:
+            for v, old, new, w in moves(sec):
+                print(f"  {sec.name:10s} {v!r:18s} {_cell(old)} → {_cell(new)}   ×{w:,.0f}")
+    after = sum(group_cost(g, cost) for g in groups) / total
+    print(f"expected time per entry: {before:.1f} → {after:.1f} ms   ({(before - after) / before * 100:.1f}% faster)")
+
+    if args.out:
+        proposed = {lg: {md: sections[(lg, md)].to_json() if md != CROSS else groups for md, groups in modes.items()}
+                    for lg, modes in raw.items()}
+        validate_mapping(proposed)
+        compile_mapping(proposed)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(proposed, f, ensure_ascii=False, indent=2)
+        print(f"wrote {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# chordboard_proc.py
+# 엔진 별도 프로세스 실행 — 훅 콜백이 Tk(redraw·messagebox)와 GIL을 나누지 않도록
+#   - 엔진 프로세스: chordboard_win11 (전역 훅·worker·injector) + 제어 서버 + 상태 게시 스레드
+#   - 공유 메모리(SharedMemory) 고정 레이아웃: 키 mask(양손 10비트)/active/ctrl/fn/lang/mode/hand/마지막 emit
+#     쓰는 쪽은 엔진의 게시 스레드 하나, seq 홀수 = 쓰는 중 (seqlock, chordboard_engine과 같은 방식)
+#   - 제어: Pipe 2개 — ctl(요청/응답: run_command, set_hand, set_chord_keys, ...) / ev(엔진 → UI 이벤트)
+#   - EngineClient: UI가 쓰는 backend 모듈 인터페이스를 흉내 (UI 코드는 그대로)
+#   - fake=True: FakeKeyboard로 엔진 실행 (리눅스 등 훅 없는 환경에서 UI 테스트, feed()로 키 주입)
+#
+#   py -3 chordboard_ui_multiwin.py --engine-process     # 엔진을 별도 프로세스로
+#   python3 chordboard_ui_multiwin.py --fake-engine      # 가짜 엔진 프로세스 (리눅스)
+
+import multiprocessing as mp
+import queue, struct, sys, threading, time
+from multiprocessing import shared_memory
+
+from chordboard_engine import Snapshot
+from chordboard_mapping import POPCOUNT
+
+# seq | key_mask | active ctrl fn | last_mask | last_cnt last_miss | last_ts | lang mode hand last_value (utf-8, 0 패딩)
+#   key_mask·last_mask는 10비트 (왼손 << 5 | 오른손, 교차 합주)
+SHM_FMT = "<IH3BH2Bd16s16s8s64s"
+SHM_SIZE = struct.calcsize(SHM_FMT)
+_BODY = struct.Struct(SHM_FMT[:1] + SHM_FMT[2:])     # seq 뒤 본문
+_SEQ = struct.Struct("<I")
+_CALLABLE = "<callable>"                              # "get" 응답: 값 대신 함수임을 표시
+
+def _enc(text, n):
+    b = (text or "").encode("utf-8")[:n]
+    while True:                       # 잘린 멀티바이트 문자 제거
+        try:
+            b.decode("utf-8")
+            return b
+        except UnicodeDecodeError:
+            b = b[:-1]
+
+def _dec(b):
+    return b.rstrip(b"\0").decode("utf-8")
+
+# ── 엔진 프로세스 ──────────────────────────────────────────────
+def _publish_state(buf, backend, seq):
+    """공유 메모리에 현재 상태 기록 (seqlock). 반환: 새 seq (짝수)."""
+    last = backend.ENGINE.last
+    lm, lc, lv, lt = last if last is not None else (0, 0, None, 0.0)
+    _SEQ.pack_into(buf, 0, seq + 1)
+    _BODY.pack_into(buf, 4, backend.key_mask(), backend.active, backend.ctrl_mode, backend.fn_mode,
+                    lm, lc, last is not None and lv is None, lt,
+                    _enc(backend.lang, 16), _enc(backend.mode, 16), _enc(backend.hand, 8), _enc(lv, 64))
+    _SEQ.pack_into(buf, 0, seq + 2)
+    return seq + 2
+
+def _event_loop(backend, shm, ev_conn):
+    q = backend.subscribe_events()
+    seq = _publish_state(shm.buf, backend, 0)
+    while True:
+        item = q.get()
+        seq = _publish_state(shm.buf, backend, seq)
+        try:
+            ev_conn.send(item)
+        except (OSError, EOFError):
+            return
+
+def _control_loop(backend, ctl_conn, kb):
+    while True:
+        try:
+            op, name, args, kwargs = ctl_conn.recv()
+        except (OSError, EOFError):
+            return                                    # UI 종료
+        try:
+            if op == "call":
+                res = getattr(backend, name)(*args, **kwargs)
+            elif op == "get":
+                res = getattr(backend, name)
+                if callable(res):
+                    res = _CALLABLE
+            elif op == "latency":
+                res = getattr(backend.LATENCY, name)
+                if callable(res):
+                    res = res(*args, **kwargs)
+            elif op == "feed" and kb is not None:
+                res = kb.feed(*args)
+            else:
+                raise ValueError(f"unknown op {op!r}")
+            ctl_conn.send((True, res))
+        except Exception as e:
+            ctl_conn.send((False, f"{type(e).__name__}: {e}"))
+
+def _raise_priority():
+    """엔진 프로세스 우선순위를 한 단계 올림 (Windows: ABOVE_NORMAL_PRIORITY_CLASS)."""
+    if sys.platform != "win32":
+        return
+    try:
+        import ctypes
+        k32 = ctypes.windll.kernel32
+        k32.SetPriorityClass(k32.GetCurrentProcess(), 0x00008000)
+    except Exception:
+        pass
+
+def serve(ctl_conn, ev_conn, shm_name, fake=False):
+    """엔진 프로세스 진입점. ctl 연결이 끊기면(UI 종료) 프로세스 종료."""
+    import chordboard_win11 as backend
+    kb = None
+    if fake:
+        from chordboard_replay import FakeKeyboard
+        kb = FakeKeyboard(time.perf_counter)
+        backend.use_io(kb)
+    _raise_priority()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    threading.Thread(target=_event_loop, args=(backend, shm, ev_conn), daemon=True).start()
+    threading.Thread(target=backend.main, kwargs={"report": False}, daemon=True).start()
+    try:
+        _control_loop(backend, ctl_conn, kb)
+    finally:
+        shm.close()
+
+# ── UI 쪽 프록시 ───────────────────────────────────────────────
+class _RemoteLatency:
+    """backend.LATENCY 대체 (count·histogram 등은 엔진에서 계산)."""
+
+    def __init__(self, client):
+        self._client = client
+
+    @property
+    def count(self):
+        return self._client._request("latency", "count")
+
+    def __getattr__(self, name):
+        return lambda *a, **k: self._client._request("latency", name, a, k)
+
+class EngineClient:
+    """별도 프로세스 엔진에 붙는 backend 대용. 상태는 공유 메모리에서 직접, 나머지는 ctl 파이프로."""
+
+    def __init__(self, fake=False):
+        ctx = mp.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=SHM_SIZE)
+        self._shm.buf[:SHM_SIZE] = bytes(SHM_SIZE)
+        self._ctl, ctl_child = ctx.Pipe()
+        ev_parent, ev_child = ctx.Pipe(duplex=False)
+        self._ctl_lock = threading.Lock()
+        self._events = None
+        self.proc = ctx.Process(target=serve, args=(ctl_child, ev_child, self._shm.name, fake),
+                                name="chordboard-engine", daemon=True)
+        self.proc.start()
+        ctl_child.close(); ev_child.close()
+        self.LATENCY = _RemoteLatency(self)
+        threading.Thread(target=self._forward, args=(ev_parent,), daemon=True).start()
+
+    # 파이프
+    def _request(self, op, name, args=(), kwargs=None):
+        with self._ctl_lock:
+            self._ctl.send((op, name, tuple(args), kwargs or {}))
+            ok, res = self._ctl.recv()
+        if not ok:
+            raise RuntimeError(f"engine: {res}")
+        return res
+
+    def _forward(self, ev_conn):
+        while True:
+            try:
+                item = ev_conn.recv()
+            except (OSError, EOFError):
+                return
+            q = self._events
+            if q is not None:
+                q.put(item)
+
+    # 공유 메모리 상태
+    def _read(self):
+        buf = self._shm.buf
+        while True:
+            s = _SEQ.unpack_from(buf, 0)[0]
+            if s & 1:
+                continue
+            body = _BODY.unpack_from(buf, 4)
+            if _SEQ.unpack_from(buf, 0)[0] == s:
+                return s, body
+
+    def snapshot(self):
+        s, (keys, _, _, _, lm, lc, miss, lt, _, _, hand, lv) = self._read()
+        mask = keys >> 5 if _dec(hand) == "LEFT" else keys & 31     # 현재 손의 5비트 (엔진 스냅샷과 같은 배치)
+        last = (lm, lc, None if miss else _dec(lv), lt) if lc else None
+        return Snapshot(s, mask, POPCOUNT[mask], 0, 0, 0, 0.0, last)
+
+    def key_mask(self):
+        return self._read()[1][0]
+
+    @property
+    def active(self): return bool(self._read()[1][1])
+    @property
+    def ctrl_mode(self): return bool(self._read()[1][2])
+    @property
+    def fn_mode(self): return bool(self._read()[1][3])
+    @property
+    def lang(self): return _dec(self._read()[1][8])
+    @property
+    def mode(self): return _dec(self._read()[1][9])
+    @property
+    def hand(self): return _dec(self._read()[1][10])
+
+    # backend 함수
+    def subscribe_events(self):
+        self._events = queue.SimpleQueue()
+        return self._events
+
+    def main(self, report=True):
+        """backend.main 대용: 엔진 프로세스가 끝날 때까지 대기."""
+        self.proc.join()
+
+    def feed(self, name, event_type):
+        """(fake 엔진) 키 이벤트 주입."""
+        return self._request("feed", "", (name, event_type))
+
+    def close(self):
+        try: self._ctl.close()
+        except Exception: pass
+        self.proc.join(1.0)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        res = self._request("get", name)
+        if res == _CALLABLE:
+            return lambda *a, **k: self._request("call", name, a, k)
+        return res
+
+def start_engine(fake=False):
+    return EngineClient(fake=fake)
@@ -0,0 +1,136 @@
+# chordboard_profiles.py
+# 앱별 프로필 — 전경 창(프로세스 exe / 창 클래스)에 따라 매핑·lang·mode·hand를 자동 전환
+#   - profiles.json (USER_DIR): 이름 → {"match": [...], "mapping": 경로|null, "lang", "mode", "hand"}
+#     mapping이 null이면 기본 매핑, 상대 경로는 profiles.json 기준. 파일 순서 = 매칭 우선순위
+#   - "default" 프로필은 항상 존재 (파일에 없으면 기본 매핑만으로 생성), 매칭 없는 창은 default
+#   - LayoutCache: 매핑 경로 → (원본, CompiledMap) LRU — 전환은 참조 교체, JSON 파싱은 처음 한 번
+#   - 전경 창 조회는 교체 가능한 함수 source() → (exe 이름, 창 클래스) | None (테스트는 가짜 함수)
+#
+#   {
+#     "terminal": {"match": ["WindowsTerminal.exe", "ConsoleWindowClass"], "lang": "EN", "mode": "SWITCH"},
+#     "hwp":      {"match": ["Hwp.exe"], "mapping": "mapping_hwp.json", "lang": "KO"}
+#   }
+
+import json, os, sys
+from collections import OrderedDict, namedtuple
+
+DEFAULT = "default"
+
+# match: 소문자 exe 이름/창 클래스 튜플, mapping: 절대 경로, lang/mode/hand: None이면 유지
+Profile = namedtuple("Profile", "name match mapping lang mode hand")
+
+def load_profiles(path, default_mapping):
+    """profiles.json → {이름: Profile} (삽입 순서 유지). 파일이 없으면 default만. 형식 오류는 ValueError."""
+    profiles = {DEFAULT: Profile(DEFAULT, (), default_mapping, None, None, None)}
+    if not path or not os.path.exists(path):
+        return profiles
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError("profiles: top level must be an object")
+    base = os.path.dirname(os.path.abspath(path))
+    for name, spec in raw.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"profiles: {name!r} must be an object")
+        match = spec.get("match", [])
+        if isinstance(match, str):
+            match = [match]
+        if not all(isinstance(m, str) for m in match):
+            raise ValueError(f"profiles: {name!r} match must be a list of strings")
+        hand = spec.get("hand")
+        if hand not in (None, "LEFT", "RIGHT"):
+            raise ValueError(f"profiles: {name!r} hand must be LEFT or RIGHT")
+        mapping = spec.get("mapping")
+        mapping = os.path.join(base, mapping) if mapping else default_mapping
+        profiles[name] = Profile(name, tuple(m.lower() for m in match), mapping,
+                                 spec.get("lang"), spec.get("mode"), hand)
+    return profiles
+
+def match_index(profiles):
+    """{소문자 exe/클래스: 프로필 이름} — 앞선 프로필이 우선."""
+    index = {}
+    for p in profiles.values():
+        for m in p.match:
+            index.setdefault(m, p.name)
+    return index
+
+def match_profile(index, process, window_class):
+    return index.get((process or "").lower()) or index.get((window_class or "").lower()) or DEFAULT
+
+class LayoutCache:
+    """매핑 경로 → loader(경로) 결과의 LRU (최대 size개). 호출은 한 번에 한 스레드."""
+
+    def __init__(self, size, loader):
+        self.size = max(1, size)
+        self.loader = loader
+        self._d = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, path):
+        v = self._d.get(path)
+        if v is not None:
+            self._d.move_to_end(path)
+            self.hits += 1
+            return v
+        self.misses += 1
+        v = self.loader(path)           # 실패(OSError/ValueError)는 호출자에게
+        self.put(path, v)
+        return v
+
+    def peek(self, path):
+        return self._d.get(path)
+
+    def put(self, path, value):
+        self._d[path] = value
+        self._d.move_to_end(path)
+        while len(self._d) > self.size:
+            self._d.popitem(last=False)
+
+    def __len__(self):
+        return len(self._d)
+
+# ── 전경 창 ────────────────────────────────────────────────────
+class Win32Foreground:
+    """GetForegroundWindow → (exe 이름, 창 클래스). 같은 창이면 이전 결과 재사용."""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ct, self._wt = ctypes, wintypes
+        self._u32 = ctypes.windll.user32
+        self._k32 = ctypes.windll.kernel32
+        self._u32.GetForegroundWindow.restype = ctypes.c_void_p
+        self._k32.OpenProcess.restype = ctypes.c_void_p
+        self._hwnd = None
+        self._last = None
+
+    def __call__(self):
+        ct, u32, k32 = self._ct, self._u32, self._k32
+        hwnd = u32.GetForegroundWindow()
+        if not hwnd:
+            return None
+        if hwnd == self._hwnd:
+            return self._last
+        buf = ct.create_unicode_buffer(260)
+        u32.GetClassNameW(ct.c_void_p(hwnd), buf, 260)
+        cls = buf.value
+        pid = self._wt.DWORD()
+        u32.GetWindowThreadProcessId(ct.c_void_p(hwnd), ct.byref(pid))
+        exe = ""
+        h = k32.OpenProcess(0x1000, False, pid.value)       # PROCESS_QUERY_LIMITED_INFORMATION
+        if h:
+            size = self._wt.DWORD(260)
+            if k32.QueryFullProcessImageNameW(ct.c_void_p(h), 0, buf, ct.byref(size)):
+                exe = os.path.basename(buf.value)
+            k32.CloseHandle(ct.c_void_p(h))
+        self._hwnd, self._last = hwnd, (exe, cls)
+        return self._last
+
+def foreground_source():
+    """플랫폼 기본 전경 창 조회 함수. 지원하지 않으면 None (자동 전환 없음)."""
+    if sys.platform != "win32":
+        return None
+    try:
+        return Win32Foreground()
+    except Exception:
+        return None
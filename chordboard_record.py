@@ -0,0 +1,353 @@
+# chordboard_record.py
+# 세션 녹화 — 합주 키 누름/뗌과 emit을 고정 크기 바이너리 레코드로 mmap 파일에 추가 (opt-in, cmd:record=on)
+#   - 레코드 16바이트 "<QBBHI": t_ns(백엔드 clock, 단조 ns) kind key slot value
+#       DOWN/UP  : key = 키 인덱스(0..4 = 버튼1..5) | 8(왼손) | 16(그 손 롤링 인식) | 64(두 손 모드),
+#                  value = 이벤트 뒤 10비트 키 마스크 (왼손 << 5 | 오른손)
+#       EMIT/MISS: key = count, value = 테이블 인덱스 (slot << 7 | count << 5 | mask)
+#       CROSS/CROSS_MISS: key = 1, value = 10비트 교차 합주 mask / MACRO: key = count, value = 마지막 합주 토큰
+#     slot = 그 시각의 CompiledMap slot (lang·mode·Fn) — 파일 헤더의 langs/layers로 해석
+#   - 파일: 헤더 4096바이트(매직 + JSON 메타: 매핑 경로·langs·layers·손별 키 이름·DEBOUNCE/TAP_GAP) + 레코드,
+#     크기 고정(미리 0으로 채움, kind 0 = 끝). 차면 다음 파일로 (다음 파일은 백그라운드 스레드가 미리 생성 →
+#     훅에서는 참조 교체만), 파일 수가 max_files를 넘으면 오래된 것부터 삭제. 이름 = prefix-시작시각-번호.cbr
+#   - add()는 pack_into 한 번 (호출자가 직렬화 — 백엔드는 _cv 보유). 다음 파일이 아직 없으면 버리고 dropped 증가
+#   - 읽기: 청크(64K 레코드) 단위 iter_unpack으로 스트리밍 (몇 시간 분량도 메모리 일정)
+#
+#   python3 chordboard_record.py rec/*.cbr                       # 요약 (프레스 skew·hold, 값별 횟수·MISS)
+#   python3 chordboard_record.py rec/*.cbr --timeline | less     # 이벤트 타임라인
+#   python3 chordboard_record.py rec/*.cbr --trace out.txt       # 리플레이 트레이스 (chordboard_replay / chordboard_sweep 입력)
+
+import argparse, glob, json, mmap, os, struct, sys, threading, time
+from collections import namedtuple
+
+MAGIC = b"CBREC\x00\x01\x00"
+HEADER_SIZE = 4096
+REC = struct.Struct("<QBBHI")
+K_DOWN, K_UP, K_EMIT, K_MISS, K_CROSS, K_CROSS_MISS, K_MACRO = range(1, 8)
+KIND_NAMES = {K_DOWN: "d", K_UP: "u", K_EMIT: "EMIT", K_MISS: "MISS", K_CROSS: "CROSS", K_CROSS_MISS: "CROSS_MISS",
+              K_MACRO: "MACRO"}
+KEY_LEFT = 8
+KEY_ROLL = 16
+KEY_TWO_HANDS = 64
+
+Record = namedtuple("Record", "t_ns kind key slot value")
+
+# ── 쓰기 ───────────────────────────────────────────────────────
+class Recorder:
+    """고정 크기 mmap 파일들에 레코드 추가. meta(): 새 파일 헤더에 넣을 dict (백그라운드 스레드에서 호출)."""
+    __slots__ = ("dir", "prefix", "size", "max_files", "meta", "mm", "pos", "end", "files", "written", "dropped",
+                 "_f", "_path", "_next", "_retired", "_wake", "_closed", "_seq", "_thread")
+
+    def __init__(self, dirpath, file_bytes, max_files, meta, prefix="session"):
+        os.makedirs(dirpath, exist_ok=True)
+        self.dir, self.size, self.max_files, self.meta = dirpath, max(file_bytes, HEADER_SIZE + REC.size), max_files, meta
+        self.prefix = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.files = []                 # 이번 녹화가 만든 파일 경로
+        self.written = self.dropped = 0
+        self._seq = 0
+        self._retired = None
+        self._closed = False
+        self.mm, self._f, self._path = self._create()
+        self.pos, self.end = HEADER_SIZE, self.size - REC.size
+        self._next = self._create()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chordboard-record", daemon=True)
+        self._thread.start()
+        self._wake.set()                # 시작 시 오래된 파일 정리
+
+    def _create(self):
+        self._seq += 1
+        path = os.path.join(self.dir, f"{self.prefix}-{self._seq:03d}.cbr")
+        f = open(path, "w+b")
+        f.truncate(self.size)
+        mm = mmap.mmap(f.fileno(), self.size)
+        meta = dict(self.meta(), start=time.time(), part=self._seq)
+        blob = json.dumps(meta, ensure_ascii=False).encode("utf-8")[:HEADER_SIZE - len(MAGIC) - 4]
+        mm[:len(MAGIC)] = MAGIC
+        struct.pack_into("<I", mm, len(MAGIC), len(blob))
+        mm[len(MAGIC) + 4:len(MAGIC) + 4 + len(blob)] = blob
+        self.files.append(path)
+        return mm, f, path
+
+    def add(self, t, kind, key, slot, value):
+        """레코드 하나 (t: 백엔드 clock() 초). 호출자가 직렬화."""
+        pos = self.pos
+        if pos > self.end:
+            nxt = self._next
+            if nxt is None:             # 다음 파일 준비 전 → 버림
+                self.dropped += 1
+                return
+            self._retired = (self.mm, self._f, pos)
+            self.mm, self._f, self._path = nxt
+            self._next = None
+            self._wake.set()
+            pos = HEADER_SIZE
+        REC.pack_into(self.mm, pos, int(t * 1e9), kind, key, slot, value)
+        self.pos = pos + 16
+        self.written += 1
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            retired, self._retired = self._retired, None
+            if retired is not None:
+                _close_file(*retired)
+            if self._closed:
+                return
+            if self._next is None:
+                self._next = self._create()
+            self._prune()
+
+    def _prune(self):
+        """이 디렉터리의 .cbr이 max_files개를 넘으면 오래된 것(이름순)부터 삭제. 쓰는 중인 파일은 제외."""
+        keep = {self._path} | ({self._next[2]} if self._next is not None else set())
+        paths = sorted(glob.glob(os.path.join(self.dir, "*.cbr")))
+        for p in paths[:max(0, len(paths) - self.max_files)]:
+            if p not in keep:
+                try: os.remove(p)
+                except OSError: pass
+
+    def close(self):
+        """녹화 종료: 현재 파일은 쓴 만큼으로 자르고, 쓰지 않은 다음 파일은 삭제. 호출자가 직렬화."""
+        self._closed = True
+        self._wake.set()
+        self._thread.join(5.0)
+        if self._next is not None:
+            mm, f, path = self._next
+            self._next = None
+            _close_file(mm, f, HEADER_SIZE)
+            try: os.remove(path)
+            except OSError: pass
+            self.files.remove(path)
+        _close_file(self.mm, self._f, self.pos)
+
+def _close_file(mm, f, used):
+    """mmap을 닫고 파일을 쓴 길이로 자름 (Windows는 매핑을 닫은 뒤에만 truncate 가능)."""
+    try:
+        mm.flush()
+        mm.close()
+        f.truncate(used)
+    finally:
+        f.close()
+
+# ── 읽기 ───────────────────────────────────────────────────────
+def read_header(path):
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if head[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: not a chordboard recording")
+    n = struct.unpack_from("<I", head, len(MAGIC))[0]
+    return json.loads(head[len(MAGIC) + 4:len(MAGIC) + 4 + n].decode("utf-8"))
+
+READ_CHUNK = REC.size << 16
+
+def iter_records(path):
+    """파일 하나의 레코드를 순서대로 (Record). 청크 단위로 읽어 스트리밍."""
+    make = Record._make
+    with open(path, "rb") as f:
+        f.seek(HEADER_SIZE)
+        while True:
+            buf = f.read(READ_CHUNK)
+            buf = buf[:len(buf) - len(buf) % REC.size]
+            if not buf:
+                return
+            for r in REC.iter_unpack(buf):
+                if not r[1]:
+                    return
+                yield make(r)
+
+def open_session(paths):
+    """여러 파일 → (첫 파일 메타, 레코드 반복자). 헤더의 시작 시각·번호 순으로 이어 붙임."""
+    metas = sorted(((read_header(p), p) for p in paths), key=lambda mp: (mp[0].get("start", 0), mp[0].get("part", 0)))
+    if not metas:
+        raise ValueError("no recordings")
+    def gen():
+        for _, p in metas:
+            yield from iter_records(p)
+    return metas[0][0], gen()
+
+def slot_name(meta, slot):
+    """slot → (lang, layer, fn) (범위 밖 = None)."""
+    langs, layers = meta["langs"], meta["layers"]
+    nl = len(layers)
+    li, rest = divmod(slot, 2 * nl)
+    if li >= len(langs):
+        return None
+    return langs[li], layers[rest >> 1], rest & 1
+
+def key_name(meta, key):
+    hand = "LEFT" if key & KEY_LEFT else "RIGHT"
+    names = meta["keys"][hand]
+    i = key & 7
+    return names[i] if i < len(names) else f"{hand[0]}{i + 1}"
+
+def _decoder(meta, mapping=None):
+    """값 해석기: (kind, key, value) → (bits, count, 값 원문|None). 매핑을 못 읽으면 값은 None."""
+    from chordboard_mapping import bits_str, compile_mapping
+    cm = None
+    path = mapping or meta.get("mapping")
+    try:
+        with open(path, encoding="utf-8") as f:
+            cm = compile_mapping(json.load(f))
+    except (OSError, ValueError, TypeError):
+        pass
+    def decode(kind, key, value, lang):
+        if kind in (K_CROSS, K_CROSS_MISS):
+            act = cm.cross.get(lang, {}).get(value) if cm is not None and kind == K_CROSS else None
+            return bits_str(value), 1, (act.raw if act is not None else None)
+        if kind == K_MACRO:
+            return bits_str(value & 31), key, None
+        act = cm.table[value] if cm is not None and kind == K_EMIT and value < len(cm.table) else None
+        return bits_str(value & 31), key, (act.raw if act is not None else None)
+    return decode
+
+def timeline(meta, records, mapping=None):
+    """레코드 → 사람이 읽는 줄 (시각은 첫 레코드 기준 ms)."""
+    decode = _decoder(meta, mapping)
+    t0 = None
+    for r in records:
+        if t0 is None:
+            t0 = r.t_ns
+        t = (r.t_ns - t0) / 1e6
+        where = slot_name(meta, r.slot)
+        lang = where[0] if where else "?"
+        layer = (f"{where[0]}/{'Fn → ' if where[2] else ''}{where[1]}") if where else f"slot {r.slot}"
+        if r.kind in (K_DOWN, K_UP):
+            keys = f"{r.value >> 5:05b} {r.value & 31:05b}" if r.key & KEY_TWO_HANDS else f"{(r.value >> 5) | (r.value & 31):05b}"
+            yield f"{t:12.3f}  {KIND_NAMES[r.kind]} {key_name(meta, r.key):6s} keys={keys}  {layer}"
+        else:
+            bits, cnt, val = decode(r.kind, r.key, r.value, lang)
+            shown = val if val is not None else ("(MISS)" if r.kind in (K_MISS, K_CROSS_MISS) else "?")
+            yield f"{t:12.3f}  → {KIND_NAMES[r.kind]:5s} {bits} cnt={cnt}  {shown}  {layer}"
+
+def _pct(vals, p):
+    if not vals:
+        return 0.0
+    vals.sort()
+    return vals[min(len(vals) - 1, int(len(vals) * p / 100))]
+
+def summarize(meta, records, mapping=None):
+    """프레스(한 손이 0 → 눌림 → 0) 단위 통계와 값별 emit 횟수. 반환 dict."""
+    decode = _decoder(meta, mapping)
+    debounce_ns = meta.get("debounce", 0.02) * 1e9
+    press = {}                          # 손 → [첫 누름, 마지막 누름, 누른 키 수, DEBOUNCE 이상 간격이 있었나]
+    skew, hold, keys_per = [], [], []
+    split = 0                           # 누름 사이 간격이 DEBOUNCE 이상 = 도중에 캡처되어 쪼개질 수 있는 프레스
+    values = {}                         # (layer, bits, cnt, 값) → 횟수
+    n = downs = emits = misses = 0
+    first = last = None
+    for r in records:
+        n += 1
+        if first is None:
+            first = r.t_ns
+        last = r.t_ns
+        if r.kind in (K_DOWN, K_UP):
+            hand = r.key & KEY_LEFT
+            if r.key & KEY_TWO_HANDS:
+                own = (r.value >> 5) if hand else (r.value & 31)
+            else:
+                own = (r.value >> 5) | (r.value & 31)
+            p = press.get(hand)
+            if r.kind == K_DOWN:
+                downs += 1
+                if p is None:
+                    press[hand] = [r.t_ns, r.t_ns, 1, False]
+                else:
+                    p[3] = p[3] or r.t_ns - p[1] >= debounce_ns
+                    p[1] = r.t_ns
+                    p[2] += 1
+            elif p is not None and not own:
+                skew.append((p[1] - p[0]) / 1e6)
+                hold.append((r.t_ns - p[1]) / 1e6)
+                keys_per.append(p[2])
+                split += p[3]
+                del press[hand]
+            continue
+        emits += 1
+        misses += r.kind in (K_MISS, K_CROSS_MISS)
+        where = slot_name(meta, r.slot)
+        bits, cnt, val = decode(r.kind, r.key, r.value, where[0] if where else "")
+        layer = "CROSS" if r.kind in (K_CROSS, K_CROSS_MISS) else (f"{where[0]}/{where[1]}" if where else "?")
+        k = (layer, bits, cnt, val if val is not None else ("(MISS)" if r.kind in (K_MISS, K_CROSS_MISS) else "?"))
+        values[k] = values.get(k, 0) + 1
+    return {
+        "records": n, "downs": downs, "emits": emits, "misses": misses, "presses": len(skew), "split_risk": split,
+        "span_s": (last - first) / 1e9 if n else 0.0,
+        "skew_ms": (_pct(skew, 50), _pct(skew, 95), max(skew, default=0.0)),
+        "hold_ms": (_pct(hold, 50), _pct(hold, 95)),
+        "keys_per_press": sum(keys_per) / len(keys_per) if keys_per else 0.0,
+        "values": values,
+    }
+
+def export_trace(meta, records, mapping=None):
+    """레코드 → chordboard_replay.Trace (손·두 손·lang·mode·Fn 변화는 지시로, emit은 기대값으로).
+    매크로 emit은 기대값에서 빠짐 (매크로 파일은 녹화에 없음) — 반환: (Trace, 뺀 매크로 수)."""
+    from chordboard_replay import MISS, Trace
+    decode = _decoder(meta, mapping)
+    items, expect = [], []
+    state = {}
+    t0 = None
+    macros = 0
+    def directive(t, name, arg):
+        if state.get(name) != arg:
+            state[name] = arg
+            items.append((t, "@", (name, arg)))
+    for r in records:
+        if t0 is None:
+            t0 = r.t_ns
+        t = (r.t_ns - t0) / 1e6
+        where = slot_name(meta, r.slot)
+        if r.kind in (K_DOWN, K_UP):
+            if where is not None:
+                directive(t, "lang", where[0])
+                directive(t, "mode", where[1])
+                directive(t, "fn", "on" if where[2] else "off")
+            if r.key & KEY_TWO_HANDS:
+                directive(t, "two_hands", "on")
+            else:
+                directive(t, "two_hands", "off")
+                directive(t, "hand", "LEFT" if r.key & KEY_LEFT else "RIGHT")
+                directive(t, "roll", "on" if r.key & KEY_ROLL else "off")
+            items.append((t, "d" if r.kind == K_DOWN else "u", key_name(meta, r.key)))
+        elif r.kind == K_MACRO:
+            macros += 1
+        else:
+            bits, cnt, val = decode(r.kind, r.key, r.value, where[0] if where else "")
+            expect.append((bits, cnt, MISS if r.kind in (K_MISS, K_CROSS_MISS) else (val if val is not None else "?")))
+    return Trace(items, expect), macros
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Decode chordboard session recordings (.cbr)")
+    ap.add_argument("files", nargs="+", help=".cbr files of one session (any order)")
+    ap.add_argument("--mapping", help="mapping JSON to decode values (default: path stored in the header)")
+    ap.add_argument("--timeline", action="store_true", help="print every event")
+    ap.add_argument("--trace", metavar="OUT", help="write a chordboard_replay trace")
+    ap.add_argument("--top", type=int, default=20, help="values shown in the summary")
+    args = ap.parse_args(argv)
+
+    meta, records = open_session(args.files)
+    if args.timeline:
+        for line in timeline(meta, records, args.mapping):
+            print(line)
+        return 0
+    if args.trace:
+        from chordboard_replay import write_trace
+        tr, macros = export_trace(meta, records, args.mapping)
+        write_trace(tr, args.trace)
+        print(f"wrote {args.trace}: {len(tr.items)} items, {len(tr.expect)} expected emits"
+              + (f" ({macros} macro emits left out)" if macros else ""))
+        return 0
+    s = summarize(meta, records, args.mapping)
+    print(f"{len(args.files)} file(s), {s['records']:,} records over {s['span_s'] / 60:.1f} min "
+          f"(DEBOUNCE {meta.get('debounce', 0) * 1e3:.0f} ms, TAP_GAP {meta.get('tap_gap', 0) * 1e3:.0f} ms)")
+    print(f"  key downs {s['downs']:,}   presses {s['presses']:,}   emits {s['emits']:,}   MISS {s['misses']:,}")
+    print(f"  press skew (first → last key down) p50 {s['skew_ms'][0]:.1f}  p95 {s['skew_ms'][1]:.1f}  max {s['skew_ms'][2]:.1f} ms"
+          f"   keys/press {s['keys_per_press']:.2f}")
+    print(f"  hold (last down → release)         p50 {s['hold_ms'][0]:.1f}  p95 {s['hold_ms'][1]:.1f} ms")
+    print(f"  presses with a ≥ DEBOUNCE gap between key downs (may split into two chords): {s['split_risk']:,}")
+    for (layer, bits, cnt, val), k in sorted(s["values"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {k:8,}  {layer:12s} {bits} cnt={cnt}  {val}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
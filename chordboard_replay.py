@@ -0,0 +1,368 @@
+# chordboard_replay.py
+# 헤드리스 리플레이 하니스 — Windows 훅 없이 합주 상태머신(전역 훅/worker/emit)을 구동
+#   - FakeKeyboard : keyboard 모듈 호환 인메모리 입출력 (훅 등록·주입 기록)
+#   - VirtualClock : 가상 시계 (DEBOUNCE/TAP_GAP 데드라인을 실제로 기다리지 않음)
+#   - 트레이스 포맷(텍스트, 한 줄 = 한 항목):
+#       # 주석
+#       @hand RIGHT | @lang EN | @mode 기본 | @fn on      ← 상태 지시 (직전 이벤트 시각에 적용, 주로 헤더)
+#       @roll on                                        ← 현재 손의 롤링 합주 인식
+#       @two_hands on                                   ← 두 손 동시 모드 (양손 키 이름 그대로, 교차 합주 기대값은 10비트)
+#       @speculate on                                   ← 잠정 출력 (기대값은 그대로 최종 확정 값, 주입은 kb.output)
+#       @profile hwp | @focus Hwp.exe HwpFrame           ← 프로필 지정 / 가짜 전경 창 (exe [창 클래스])
+#       @macros macros.json                             ← 합주열 매크로 로드 (기본은 매크로 없음, 기대값은 매크로 원문)
+#       12.5 d 7                                        ← <ms> d|u <키 이름>
+#       900.0 @ mode SHIFT                              ← <ms> @ <지시> <인자> (시각 지정 상태 지시)
+#       = 01100 1 t                                     ← 기대 emit: <bits> <count> <값|(MISS)>
+#   - replay(): 트레이스 재생 후 emit 결과를 기대값과 비교
+#
+#   py -3 chordboard_replay.py trace.txt [...]           # 검증 (불일치 시 exit 1)
+#   py -3 chordboard_replay.py --generate 1000 out.txt   # 합성 트레이스 생성
+#   py -3 chordboard_replay.py --generate 1000 out.txt --rolling   # 롤링(겹쳐 누르기) 타이핑 트레이스
+
+import argparse, contextlib, os, random, sys
+from collections import namedtuple
+
+import chordboard_win11 as backend
+from chordboard_mapping import A_CMD, A_TOGGLE, MASK_BITS, bits_str, compile_mapping
+
+MISS = "(MISS)"
+
+# ── 가짜 입출력 ────────────────────────────────────────────────
+FakeEvent = namedtuple("FakeEvent", "name event_type scan_code time")
+
+class FakeKeyboard:
+    """chordboard_win11이 쓰는 keyboard API의 인메모리 구현. 주입된 출력은 self.output에 쌓임."""
+
+    def __init__(self, clock=None):
+        self.clock = clock or (lambda: 0.0)
+        self.output = []            # ("write", text) / ("send", combo)
+        self._key_hooks = {}        # handle → (name, event_type, callback)
+        self._hooks = {}            # handle → callback (전역 훅)
+        self._next_handle = 0
+        self._scan = {}
+
+    # 훅 등록
+    def _add(self, table, value):
+        self._next_handle += 1
+        table[self._next_handle] = value
+        return self._next_handle
+
+    def on_press_key(self, key, callback, suppress=False):
+        return self._add(self._key_hooks, (key, "down", callback))
+
+    def on_release_key(self, key, callback, suppress=False):
+        return self._add(self._key_hooks, (key, "up", callback))
+
+    def hook(self, callback, suppress=False, on_remove=None):
+        return self._add(self._hooks, callback)
+
+    def unhook(self, handle):
+        self._key_hooks.pop(handle, None)
+        self._hooks.pop(handle, None)
+
+    def unhook_all(self):
+        self._key_hooks.clear(); self._hooks.clear()
+
+    def add_hotkey(self, hotkey, callback, *args, **kwargs):
+        return None
+
+    def suppress_event(self):
+        pass
+
+    def key_to_scan_codes(self, key):
+        if key not in self._scan:
+            self._scan[key] = (len(self._scan) + 1,)
+        return self._scan[key]
+
+    def wait(self, *args, **kwargs):
+        pass
+
+    # 출력
+    def write(self, text, *args, **kwargs):
+        self.output.append(("write", text))
+
+    def send(self, combo, *args, **kwargs):
+        self.output.append(("send", combo))
+
+    # 입력 주입
+    def feed(self, name, event_type):
+        ev = FakeEvent(name, event_type, self.key_to_scan_codes(name)[0], self.clock())
+        for cb in list(self._hooks.values()):
+            cb(ev)
+        for key, et, cb in list(self._key_hooks.values()):
+            if key == name and et == event_type:
+                cb(ev)
+
+class VirtualClock:
+    """backend.clock 대체. t(초)는 리플레이가 직접 진행시킴."""
+    __slots__ = ("t",)
+
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+# ── 트레이스 ───────────────────────────────────────────────────
+Trace = namedtuple("Trace", "items expect")   # items: [(t_ms, 'd'|'u'|'@', key_or_directive)], expect: [(bits, cnt, value)]
+
+def parse_trace(lines):
+    items, expect = [], []
+    last_t = 0.0
+    for ln in lines:
+        ln = ln.rstrip("\r\n")
+        if not ln.strip() or ln.lstrip().startswith("#"):
+            continue
+        if ln.startswith("@"):
+            name, _, arg = ln[1:].partition(" ")
+            items.append((last_t, "@", (name.strip(), arg.strip())))
+        elif ln.startswith("="):
+            b, c, v = ln[1:].strip().split(" ", 2)
+            expect.append((b, int(c), v))
+        else:
+            t, ev, key = ln.split(" ", 2)
+            last_t = float(t)
+            if ev == "@":
+                name, _, arg = key.partition(" ")
+                items.append((last_t, "@", (name.strip(), arg.strip())))
+            elif ev in ("d", "u"):
+                items.append((last_t, ev, key))
+            else:
+                raise ValueError(f"bad event type {ev!r} in line {ln!r}")
+    return Trace(items, expect)
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_trace(f)
+
+def write_trace(trace, path_or_file):
+    own = isinstance(path_or_file, str)
+    f = open(path_or_file, "w", encoding="utf-8") if own else path_or_file
+    try:
+        f.write("# chordboard trace v1\n")
+        for t, ev, key in trace.items:
+            if ev == "@":
+                f.write(f"{t:.3f} @ {key[0]} {key[1]}\n")
+            else:
+                f.write(f"{t:.3f} {ev} {key}\n")
+        for b, c, v in trace.expect:
+            f.write(f"= {b} {c} {v}\n")
+    finally:
+        if own: f.close()
+
+# ── 재생 ───────────────────────────────────────────────────────
+Result = namedtuple("Result", "events emits got mismatches kb")
+
+def _apply_directive(name, arg):
+    if name == "hand":
+        backend.set_hand(arg.upper())
+    elif name == "lang":
+        backend.run_command(f"set_lang={arg}")
+    elif name == "mode":
+        backend.run_command(f"set_mode={arg}")
+    elif name == "fn":
+        if (arg.lower() in ("1", "on", "true")) != backend.fn_mode:
+            backend.run_command("toggle_fn")
+    elif name == "ctrl":
+        if (arg.lower() in ("1", "on", "true")) != backend.ctrl_mode:
+            backend.run_command("toggle_ctrl")
+    elif name == "roll":
+        backend.set_roll(arg.lower() in ("1", "on", "true"))
+    elif name == "two_hands":
+        backend.set_two_hands(arg.lower() in ("1", "on", "true"))
+    elif name == "speculate":
+        backend.set_speculate(arg.lower() in ("1", "on", "true"))
+    elif name == "profile":
+        backend.set_profile(arg)
+    elif name == "focus":
+        exe, _, cls = arg.partition(" ")
+        fg = (exe, cls)
+        backend.FOREGROUND_SOURCE = lambda: fg     # 다음 합주 시작 때 프로필 확인
+    elif name == "macros":
+        if backend.load_macros_file(arg) is None:
+            raise ValueError(f"@macros: cannot load {arg!r}")
+    else:
+        raise ValueError(f"unknown directive @{name}")
+
+def _reset_backend(kb, clock):
+    backend.use_io(kb, clock)
+    backend.set_active(False)
+    backend.FOREGROUND_SOURCE = backend._fg_key = None
+    backend.MACRO.flush()
+    backend.MACRO.tries = {}
+    if backend.profile != "default":
+        backend.set_profile("default")
+    backend.lang, backend.mode = backend.CMAP.langs[0], "기본"
+    backend.fn_mode = backend.ctrl_mode = False
+    backend._refresh_reach()
+    for h in backend.ROLL_MODE:
+        backend.ROLL_MODE[h] = False
+    backend.two_hands = False
+    backend.SPECULATE = False
+    backend.set_hand(backend.DEFAULT_HAND)
+    backend.LATENCY.clear()
+    backend.set_active(True)
+
+def replay(trace, quiet=True):
+    """트레이스를 가상 시계로 재생. 반환 Result(got: [(bits, cnt, value)], mismatches: [(i, 기대, 실제)])."""
+    clock = VirtualClock()
+    kb = FakeKeyboard(clock)
+    got = []
+    old_io = (backend.keyboard, backend.clock)
+    old_fg = backend.FOREGROUND_SOURCE
+    old_macros = backend.MACRO.tries
+    had_hook = backend.HOOK is not None
+    old_hook = backend.emit_hook
+    backend.emit_hook = lambda mask, cnt, act: got.append((bits_str(mask), cnt, act.raw if act is not None else MISS))
+    out = open(os.devnull, "w", encoding="utf-8") if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(out):
+            _reset_backend(kb, clock)
+            pump = backend.pump
+            deadline = pump()
+            n_events = 0
+            for t_ms, ev, key in trace.items:
+                t = t_ms / 1000.0
+                # 이 이벤트 전에 도래하는 데드라인을 순서대로 처리 (worker 역할)
+                while deadline is not None and deadline <= t:
+                    clock.t = max(clock.t, deadline)
+                    deadline = pump()
+                clock.t = max(clock.t, t)
+                if ev == "@":
+                    _apply_directive(*key)
+                else:
+                    kb.feed(key, "down" if ev == "d" else "up")
+                    n_events += 1
+                deadline = pump()
+                if not quiet: backend.LOG.flush()
+            while deadline is not None:
+                clock.t = max(clock.t, deadline)
+                deadline = pump()
+            backend.set_active(False)
+            if not quiet: backend.LOG.flush()
+    finally:
+        backend.emit_hook = old_hook
+        backend._remove_hook()
+        backend.keyboard, backend.clock = old_io
+        backend.FOREGROUND_SOURCE = old_fg
+        backend.MACRO.flush()
+        backend.MACRO.tries = old_macros
+        if had_hook: backend._install_hook()
+        if quiet: out.close()
+    mismatches = []
+    for i in range(max(len(trace.expect), len(got)) if trace.expect else 0):
+        e = trace.expect[i] if i < len(trace.expect) else None
+        g = got[i] if i < len(got) else None
+        if e != g:
+            mismatches.append((i, e, g))
+    return Result(n_events, len(got), got, mismatches, kb)
+
+# ── 합성 트레이스 ──────────────────────────────────────────────
+def _eligible(cm, lang, layer, fn):
+    """상태를 바꾸지 않는 (mask, count, value) 후보 — TOGGLE/CMD 제외."""
+    slot = cm.slot(lang, layer, fn)
+    out = []
+    for c in (1, 2, 3):
+        for m in range(1, 32):
+            a = cm.table[(slot << 7) | (c << 5) | m]
+            if a is not None and a.kind not in (A_TOGGLE, A_CMD):
+                out.append((m, c, a.raw))
+    return out
+
+def generate_trace(n_chords, seed=1, raw_map=None, hand=None, layers=None, segment=200, rolling=False):
+    """모든 (lang, layer, fn) 조합을 segment 단위로 돌며 n_chords개 시리즈(멀티탭 포함)를 생성.
+    타이밍: 키 누름/뗌 0~8ms 분산, 홀드 35~80ms, 같은 시리즈 탭 간격 60~150ms,
+    시리즈 간 간격은 다음 패턴이 같으면 TAP_GAP 초과, 다르면 40ms~(끼어들기 경로 포함).
+    rolling=True: 다음 패턴이 다르면 이전 시리즈 마지막 탭을 떼는 시점(±10ms)에 다음 합주를 누름
+    (겹치는 키는 뗀 뒤 2~6ms에 다시 누름). 트레이스 헤더에 @roll on."""
+    rnd = random.Random(seed)
+    pick = random.Random(seed)      # 패턴 선택은 타이밍과 별도 → 같은 seed면 rolling 여부와 무관하게 같은 합주열
+    cm = compile_mapping(raw_map) if raw_map is not None else backend.CMAP
+    hand = hand or backend.DEFAULT_HAND
+    keys = backend.RIGHT_CHORD_KEYS if hand == "RIGHT" else backend.LEFT_CHORD_KEYS
+    combos = layers or [(lg, md, fn) for lg in cm.langs for md in ("기본", "SHIFT", "SWITCH") for fn in (0, 1)]
+    combos = [c for c in combos if _eligible(cm, *c)]
+    items = [(0.0, "@", ("hand", hand))]
+    if rolling:
+        items.append((0.0, "@", ("roll", "on")))
+    expect = []
+    t = 10.0
+    gap_ms = backend.TAP_GAP * 1000.0
+    deb_ms = backend.DEBOUNCE * 1000.0
+    hold_min = max(35, deb_ms + (backend.ROLL_OVERLAP * 1000.0 + 12 if rolling else 10))
+    held = None          # 마지막 탭의 (키 목록, 뗌 시작 시각) — 다음 시리즈가 정해질 때 뗌
+
+    def release(down, t):
+        """down을 t부터 분산해 뗌. 반환: (끝 시각, 키 → 뗀 시각)."""
+        rnd.shuffle(down)
+        at = {}
+        for k in down:
+            items.append((t, "u", k)); at[k] = t
+            t += rnd.uniform(0, 8 / max(1, len(down)))
+        return t, at
+
+    prev = None
+    done = 0
+    ci = 0
+    while done < n_chords:
+        lg, md, fn = combos[ci % len(combos)]
+        ci += 1
+        items += [(t, "@", ("lang", lg)), (t, "@", ("mode", md)), (t, "@", ("fn", "on" if fn else "off"))]
+        cands = _eligible(cm, lg, md, fn)
+        prev = None
+        for _ in range(min(segment, n_chords - done)):
+            m, c, v = pick.choice(cands)
+            released = {}
+            if held is not None:
+                if m == prev:
+                    t = release(*held)[0] + gap_ms + rnd.uniform(30, 120)
+                elif rolling:
+                    released = release(*held)[1]
+                    t = held[1] + rnd.uniform(-10, 10)     # 떼는 동안 다음 합주 시작
+                else:
+                    t = release(*held)[0] + rnd.uniform(40, 200)
+                held = None
+            for tap in range(c):
+                if tap:
+                    t = release(*held)[0] + rnd.uniform(60, min(150, gap_ms - 20))
+                down = [k for i, k in enumerate(keys) if MASK_BITS[m][i]]
+                rnd.shuffle(down)
+                for k in down:
+                    if k in released:                        # 이전 합주와 겹치는 키: 뗀 뒤에 다시 누름
+                        t = max(t, released.pop(k) + rnd.uniform(2, 6))
+                    items.append((t, "d", k)); t += rnd.uniform(0, 8 / max(1, len(down)))
+                held = (down, t + rnd.uniform(hold_min, max(hold_min, 80)))
+            expect.append((bits_str(m), c, v))
+            prev = m
+            done += 1
+        t = release(*held)[0] + gap_ms + 50
+        held = None
+    items.sort(key=lambda x: x[0])      # 롤링은 앞 합주의 뗌과 다음 합주의 누름이 섞임 (안정 정렬)
+    return Trace(items, expect)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay ChordBoard traces headlessly")
+    ap.add_argument("traces", nargs="*")
+    ap.add_argument("--generate", nargs=2, metavar=("N", "OUT"), help="write a synthetic trace with N chords")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--rolling", action="store_true", help="generate overlapping (rolling) chords, replayed with @roll on")
+    ap.add_argument("-v", "--verbose", action="store_true", help="show backend log while replaying")
+    args = ap.parse_args(argv)
+
+    if args.generate:
+        n, out = args.generate
+        tr = generate_trace(int(n), seed=args.seed, rolling=args.rolling)
+        write_trace(tr, out)
+        print(f"wrote {out}: {sum(1 for x in tr.items if x[1] != '@')} events, {len(tr.expect)} chords")
+    failed = 0
+    for path in args.traces:
+        res = replay(load_trace(path), quiet=not args.verbose)
+        status = "OK" if not res.mismatches else f"FAIL ({len(res.mismatches)} mismatches)"
+        print(f"{os.path.basename(path)}: {res.events} events, {res.emits} emits → {status}")
+        for i, e, g in res.mismatches[:10]:
+            print(f"  #{i}: expected {e} got {g}")
+        failed += bool(res.mismatches)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# chordboard_sweep.py
+# DEBOUNCE / TAP_GAP 오프라인 스윕 — 기록된 트레이스(chordboard_replay 포맷, 기대 emit 포함)를
+# (DEBOUNCE, TAP_GAP) 격자 전체에 대해 NumPy로 한 번에 평가하고 사용자별 설정을 추천
+#   - 일반 모드 결정 로직(ChordEngine)을 분해해서 벡터화:
+#       캡처   : 한 프레스(0 → 눌림 → 0) 안에서 지속 시간이 처음으로 DEBOUNCE 이상인 구간의 마스크
+#                (구간 지속의 누적 최댓값 + searchsorted → 프레스 × DEBOUNCE 행렬)
+#       시리즈 : 다음 캡처 프레스의 첫 누름이 이전 릴리즈 + TAP_GAP 전이고 같은 패턴이면 이어짐,
+#                count가 min(3, 매핑의 최대 count)에 닿으면 즉시 확정 (시리즈 × TAP_GAP 행렬)
+#   - 기대 시리즈별 판정: 캡처가 하나라도 틀리면 misfire, 캡처는 맞는데 묶음이 틀리면 wrong-count
+#     (잡음 프레스가 캡처되면 misfire 추가). 지연 = 마지막 릴리즈 → 확정
+#   - 결과 행렬은 (DEBOUNCE 수 × 시리즈) @ (시리즈 × TAP_GAP 수) 행렬곱 몇 번
+#   - 오류 연쇄(틀린 캡처가 이웃 시리즈 묶음을 바꾸는 경우)는 1차 근사 — 최종 확인은 chordboard_replay로
+#   - 롤링 모드 트레이스(@roll on)는 제외
+#
+#   py -3 chordboard_sweep.py session*.txt                 # 격자 평가 + 추천
+#   py -3 chordboard_sweep.py session*.txt --write         # 추천값을 USER_DIR/settings.json에 (백엔드가 시작 시 로드)
+#   py -3 chordboard_sweep.py --generate 20000              # 합성 트레이스로 실행
+
+import argparse, json, os, sys, time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:          # 이 도구만 필요 (백엔드는 NumPy 없이 동작)
+    np = None
+
+import chordboard_win11 as backend
+from chordboard_engine import KEY_BITS
+from chordboard_replay import generate_trace, load_trace
+
+# 시리즈 배열 (트레이스 여러 개를 이어 붙임). 시간은 ms
+Sweep = namedtuple("Sweep", "iv_dur iv_mask iv_press press_end series_press series_start "
+                            "s_mask s_cap s_gap_in s_gap_out s_same_next s_next_release noise n_series")
+
+def _on(arg):
+    return arg.lower() in ("1", "on", "true")
+
+def extract(traces, cm=None):
+    """트레이스들 → 벡터화 입력. 프레스를 기대 시리즈에 정렬할 수 없으면 ValueError."""
+    cm = cm or backend.CMAP
+    tables = {h: {k: KEY_BITS[i] for i, k in enumerate(keys)}
+              for h, keys in (("RIGHT", backend.RIGHT_CHORD_KEYS), ("LEFT", backend.LEFT_CHORD_KEYS))}
+    iv_dur, iv_mask, iv_press = [], [], []
+    press_end = []
+    series_press, series_start = [], []
+    s_mask, s_cap, s_gap_in, s_gap_out, s_same_next, s_next_release = [], [], [], [], [], []
+    noise = []
+    for tr in traces:
+        if any(ev == "@" and key[0] == "roll" and _on(key[1]) for _, ev, key in tr.items):
+            print("[SWEEP] skipping rolling-mode trace")
+            continue
+        # 1) 프레스 분할: (첫 누름, 릴리즈, 슬롯, 의도 마스크 = 가장 오래 유지된 구간)
+        hand, lang, mode, fn = backend.DEFAULT_HAND, cm.langs[0], "기본", False
+        presses = []
+        mask, start, last_t, best, ivs = 0, 0.0, 0.0, (0.0, 0), []
+        for t, ev, key in tr.items:
+            if ev == "@":
+                name, arg = key
+                if name == "hand": hand = arg.upper()
+                elif name == "lang": lang = arg
+                elif name == "mode": mode = arg
+                elif name == "fn": fn = _on(arg)
+                continue
+            bit = tables[hand].get(key)
+            if bit is None:
+                continue
+            new = mask | bit if ev == "d" else mask & ~bit
+            if new == mask:
+                continue
+            if mask:
+                ivs.append((t - last_t, mask))
+                if t - last_t > best[0]:
+                    best = (t - last_t, mask)
+            else:
+                start, ivs, best, slot = t, [], (0.0, 0), cm.slot(lang, mode, fn)
+            mask, last_t = new, t
+            if not mask:
+                presses.append((start, t, slot, best[1], ivs))
+        # 2) 기대 시리즈에 정렬 (의도 마스크가 다른 프레스는 잡음)
+        base = len(press_end)
+        for start, end, slot, want, ivs in presses:
+            for d, m in ivs:
+                iv_dur.append(d); iv_mask.append(m); iv_press.append(len(press_end))
+            press_end.append(len(iv_dur))
+        pi, n = 0, len(presses)
+        first_series = len(s_mask)
+        for bits, cnt, _ in tr.expect:
+            m = int(bits, 2)
+            while pi < n and presses[pi][3] != m:
+                noise.append(base + pi); pi += 1
+            if pi + cnt > n or any(presses[pi + k][3] != m for k in range(cnt)):
+                raise ValueError(f"trace does not align with expected chords at {bits} x{cnt}")
+            grp = list(range(pi, pi + cnt))
+            series_start.append(len(series_press))
+            series_press.extend(base + k for k in grp)
+            slot = presses[pi][2]
+            s_mask.append(m)
+            s_cap.append(max(1, min(3, cm.reach[(slot << 5) | m])))
+            s_gap_in.append(max((presses[k + 1][0] - presses[k][1] for k in grp[:-1]), default=-1.0))
+            pi += cnt
+        noise.extend(base + k for k in range(pi, n))
+        # 3) 시리즈 경계: 마지막 프레스 릴리즈 → 다음 시리즈 첫 누름 간격
+        ends = series_start[first_series + 1:] + [len(series_press)]
+        for i in range(first_series, len(s_mask)):
+            lp = series_press[ends[i - first_series] - 1] - base
+            if i + 1 < len(s_mask):
+                nf = series_press[series_start[i + 1]] - base
+                s_gap_out.append(presses[nf][0] - presses[lp][1])
+                s_same_next.append(s_mask[i + 1] == s_mask[i])
+                s_next_release.append(presses[nf][1] - presses[lp][1])
+            else:
+                s_gap_out.append(float("inf")); s_same_next.append(False); s_next_release.append(0.0)
+    a = np.asarray
+    return Sweep(a(iv_dur, float), a(iv_mask, np.int64), a(iv_press, np.int64), a(press_end, np.int64),
+                 a(series_press, np.int64), a(series_start, np.int64),
+                 a(s_mask, np.int64), a(s_cap, np.int64), a(s_gap_in, float), a(s_gap_out, float),
+                 a(s_same_next, bool), a(s_next_release, float), a(noise, np.int64), len(s_mask))
+
+def capture(sw, debounce):
+    """프레스 × DEBOUNCE 캡처 마스크 (캡처 없음 = -1). debounce: ms 배열."""
+    d = np.asarray(debounce, float)
+    n_press = len(sw.press_end)
+    if not len(sw.iv_dur):
+        return np.full((n_press, len(d)), -1, np.int64)
+    big = float(sw.iv_dur.max()) + float(d.max()) + 1.0
+    # 프레스별 누적 최댓값: 프레스 번호 × big 오프셋을 더하면 전역 누적 최댓값 한 번으로 끝남
+    key = np.maximum.accumulate(sw.iv_press * big + sw.iv_dur)
+    q = np.arange(n_press)[:, None] * big + d[None, :]
+    j = np.searchsorted(key, q, side="left")          # 지속 ≥ DEBOUNCE 인 첫 구간
+    ok = j < sw.press_end[:, None]
+    return np.where(ok, sw.iv_mask[np.minimum(j, len(sw.iv_mask) - 1)], -1)
+
+def evaluate(sw, debounce, tap_gap):
+    """격자 평가. 반환 dict: misfire / wrong_count / latency_ms 행렬 (DEBOUNCE 수 × TAP_GAP 수)."""
+    d = np.asarray(debounce, float)
+    g = np.asarray(tap_gap, float)
+    cnt = np.diff(np.append(sw.series_start, len(sw.series_press)))        # 시리즈별 탭 수
+    cap = capture(sw, d)                                                   # (프레스, D)
+    hit = cap[sw.series_press] == np.repeat(sw.s_mask, cnt)[:, None]
+    cap_ok = np.logical_and.reduceat(hit, sw.series_start, axis=0).T.astype(np.float64)   # (D, 시리즈)
+    stray = (cap[sw.noise] >= 0).sum(axis=0) if len(sw.noise) else np.zeros(len(d))
+
+    capped = sw.s_cap == cnt                                               # 마지막 탭에서 즉시 확정
+    internal = sw.s_gap_in[:, None] < g[None, :]                            # (시리즈, G)
+    cont = ((sw.s_same_next & ~capped)[:, None]) & (sw.s_gap_out[:, None] < g[None, :])
+    prev = np.zeros_like(cont)                  # 앞 시리즈가 이어 붙음 (트레이스 끝은 s_same_next=False)
+    prev[1:] = cont[:-1]
+    group_ok = (internal & ~cont & ~prev).astype(np.float64)
+    lat = np.where(capped[:, None], 0.0,
+                   np.where(sw.s_gap_out[:, None] >= g[None, :], g[None, :], sw.s_next_release[:, None]))
+
+    n_cap_ok = cap_ok.sum(axis=1)                                          # (D,)
+    good = cap_ok @ group_ok                                               # (D, G)
+    lat_sum = cap_ok @ (group_ok * lat)
+    n = max(1, sw.n_series)
+    return {
+        "misfire": np.repeat(((sw.n_series - n_cap_ok + stray) / n)[:, None], len(g), axis=1),
+        "wrong_count": (n_cap_ok[:, None] - good) / n,
+        "latency_ms": np.divide(lat_sum, good, out=np.zeros_like(lat_sum), where=good > 0),
+    }
+
+def recommend(res, debounce, tap_gap, tolerance=0.001):
+    """오류율(misfire + wrong-count)이 최소값 + tolerance 이내인 쌍 중 지연이 가장 짧은 것 → (D, G, i, j)."""
+    err = res["misfire"] + res["wrong_count"]
+    ok = err <= err.min() + tolerance
+    lat = np.where(ok, res["latency_ms"], np.inf)
+    i, j = np.unravel_index(np.argmin(lat + err * 1e-3), lat.shape)    # 같은 지연이면 오류가 적은 쪽
+    return float(debounce[i]), float(tap_gap[j]), i, j
+
+def _grid(spec):
+    a, b, step = (float(x) for x in spec.split(":"))
+    return np.arange(a, b + step / 2, step)
+
+def _row(res, d, g, i, j):
+    return (f"  DEBOUNCE {d:5.1f} ms  TAP_GAP {g:5.0f} ms   misfire {res['misfire'][i, j]*100:6.2f}%   "
+            f"wrong-count {res['wrong_count'][i, j]*100:6.2f}%   latency {res['latency_ms'][i, j]:6.1f} ms")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sweep DEBOUNCE/TAP_GAP over recorded traces")
+    ap.add_argument("traces", nargs="*")
+    ap.add_argument("--generate", type=int, metavar="N", help="use a synthetic trace with N chords")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--debounce", default="5:60:1", help="grid start:stop:step in ms (default 5:60:1)")
+    ap.add_argument("--tap-gap", default="100:500:5", help="grid start:stop:step in ms (default 100:500:5)")
+    ap.add_argument("--tolerance", type=float, default=0.001, help="error-rate slack when trading for latency")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--write", action="store_true", help=f"save the recommendation to {backend.SETTINGS_PATH}")
+    args = ap.parse_args(argv)
+    if np is None:
+        print("chordboard_sweep needs NumPy (py -3 -m pip install numpy)")
+        return 2
+
+    traces = [load_trace(p) for p in args.traces]
+    if args.generate:
+        traces.append(generate_trace(args.generate, seed=args.seed))
+    if not traces:
+        ap.error("no traces (give trace files or --generate N)")
+    t0 = time.perf_counter()
+    sw = extract(traces)
+    t1 = time.perf_counter()
+    dgrid, ggrid = _grid(args.debounce), _grid(args.tap_gap)
+    res = evaluate(sw, dgrid, ggrid)
+    t2 = time.perf_counter()
+    print(f"sweep  series={sw.n_series:,}  presses={len(sw.press_end):,}  grid={len(dgrid)}x{len(ggrid)}="
+          f"{len(dgrid) * len(ggrid):,} pairs   (extract {t1 - t0:.2f}s, evaluate {t2 - t1:.2f}s)")
+    err = res["misfire"] + res["wrong_count"]
+    order = np.lexsort((res["latency_ms"].ravel(), err.ravel()))[:args.top]
+    print("best pairs (error, then latency):")
+    for k in order:
+        i, j = np.unravel_index(k, err.shape)
+        print(_row(res, dgrid[i], ggrid[j], i, j))
+    cur = evaluate(sw, [backend.DEBOUNCE * 1e3], [backend.TAP_GAP * 1e3])
+    print("current:")
+    print(_row(cur, backend.DEBOUNCE * 1e3, backend.TAP_GAP * 1e3, 0, 0))
+    d, g, i, j = recommend(res, dgrid, ggrid, args.tolerance)
+    print("recommended:")
+    print(_row(res, d, g, i, j))
+    if args.write:
+        backend.save_settings({"DEBOUNCE": round(d / 1e3, 4), "TAP_GAP": round(g / 1e3, 4)})
+        print(f"wrote {backend.SETTINGS_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
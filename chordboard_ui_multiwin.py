@@ -3,15 +3,25 @@
 #  • Window 1: Control (mode, toggles, language/hand, active)
 #  • Window 2: Current Bits (LED + last info)
 #  • Window 3: Binding & Layouts & Built-in Hotkeys
+# --engine-process : run the hook engine in its own process (chordboard_proc; state via shared memory)
+# --fake-engine    : same, with an in-memory fake keyboard (UI testing on Linux)
+# --headless       : no windows and no tkinter import (chordboard_daemon; cmd:open_ui opens this UI on demand)
 # PyInstaller-friendly: tries normal import first, falls back to file, supports sys._MEIPASS.
 
-import os, sys, threading, tkinter as tk
+import collections, os, sys, threading, time
+if __name__ == "__main__" and "--headless" in sys.argv:    # 창 없이 엔진만: tkinter를 import하기 전에 넘김
+    import chordboard_daemon
+    sys.exit(chordboard_daemon.main([a for a in sys.argv[1:] if a != "--headless"]))
+_T0 = time.perf_counter()
+import tkinter as tk
 from tkinter import ttk, messagebox
+_T_TK = time.perf_counter()
 
 try:
     import keyboard
 except Exception:
     keyboard = None
+_T_KB = time.perf_counter()
 
 def _load_backend_fallback():
     import importlib.util
@@ -29,33 +39,44 @@ try:
     import chordboard_win11 as backend  # bundled as module
 except Exception:
     backend = _load_backend_fallback()  # dev/fallback
+_T_BACKEND = time.perf_counter()
+from chordboard_log import format_record
 
 LED_ON = "#22c55e"
 LED_OFF = "#334155"
 LED_BG = "#0f172a"
+HIST_BAR = "#38bdf8"
+HIST_W, HIST_H = 300, 70
+LOG_LINES = 5        # 창 2 로그 보기 줄 수 (backend 로그 링버퍼의 최근 레코드)
+FRAME_MS = 16        # 빠른 합주: 누른 비트를 한 프레임 보여준 뒤 현재 상태로
+
+def _set_icon(win):
+    try:
+        win.iconbitmap("ChordBoard.ico")
+    except tk.TclError:   # .ico 미지원 플랫폼 (fake engine으로 리눅스에서 실행 시)
+        pass
 
 class MultiWinApp:
-    def __init__(self):
+    def __init__(self, embedded=False):
+        # embedded: 이미 실행 중인 엔진(헤드리스 데몬)에 붙는 UI — Quit은 창만 닫음
+        self.embedded = embedded
         # Hidden root
         self.root = tk.Tk()
         self.root.withdraw()
         self.root.title("ChordBoard Controller")
-        self.root.iconbitmap('ChordBoard.ico')
+        _set_icon(self.root)
 
         # Start backend in daemon thread
-        self.backend_thread = threading.Thread(target=backend.main, daemon=True)
-        self.backend_thread.start()
-
-        # Learn mode state
-        self.learn_mode = False
-        self.learn_keys = []
-        self.learn_hook = None
+        self.backend_thread = None
+        if not embedded:
+            self.backend_thread = threading.Thread(target=backend.main, kwargs={"report": False}, daemon=True)
+            self.backend_thread.start()
 
         # ---------- Window 1: Control ----------
         self.win1 = tk.Toplevel(self.root)
         self.win1.title("ChordBoard • Control")
         self.win1.geometry("740x300")
-        self.win1.iconbitmap('ChordBoard.ico')
+        _set_icon(self.win1)
         self._apply_bg(self.win1)
 
         top = ttk.Frame(self.win1, padding=10)
@@ -63,7 +84,7 @@ class MultiWinApp:
         self.state_lab = ttk.Label(top, text="state: -")
         self.state_lab.grid(row=0, column=0, sticky="w")
         ttk.Button(top, text="Toggle Active (Ctrl+Alt+M)", command=self.toggle_active).grid(row=0, column=1, padx=6)
-        ttk.Button(top, text="Quit", command=self.do_quit).grid(row=0, column=2, padx=6)
+        ttk.Button(top, text="Close UI" if embedded else "Quit", command=self.do_quit).grid(row=0, column=2, padx=6)
 
         row1 = ttk.Frame(self.win1, padding=10)
         row1.pack(fill="x")
@@ -82,38 +103,58 @@ class MultiWinApp:
         row3.pack(fill="x", padx=10, pady=6)
         ttk.Button(row3, text="CTRL mode", command=lambda: backend.run_command("toggle_ctrl")).grid(row=0, column=0, padx=6, pady=4, sticky="w")
         ttk.Button(row3, text="Fn layer", command=lambda: backend.run_command("toggle_fn")).grid(row=0, column=1, padx=6, pady=4, sticky="w")
+        ttk.Button(row3, text="Rolling chords (hand)", command=lambda: backend.run_command("toggle_roll")).grid(row=0, column=2, padx=6, pady=4, sticky="w")
+        ttk.Button(row3, text="Two hands", command=lambda: backend.run_command("toggle_two_hands")).grid(row=0, column=3, padx=6, pady=4, sticky="w")
+        ttk.Button(row3, text="Speculative", command=lambda: backend.run_command("toggle_speculate")).grid(row=0, column=4, padx=6, pady=4, sticky="w")
 
         # ---------- Window 2: Current Bits ----------
         self.win2 = tk.Toplevel(self.root)
         self.win2.title("ChordBoard • Current Bits")
-        self.win2.geometry("360x170")
-        self.win2.iconbitmap("ChordBoard.ico")
+        self.win2.geometry("360x570")
+        _set_icon(self.win2)
         self._apply_bg(self.win2)
 
         led_frame = ttk.LabelFrame(self.win2, text="Current Bits", padding=10)
         led_frame.pack(fill="x", padx=10, pady=6)
-        self.led_canvas = tk.Canvas(led_frame, width=5*60, height=60, bg=LED_BG, highlightthickness=0)
+        # 위 줄 = 왼손, 아래 줄 = 오른손 (backend.key_mask()의 10비트: 왼손 << 5 | 오른손)
+        self.led_canvas = tk.Canvas(led_frame, width=5*60, height=110, bg=LED_BG, highlightthickness=0)
         self.led_canvas.pack(fill="x")
         self.led_ids = []
-        for i in range(5):
-            x0 = 18 + i*60
-            y0 = 10
-            x1 = x0 + 38
-            y1 = y0 + 30
-            oid = self.led_canvas.create_oval(x0, y0, x1, y1, fill=LED_OFF, outline="#1f2937", width=2)
-            self.led_ids.append(oid)
-        for i in range(5):
-            x0 = 18 + i*60 + 19
-            self.led_canvas.create_text(x0, 54, text=f"b{i+1}", fill="#cbd5e1", font=("Segoe UI", 9))
+        for row, side in enumerate("LR"):
+            y0 = 10 + row*50
+            for i in range(5):
+                x0 = 18 + i*60
+                x1 = x0 + 38
+                y1 = y0 + 30
+                oid = self.led_canvas.create_oval(x0, y0, x1, y1, fill=LED_OFF, outline="#1f2937", width=2)
+                self.led_ids.append(oid)
+                self.led_canvas.create_text(x0 + 19, y0 + 15, text=f"{side}{i+1}", fill="#cbd5e1", font=("Segoe UI", 9))
 
         self.last_lab = ttk.Label(led_frame, text="Last: -")
         self.last_lab.pack(anchor="w", pady=(6,0))
+        self.wake_lab = ttk.Label(led_frame, text="Worker wakeups/s: -   |   Hook max: -")
+        self.wake_lab.pack(anchor="w")
+
+        lat_frame = ttk.LabelFrame(self.win2, text="Latency (release → injected)", padding=10)
+        lat_frame.pack(fill="x", padx=10, pady=6)
+        self.hist_canvas = tk.Canvas(lat_frame, width=HIST_W, height=HIST_H, bg=LED_BG, highlightthickness=0)
+        self.hist_canvas.pack(fill="x")
+        self.lat_lab = ttk.Label(lat_frame, text="p50 -  p95 -  p99 -")
+        self.lat_lab.pack(anchor="w", pady=(4,0))
+        self.lat_layer_lab = ttk.Label(lat_frame, text="", justify="left")
+        self.lat_layer_lab.pack(anchor="w")
+        self.lat_seen = -1
+
+        log_frame = ttk.LabelFrame(self.win2, text="Log", padding=10)
+        log_frame.pack(fill="x", padx=10, pady=6)
+        self.log_lab = ttk.Label(log_frame, text="", justify="left", font=("Consolas", 8))
+        self.log_lab.pack(anchor="w")
 
         # ---------- Window 3: Bindings/Layouts/Hotkeys ----------
         self.win3 = tk.Toplevel(self.root)
         self.win3.title("ChordBoard • Bindings & Layouts")
-        self.win3.geometry("680x490")
-        self.win3.iconbitmap("ChordBoard.ico")
+        self.win3.geometry("680x550")
+        _set_icon(self.win3)
         self._apply_bg(self.win3)
 
         learn_box = ttk.LabelFrame(self.win3, text="5-Key Binding (Learn Mode)", padding=10)
@@ -130,6 +171,12 @@ class MultiWinApp:
         self.layout_lab = ttk.Label(layout, text="-")
         self.layout_lab.pack(anchor="w")
 
+        map_box = ttk.LabelFrame(self.win3, text="Mapping", padding=10)
+        map_box.pack(fill="x", padx=10, pady=6)
+        ttk.Button(map_box, text="Reload Mapping", command=self.reload_mapping).pack(side="left")
+        self.reload_lab = ttk.Label(map_box, text="Not reloaded (saving the file reloads automatically)")
+        self.reload_lab.pack(side="left", padx=10)
+
         hk = ttk.LabelFrame(self.win3, text="Built-in Hotkeys", padding=10)
         hk.pack(fill="both", expand=True, padx=10, pady=6)
         self.hk_text = tk.Text(hk, height=10, wrap="word")
@@ -146,12 +193,54 @@ class MultiWinApp:
             "• cmd:toggle_active, cmd:toggle_lang, cmd:toggle_hand\n"
             "• cmd:set_mode=기본/SHIFT/SWITCH/Fn\n"
             "• cmd:set_lang=EN/KO, cmd:set_active=on/off, cmd:set_hand=LEFT/RIGHT\n"
-            "• cmd:toggle_ctrl, cmd:toggle_fn, cmd:exit\n"
+            "• cmd:toggle_ctrl, cmd:toggle_fn, cmd:reload_mapping, cmd:exit\n"
+            "• cmd:toggle_roll, cmd:set_roll=on/off (rolling chords, current hand)\n"
+            "• cmd:toggle_two_hands, cmd:set_two_hands=on/off (both hands at once; CROSS layer = 10-bit chords)\n"
+            "• cmd:toggle_speculate, cmd:set_speculate=on/off (type count-1 text at release, backspace it on the next tap)\n"
+            "• cmd:set_profile=<name> (profiles.json; also switched by foreground app)\n"
+            "• cmd:set_log=debug/info/warn/off (log level; file: chordboard.log in user folder)\n"
+            "• cmd:save_usage (per-entry usage counts → usage.json, input for chordboard_optimize.py)\n"
+            "• cmd:reload_macros (macros.json next to the mapping: chord sequences → text/keys)\n"
+            "• cmd:learn[=LEFT/RIGHT], cmd:cancel_learn (5-key binding without this window)\n"
+            "• cmd:status (one-line status + memory/threads/CPU → log), cmd:open_ui (headless daemon)\n"
+            "• cmd:record=on/off (binary session recording → recordings/*.cbr, read with chordboard_record.py)\n"
         )
         self.hk_text.configure(state="disabled")
 
-        # start refresh loop
-        self.root.after(120, self.refresh_all)
+        # backend → UI 이벤트 (푸시, 폴링 없음): 전달 스레드가 큐를 기다렸다가 Tk에 가상 이벤트만 던지고,
+        # Tk 쪽은 after_idle로 모아서 처리 → 바뀐 위젯만 갱신. 변화가 없으면 타이머도 없음.
+        self.shown = {}                # 위젯 → 마지막으로 표시한 텍스트
+        self.led_mask = 0
+        self.ui_events = collections.deque()
+        self.drain_posted = False
+        self.root.bind("<<BackendEvent>>", lambda e: self.root.after_idle(self.drain_events))
+        events = backend.subscribe_events()
+        self.refresh_all()
+        threading.Thread(target=self._forward_events, args=(events,), daemon=True).start()
+        self.root.after_idle(self._first_paint)   # 창 그리기(idle 작업) 이후 실행
+
+    # -------- Startup timing --------
+    def _first_paint(self):
+        self.root.update_idletasks()
+        self.t_paint = time.perf_counter()
+        if not self.embedded:
+            self._startup_report(40)
+
+    def _startup_report(self, tries):
+        # 훅 설치(backend 스레드)가 끝날 때까지 잠깐 기다렸다가 한 번 보고
+        if "hook install" not in getattr(backend, "STARTUP", {}) and tries > 0 and self.backend_thread.is_alive():
+            self.root.after(50, self._startup_report, tries - 1)
+            return
+        try:
+            backend.startup_report({
+                "import tkinter": (_T_TK - _T0) * 1e3,
+                "import keyboard": (_T_KB - _T_TK) * 1e3,
+                "import backend": (_T_BACKEND - _T_KB) * 1e3,
+                "first paint": (self.t_paint - _T_BACKEND) * 1e3,
+                "total": (self.t_paint - _T0) * 1e3,
+            })
+        except Exception:
+            pass
 
     def _apply_bg(self, win):
         try:
@@ -159,61 +248,29 @@ class MultiWinApp:
         except Exception:
             pass
 
-    # -------- Learn mode --------
+    # -------- Learn mode (backend가 진행, 이 창은 "learn" 이벤트만 표시) --------
     def start_learn(self):
-        if keyboard is None:
-            messagebox.showwarning("Keyboard module", "python-keyboard 모듈을 사용할 수 없습니다.\n관리자 권한 또는 모듈 설치를 확인하세요.")
-            return
-        if self.learn_mode:
-            return
-        self.learn_mode = True
-        self.learn_keys = []
-        self.learn_progress.configure(text="Learning: 0/5  (ESC to cancel)")
         try:
-            if getattr(backend, "active", False):
-                backend.set_active(False)
-        except Exception:
-            pass
-        def on_ev(e):
-            if e.event_type != "down":
-                return
-            name = e.name
-            if name == "esc":
-                self.cancel_learn(); return
-            if name not in self.learn_keys:
-                self.learn_keys.append(name)
-                self.learn_progress.configure(text=f"Learning: {len(self.learn_keys)}/5  -> {self.learn_keys}")
-            if len(self.learn_keys) >= 5:
-                self.finish_learn()
-        self.learn_hook = keyboard.hook(on_ev)
+            started = backend.start_learn()
+        except Exception as e:
+            messagebox.showerror("Learn error", str(e))
+            return
+        if not started:
+            messagebox.showwarning("Learn mode", "학습을 시작할 수 없습니다 (이미 학습 중이거나 python-keyboard 모듈 없음).\n관리자 권한 또는 모듈 설치를 확인하세요.")
 
     def cancel_learn(self):
-        if not self.learn_mode: return
-        self.learn_mode = False
-        self.learn_progress.configure(text="Canceled")
-        try:
-            if self.learn_hook and keyboard: keyboard.unhook(self.learn_hook)
+        try: backend.cancel_learn()
         except Exception: pass
-        self.learn_hook = None
 
-    def finish_learn(self):
-        try:
-            if self.learn_hook and keyboard: keyboard.unhook(self.learn_hook)
-        except Exception: pass
-        self.learn_hook = None
-        self.learn_mode = False
-        keys = self.learn_keys[:5]
-        self.learn_progress.configure(text=f"Applied: {keys}")
-        try:
-            hand = getattr(backend, "hand", "RIGHT")
-            if hand == "RIGHT":
-                backend.RIGHT_CHORD_KEYS = keys
-            else:
-                backend.LEFT_CHORD_KEYS = keys
-            backend.ALL_KEYS = sorted(set(backend.RIGHT_CHORD_KEYS + backend.LEFT_CHORD_KEYS))
-            backend.set_hand(hand)
-        except Exception as e:
-            messagebox.showerror("Apply error", str(e))
+    def show_learn(self, ev):
+        which, keys, result = ev
+        if result == "applied":
+            text = f"Applied ({which}): {list(keys)}"
+        elif result == "canceled":
+            text = "Canceled"
+        else:
+            text = f"Learning {which}: {len(keys)}/5  (ESC to cancel)" + (f"  -> {list(keys)}" if keys else "")
+        self.learn_progress.configure(text=text)
 
     # -------- Control handlers --------
     def toggle_active(self):
@@ -223,10 +280,34 @@ class MultiWinApp:
             messagebox.showerror("Error", str(e))
 
     def do_quit(self):
+        if self.embedded:                 # 헤드리스 데몬의 UI: 창만 닫고 엔진은 계속
+            backend.unsubscribe_events()
+            self.win1.destroy(); self.win2.destroy(); self.win3.destroy()
+            self.root.destroy()
+            return
         try: backend.set_active(False)
         except Exception: pass
+        try: backend.save_usage()
+        except Exception: pass
         self.win1.destroy(); self.win2.destroy(); self.win3.destroy()
         self.root.destroy()
+        if hasattr(backend, "close"):     # 별도 프로세스 엔진: 파이프·공유 메모리 정리
+            backend.close()
+
+    def reload_mapping(self):
+        try:
+            self.show_reload(backend.reload_mapping())
+        except Exception as e:
+            messagebox.showerror("Reload error", str(e))
+
+    def show_reload(self, res):
+        if res is None:
+            return
+        ok, ms, rebuilt, reused, err, _ = res
+        if ok:
+            self._set_text(self.reload_lab, f"Reloaded in {ms:.1f} ms  (recompiled {rebuilt}/{rebuilt + reused} layer slots)")
+        else:
+            self._set_text(self.reload_lab, f"Reload failed, kept current mapping: {err}")
 
     def apply_mode(self):
         m = self.mode_var.get()
@@ -241,43 +322,150 @@ class MultiWinApp:
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-    # -------- Periodic refresh --------
-    def refresh_all(self):
+    # -------- Backend events --------
+    def _forward_events(self, q):
+        """(전달 스레드) backend 큐 → deque. Tk에는 처리 예약이 없을 때만 <<BackendEvent>> 한 번."""
+        while True:
+            item = q.get()
+            if item is None:             # 구독 해제 (embedded UI 닫힘)
+                return
+            self.ui_events.append(item)
+            if self.drain_posted:
+                continue
+            self.drain_posted = True
+            while True:
+                try:
+                    self.root.event_generate("<<BackendEvent>>", when="tail")
+                    break
+                except RuntimeError:     # mainloop 시작 전
+                    time.sleep(0.05)
+                except tk.TclError:      # 창 종료
+                    return
+
+    def drain_events(self):
+        self.drain_posted = False        # 이후 도착분은 새로 예약
+        kinds, masks = {}, []
+        while self.ui_events:
+            kind, val = self.ui_events.popleft()
+            if kind == "keys":
+                masks.append(val)
+            else:
+                kinds[kind] = val        # 종류별 마지막 값만
         try:
-            active = "ON" if getattr(backend, "active", False) else "OFF"
-            lang   = getattr(backend, "lang", "-")
-            mode   = getattr(backend, "mode", "-")
-            hand   = getattr(backend, "hand", "-")
-            ctrl   = "ON" if getattr(backend, "ctrl_mode", False) else "OFF"
-            fn     = "ON" if getattr(backend, "fn_mode", False) else "OFF"
-            mode_display = f"Fn → {mode}" if fn == "ON" else mode
-            self.state_lab.configure(text=f"Chord: {active}   |   Lang: {lang}   |   Mode: {mode_display}   |   Hand: {hand}   |   CTRL: {ctrl}  FN: {fn}")
-            want = "Fn" if fn == "ON" else mode
-            if self.mode_var.get() != want:
-                self.mode_var.set(want)
-
-            bits = getattr(backend, "bits", [0,0,0,0,0])
-            for i, oid in enumerate(getattr(self, "led_ids", [])):
-                val = bits[i] if i < len(bits) else 0
-                self.led_canvas.itemconfigure(oid, fill=LED_ON if val else LED_OFF)
+            if masks:
+                peak = 0
+                for m in masks:
+                    peak |= m
+                self.update_leds(peak)
+                if peak != masks[-1]:    # 한 번에 눌렀다 뗀 합주도 한 프레임은 보이게
+                    self.root.after(FRAME_MS, lambda: self.update_leds(backend.key_mask()))
+            if "state" in kinds:
+                self.update_state()
+            if "last" in kinds:
+                self.update_last(kinds["last"])
+            if kinds:
+                self.update_log()
+            if "layout" in kinds:
+                self.update_layout()
+            if "reload" in kinds:
+                self.show_reload(kinds["reload"])
+            if "learn" in kinds:
+                self.show_learn(kinds["learn"])
+            if "latency" in kinds:
+                self.refresh_latency()
+                self.update_wake()
+        except Exception:
+            pass
 
+    def refresh_all(self):
+        """전체 갱신 (시작 시 1회). 이후에는 drain_events가 바뀐 부분만."""
+        snap = backend.snapshot()        # 불변 스냅샷 1회 → LED·Last가 같은 시점
+        for fn in (self.update_state, lambda: self.update_leds(backend.key_mask()), self.update_layout,
+                   lambda: self.update_last(snap.last), self.update_log, lambda: self.show_reload(getattr(backend, "last_reload", None)),
+                   self.refresh_latency, self.update_wake):
             try:
-                r = getattr(backend, "RIGHT_CHORD_KEYS", [])
-                l = getattr(backend, "LEFT_CHORD_KEYS", [])
-                self.layout_lab.configure(text=f"RIGHT: {r}\nLEFT : {l}")
-            except Exception:
-                pass
-            try:
-                lb = getattr(backend, 'last_bits', [0,0,0,0,0])
-                lc = getattr(backend, 'last_cnt', 0)
-                lv = getattr(backend, 'last_value', None)
-                lv_disp = lv if lv is not None else '(MISS)'
-                self.last_lab.configure(text=f"Last: {''.join(str(x) for x in lb)}  cnt={lc}  →  {lv_disp}")
+                fn()
             except Exception:
                 pass
-        except Exception:
-            pass
-        self.root.after(120, self.refresh_all)
+
+    def _set_text(self, widget, text):
+        if self.shown.get(widget) != text:
+            self.shown[widget] = text
+            widget.configure(text=text)
+
+    def update_state(self):
+        active = "ON" if getattr(backend, "active", False) else "OFF"
+        lang   = getattr(backend, "lang", "-")
+        mode   = getattr(backend, "mode", "-")
+        hand   = getattr(backend, "hand", "-")
+        both   = getattr(backend, "two_hands", False)
+        ctrl   = "ON" if getattr(backend, "ctrl_mode", False) else "OFF"
+        fn     = "ON" if getattr(backend, "fn_mode", False) else "OFF"
+        roll   = "ON" if getattr(backend, "ROLL_MODE", {}).get(hand) else "OFF"
+        spec   = "ON" if getattr(backend, "SPECULATE", False) else "OFF"
+        prof   = getattr(backend, "profile", "-")
+        mode_display = f"Fn → {mode}" if fn == "ON" else mode
+        self._set_text(self.state_lab, f"Chord: {active}   |   Lang: {lang}   |   Mode: {mode_display}   |   Hand: {'BOTH' if both else hand}   |   CTRL: {ctrl}  FN: {fn}  ROLL: {roll}  SPEC: {spec}   |   Profile: {prof}")
+        want = "Fn" if fn == "ON" else mode
+        if self.mode_var.get() != want:
+            self.mode_var.set(want)
+
+    def update_leds(self, mask):
+        changed = mask ^ self.led_mask
+        self.led_mask = mask
+        for i, oid in enumerate(self.led_ids):
+            b = 1 << (9 - i)
+            if changed & b:
+                self.led_canvas.itemconfigure(oid, fill=LED_ON if mask & b else LED_OFF)
+
+    def update_layout(self):
+        r = getattr(backend, "RIGHT_CHORD_KEYS", [])
+        l = getattr(backend, "LEFT_CHORD_KEYS", [])
+        self._set_text(self.layout_lab, f"RIGHT: {r}\nLEFT : {l}")
+
+    def update_last(self, last=None):
+        """마지막 SEND/MISS/MACRO 로그 레코드 (로그가 꺼져 있으면 엔진 스냅샷의 last)."""
+        recs = backend.recent_log(1, ("SEND", "MISS", "MACRO"))
+        if recs:
+            self._set_text(self.last_lab, "Last: " + format_record(recs[0]))
+            return
+        lm, lc, lv, _ = last or (0, 0, None, 0.0)
+        lv_disp = lv if lv is not None else '(MISS)'
+        self._set_text(self.last_lab, f"Last: {lm:05b}  cnt={lc}  →  {lv_disp}")
+
+    def update_log(self):
+        recs = backend.recent_log(LOG_LINES)
+        self._set_text(self.log_lab, "\n".join(time.strftime("%H:%M:%S ", time.localtime(r[1])) + format_record(r)
+                                               for r in recs))
+
+    def update_wake(self):
+        _, hmax = backend.hook_stats()
+        self._set_text(self.wake_lab, f"Worker wakeups/s: {backend.wakeup_rate():.1f}   |   Hook max: {hmax*1e6:.0f} µs")
+
+    def refresh_latency(self):
+        ring = backend.LATENCY
+        if ring.count == self.lat_seen:
+            return
+        self.lat_seen = ring.count
+        hi, counts = ring.histogram("response", bins=30)
+        c = self.hist_canvas
+        c.delete("all")
+        top = max(counts) or 1
+        bw = HIST_W / len(counts)
+        for i, n in enumerate(counts):
+            if n:
+                h = (HIST_H - 14) * n / top
+                c.create_rectangle(i*bw + 1, HIST_H - 12 - h, (i+1)*bw - 1, HIST_H - 12, fill=HIST_BAR, width=0)
+        c.create_text(2, HIST_H - 2, text="0", anchor="sw", fill="#cbd5e1", font=("Segoe UI", 8))
+        c.create_text(HIST_W - 2, HIST_H - 2, text=f"{hi*1e3:.0f} ms", anchor="se", fill="#cbd5e1", font=("Segoe UI", 8))
+        p50, p95, p99, n = backend.latency_stats()["response"]
+        if n:
+            self.lat_lab.configure(text=f"p50 {p50*1e3:.1f}  p95 {p95*1e3:.1f}  p99 {p99*1e3:.1f} ms   (n={n})")
+        rows = []
+        for layer, st in backend.latency_stats_by_layer().items():
+            l50, l95, _, ln = st["response"]
+            rows.append(f"{layer}: p50 {l50*1e3:.0f} / p95 {l95*1e3:.0f} ms (n={ln})")
+        self.lat_layer_lab.configure(text="\n".join(rows[:4]))
 
     def run(self):
         # Basic tiling
@@ -292,4 +480,9 @@ class MultiWinApp:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()      # PyInstaller exe에서 엔진 프로세스 spawn
+    if "--engine-process" in sys.argv or "--fake-engine" in sys.argv:
+        import chordboard_proc
+        backend = chordboard_proc.start_engine(fake="--fake-engine" in sys.argv)
     MultiWinApp().run()
@@ -1,12 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os, sys
+
+# 빌드 단계: mapping_clean.json → mapping_clean.bin (내용 해시로 키잉된 컴파일 캐시, 실행 시 JSON 파싱·컴파일 생략)
+sys.path.insert(0, SPECPATH)
+from chordboard_mapping import build_cache
+build_cache(os.path.join(SPECPATH, 'mapping_clean.json'), os.path.join(SPECPATH, 'mapping_clean.bin'))
 
 
 a = Analysis(
     ['chordboard_ui_multiwin.py'],
     pathex=[],
     binaries=[],
-    datas=[('mapping_clean.json', '.')],
-    hiddenimports=['chordboard_win11'],
+    datas=[('mapping_clean.json', '.'), ('mapping_clean.bin', '.')],
+    hiddenimports=['chordboard_win11', 'chordboard_mapping', 'chordboard_latency', 'chordboard_engine', 'chordboard_proc', 'chordboard_hangul', 'chordboard_profiles', 'chordboard_log', 'chordboard_macros', 'chordboard_daemon', 'chordboard_record'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -3,30 +3,155 @@
 # - LEFT/RIGHT 손 모드
 # - Fn 레이어 (mode 'Fn' 우선 조회)
 # - 매핑 명령(cmd:...) 지원
-# - 합주 ON일 때만 per-key hook+suppress 적용
+# - 전역 저수준 훅 1개 + scan code → 비트 테이블 (합주 ON/손 전환은 플래그·테이블 교체, 재설치 없음)
 # - 합성 이벤트 루프 방지(injecting)
+# - 출력은 전용 injector 스레드의 FIFO로 (훅 콜백은 상태 기록·큐잉만)
+# - 입출력/시계 교체 가능 (use_io): 리플레이·벤치마크는 가짜 키보드+가상 시계로 (chordboard_replay.py)
 # - 멀티탭(count=1/2/3) 로직 (bits의 1개수와 무관)
+# - 롤링 합주 모드 (손별): 다 떼기 전에 다음 합주를 눌러도 롤오버 시점에 이전 합주 확정
+# - KO 자모는 내장 오토마타로 완성형 음절 조합 (OS IME 상태와 무관, chordboard_hangul.py)
+# - 로그는 구조화 레코드를 링버퍼에 (print 없음) → 백그라운드 flusher가 회전 파일로 (chordboard_log.py)
+# - 앱별 프로필: 합주 시작 때 전경 창으로 매핑·lang·mode·hand 자동 전환 + cmd:set_profile (chordboard_profiles.py)
+# - 합주 상태는 ChordEngine 하나에 (int 마스크, __slots__) — UI는 snapshot()으로 읽음 (chordboard_engine.py)
+# - 매핑 핫 리로드: 파일 감시 + cmd:reload_mapping → 검증·부분 재컴파일 후 worker가 테이블 교체
 # - PyInstaller 친화적: mapping_clean.json 경로에 sys._MEIPASS 사용
+# - UI 갱신은 푸시: 상태가 바뀔 때만 이벤트 큐에 (종류, 값) 게시 (subscribe_events)
+# - 시작 시간 단축: 컴파일된 매핑 캐시(번들 mapping_clean.bin / USER_DIR) + 단계별 시작 시간 보고 (startup_report)
+# - 매핑 항목별 사용 횟수: emit마다 테이블 인덱스 카운터 +1 → 주기적으로 usage.json (chordboard_optimize.py 입력)
+# - 합주열 매크로: macros.json의 합주 시퀀스 → 문자열/키 묶음 (접두사 트라이, chordboard_macros.py)
 
-import json, os, sys, time, threading
-import keyboard
+import json, os, queue, sys, time, threading
+STARTUP = {}                 # 시작 단계 → ms (startup_report()가 출력·기록)
+_t = time.perf_counter()
+try:
+    import keyboard
+except ImportError:          # 리눅스 CI 등: use_io()로 가짜 키보드를 꽂아서 사용
+    keyboard = None
+STARTUP["import keyboard"] = (time.perf_counter() - _t) * 1e3
+from chordboard_engine import ChordEngine, KEY_BITS, SPECULATIVE
+from chordboard_hangul import HangulComposer
+from chordboard_profiles import DEFAULT, LayoutCache, foreground_source, load_profiles, match_index, match_profile
+from chordboard_latency import LatencyRing
+from chordboard_log import DEBUG, INFO, WARN, EventLog
+from chordboard_macros import MacroMatcher, load_macros
+from chordboard_record import K_CROSS, K_CROSS_MISS, K_DOWN, K_EMIT, K_MACRO, K_MISS, K_UP, KEY_LEFT, KEY_ROLL, KEY_TWO_HANDS, Recorder
+from chordboard_mapping import (A_TEXT, A_KEY, A_TOGGLE, A_CMD, CROSS,
+                                compile_value, load_mapping, load_mapping_cached, normalize_value)
 
 # ── 설정 ───────────────────────────────────────────────────────
 BASE_DIR = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
-MAPPING_PATH = os.path.join(BASE_DIR, "mapping_clean.json")
+# 사용자 폴더: 매핑 덮어쓰기·컴파일 캐시·시작 로그 (%APPDATA%\ChordBoard, 그 외 ~/.chordboard)
+USER_DIR = (os.path.join(os.environ["APPDATA"], "ChordBoard") if os.environ.get("APPDATA")
+            else os.path.join(os.path.expanduser("~"), ".chordboard"))
+# USER_DIR에 mapping_clean.json이 있으면 그것을 사용 (exe 번들은 임시 폴더라 편집·감시 불가)
+_user_mapping = os.path.join(USER_DIR, "mapping_clean.json")
+MAPPING_PATH = _user_mapping if os.path.exists(_user_mapping) else os.path.join(BASE_DIR, "mapping_clean.json")
+MAPPING_CACHES = (os.path.join(BASE_DIR, "mapping_clean.bin"),       # 빌드 시 생성 (spec)
+                  os.path.join(USER_DIR, "mapping_cache.bin"))       # 해시가 안 맞으면 여기 새로 저장
 
 # 오른손/왼손에 사용할 5개 키 (버튼 1(엄지)→버튼 5(새끼) 순서)
 RIGHT_CHORD_KEYS = ['0', '7', '8', '9', '+'] #넘버패드
 LEFT_CHORD_KEYS  = ['space', 'f', 'd', 's', 'a']
 
 DEFAULT_HAND = 'RIGHT'                         # 'RIGHT' or 'LEFT'
+TWO_HANDS = False                              # 두 손 동시 모드로 시작 (cmd:set_two_hands / cmd:toggle_two_hands)
 DEBOUNCE = 0.02                                # 20ms 안정화 대기
 TAP_GAP = 0.25                                 # 같은 패턴 멀티탭 인정 간격(초)
+ROLL_MODE = {'RIGHT': False, 'LEFT': False}    # 손별 롤링 합주 인식 (cmd:set_roll / cmd:toggle_roll)
+HANGUL_COMPOSE = True                          # KO 자모를 음절로 조합해서 출력 (False = 자모 그대로, IME에 맡김)
+ROLL_OVERLAP = 0.015                           # 롤링: 캡처 후 이 시간 안에 눌린 키는 같은 합주, 그 뒤는 다음 합주
+SPECULATE = False                              # 잠정 출력: 멀티탭 대기 중인 TEXT를 릴리즈 즉시 입력, 다음 탭이면 지우고 교체 (한 손 모드)
+SPIN_MARGIN = 0.0015                           # 데드라인 직전 이 구간은 대기 대신 양보-스핀 (타이머 해상도 보정)
+OUTQ_MAX = 256                                 # 출력 큐 최대 길이 (가득 차면 worker가 대기 = backpressure)
+LATENCY_RING_SIZE = 2048                       # 지연 측정 링버퍼 크기 (최근 합주 수)
+MAPPING_WATCH = True                           # mapping_clean.json 변경 감시 → 자동 리로드
+MAPPING_POLL = 1.0                             # 감시 폴링 간격(초) — Windows는 변경 알림으로 대기
+LOG_LEVEL = "info"                             # debug / info / warn / off (cmd:set_log=...)
+LOG_RING_SIZE = 4096                           # 로그 링버퍼 크기 (UI Last·진단이 읽음)
+LOG_PATH = os.path.join(USER_DIR, "chordboard.log")   # 회전 로그 파일 (main()이 flusher 시작)
+LOG_MAX_BYTES = 1 << 20                        # 이 크기를 넘으면 .1 .. .LOG_BACKUPS로 회전
+LOG_BACKUPS = 3
+PROFILES_PATH = os.path.join(USER_DIR, "profiles.json")   # 앱별 프로필 (없으면 default 하나)
+PROFILE_CACHE_SIZE = 4                         # 컴파일된 매핑을 유지할 프로필 매핑 수 (LRU)
+USAGE_PATH = os.path.join(USER_DIR, "usage.json")   # 매핑 항목별 사용 횟수 (누적, 세션 간 유지)
+USAGE_SAVE_INTERVAL = 300.0                    # 사용 횟수 저장 간격(초), 종료 시에도 저장
+MACROS_PATH = os.path.join(os.path.dirname(MAPPING_PATH), "macros.json")   # 합주열 매크로 (없으면 기능 꺼짐)
+MACRO_POLICY = "longest"                       # longest: 더 긴 매크로를 기다림 / shortest: 첫 확장에서 바로 확정
+MACRO_TIMEOUT = 0.6                            # 매크로 접두사 뒤 다음 합주 대기(초) — 지나면 확정/원래 값으로
+RECORD = False                                 # 세션 녹화로 시작 (cmd:record=on/off) — 키 누름/뗌·emit 바이너리 기록
+RECORD_DIR = os.path.join(USER_DIR, "recordings")
+RECORD_FILE_BYTES = 16 << 20                   # 녹화 파일 하나 크기 (16바이트 레코드 약 100만 개), 차면 다음 파일
+RECORD_FILES = 8                               # 녹화 폴더에 남길 파일 수 (오래된 것부터 삭제)
 # ───────────────────────────────────────────────────────────────
 
-# 매핑 로드
-with open(MAPPING_PATH, encoding="utf-8") as f:
-    MAP = json.load(f)
+LOG = EventLog(LOG_RING_SIZE, LOG_LEVEL)
+
+# 사용자별 튜닝값: USER_DIR/settings.json이 위 상수를 덮어씀 (chordboard_sweep.py --write가 기록)
+SETTINGS_PATH = os.path.join(USER_DIR, "settings.json")
+_TUNABLES = {"DEBOUNCE": (0.001, 0.2), "TAP_GAP": (0.05, 1.0), "ROLL_OVERLAP": (0.0, 0.1),
+             "MACRO_TIMEOUT": (0.05, 5.0)}     # 이름 → 허용 범위(초)
+
+def _load_settings(path):
+    """settings.json → {이름: 값}. 모르는 키·범위 밖 값은 무시, 파일이 잘못됐으면 빈 dict."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except OSError:
+        return {}
+    except ValueError as e:
+        LOG.add(WARN, "SETTINGS", value=path, extra=f"ignored: {e}")
+        return {}
+    out = {}
+    for k, (lo, hi) in _TUNABLES.items():
+        v = raw.get(k) if isinstance(raw, dict) else None
+        if isinstance(v, (int, float)) and lo <= v <= hi:
+            out[k] = float(v)
+        elif v is not None:
+            LOG.add(WARN, "SETTINGS", value=k, extra=f"out of range {v!r}, using default")
+    return out
+
+def save_settings(values):
+    """튜닝값을 settings.json에 병합 저장 (다음 시작부터 적용)."""
+    cur = {}
+    try:
+        with open(SETTINGS_PATH, encoding="utf-8") as f:
+            cur = json.load(f)
+    except (OSError, ValueError):
+        pass
+    cur.update({k: v for k, v in values.items() if k in _TUNABLES})
+    os.makedirs(USER_DIR, exist_ok=True)
+    tmp = SETTINGS_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cur, f, indent=2)
+    os.replace(tmp, SETTINGS_PATH)
+
+SETTINGS = _load_settings(SETTINGS_PATH)
+DEBOUNCE = SETTINGS.get("DEBOUNCE", DEBOUNCE)
+TAP_GAP = SETTINGS.get("TAP_GAP", TAP_GAP)
+ROLL_OVERLAP = SETTINGS.get("ROLL_OVERLAP", ROLL_OVERLAP)
+MACRO_TIMEOUT = SETTINGS.get("MACRO_TIMEOUT", MACRO_TIMEOUT)
+if SETTINGS: LOG.add(INFO, "SETTINGS", value=SETTINGS_PATH, extra=SETTINGS)
+
+# 매핑 로드 + 평면 테이블 컴파일 (Fn 폴백·값 정규화는 여기서 끝냄)
+# JSON 내용 해시가 맞는 캐시가 있으면 파싱·컴파일 생략, MAPPING_SOURCE = 캐시 경로 또는 "json"
+
+_t = time.perf_counter()
+MAP, CMAP, MAPPING_SOURCE = load_mapping_cached(MAPPING_PATH, MAPPING_CACHES, MAPPING_CACHES[-1])
+STARTUP["mapping"] = (time.perf_counter() - _t) * 1e3
+
+# 프로필: 잘못된 profiles.json이면 default만 (기본 매핑)
+try:
+    PROFILES = load_profiles(PROFILES_PATH, MAPPING_PATH)
+except (OSError, ValueError) as e:
+    LOG.add(WARN, "PROFILE", value=PROFILES_PATH, extra=f"{e} — using default only")
+    PROFILES = load_profiles(None, MAPPING_PATH)
+PROFILE_INDEX = match_index(PROFILES)
+LAYOUTS = LayoutCache(PROFILE_CACHE_SIZE, load_mapping)   # 매핑 경로 → (MAP, CMAP), _reload_lock 보유 상태에서만
+LAYOUTS.put(MAPPING_PATH, (MAP, CMAP))
+profile = DEFAULT
+FOREGROUND_SOURCE = foreground_source()   # () → (exe, 창 클래스)|None. None이면 자동 전환 없음 (테스트는 가짜로 교체)
+_fg_check = False            # 합주 시작 시 훅이 세움 → worker가 전경 창 확인
+_fg_key = None               # 마지막으로 확인한 (exe, 창 클래스)
 
 # 상태
 active = False       # 합주 모드 ON/OFF
@@ -36,85 +161,320 @@ ctrl_mode = False
 fn_mode = False
 
 hand = DEFAULT_HAND  # 'RIGHT' / 'LEFT'
+two_hands = TWO_HANDS   # True면 양손 5키가 모두 합주 키 (손마다 엔진, worker는 하나)
 CHORD_KEYS = RIGHT_CHORD_KEYS if hand == 'RIGHT' else LEFT_CHORD_KEYS
 ALL_KEYS = sorted(set(RIGHT_CHORD_KEYS + LEFT_CHORD_KEYS))
 
-KEY_INDEX = {k: i for i, k in enumerate(CHORD_KEYS)}
+# scan code → 마스크 비트 (손별로 미리 계산, set_hand는 참조 교체만). scan code를 못 얻은 키는 이름으로 매칭.
+#   'BOTH'(두 손 모드): 오른손 비트 1..16 + 왼손 비트 << 5 (32..512) — 훅은 비트 크기로 엔진을 고름
+KEY_TABLES = {}
+SCAN_INDEX = {}
+NAME_INDEX = {k: KEY_BITS[i] for i, k in enumerate(CHORD_KEYS)}
+
+# 합주·멀티탭 상태 (훅 콜백/worker가 _cv 보유 상태에서 갱신, 읽기는 ENGINE.snapshot())
+#   손마다 엔진 하나 (roll은 손별 설정). ENGINE = 현재 손의 엔진 (UI 스냅샷·last)
+#   _LO_ENGINE = 비트 1..16 키의 엔진 — 한 손 모드면 ENGINE, 두 손 모드면 오른손 (왼손 키는 _LEFT)
+ENGINES = {h: ChordEngine(CMAP.reach, DEBOUNCE, TAP_GAP, ROLL_OVERLAP) for h in ('RIGHT', 'LEFT')}
+_RIGHT, _LEFT = ENGINES['RIGHT'], ENGINES['LEFT']
+for _h, _eng in ENGINES.items():
+    _eng.roll = ROLL_MODE[_h]
+ENGINE = ENGINES[hand]
+_LO_ENGINE = _RIGHT if two_hands else ENGINE
 
-bits = [0, 0, 0, 0, 0]
-last_change_ts = 0.0
-pressing = False           # 현재 하나 이상 누름?
+# 두 손 교차 합주 (CROSS 레이어가 있는 lang에서 두 손 모드일 때만, 모두 _cv 보유 상태에서 갱신)
+#   양손이 함께 눌린 상태가 DEBOUNCE 동안 유지 → 두 엔진에서 프레스를 떼어 내고(abandon) 여기서 누적,
+#   전부 떼면 (10비트 mask, 1, ts)를 확정. 한 손이 먼저 떼면 각 엔진이 평소대로 처리
+_cross_on = False         # 지금 lang에 CROSS 레이어가 있고 두 손 모드인가 (_refresh_reach가 갱신)
+_cross_since = 0.0        # 양손이 함께 눌린 뒤 마지막 키 변화 시각 (0 = 함께 눌리지 않음)
+_cross_mask = 0           # 진행 중인 교차 합주의 10비트 합집합 (0 = 없음)
+_cross_held = 0           # 그중 아직 눌린 비트
+_cross_ts = (0.0, 0.0)    # (첫 누름, 캡처) 시각
+_cross_fires = []         # 확정된 교차 합주 — worker가 엔진 fires와 함께 emit
 
-# 최근 전송 디버깅용
-last_bits = [0,0,0,0,0]
-last_cnt = 0              # 멀티탭 카운트(1/2/3)
-last_value = None
-last_ts = 0.0
+emit_hook = None          # emit_hook(mask, cnt, action|None) — 리플레이 검증용 (평소엔 None)
+UI_OPENER = None          # cmd:open_ui가 부르는 함수 — 헤드리스 데몬이 설정 (UI로 실행 중이면 None)
 
-# 훅 핸들
-HOOK_PRESS = {}
-HOOK_RELEASE = {}
+# 학습 모드: 한 손의 5키를 누른 순서대로 등록 (별도 훅, 학습 중에는 합주 OFF). 진행은 "learn" 이벤트로
+_learn = None             # (손, [키 이름...], 훅 핸들) — 학습 중일 때만
+
+# 사용 횟수: HITS[테이블 인덱스] += 1 (emit, worker 스레드만). 매핑 교체 때 USAGE로 접어 넣고 0부터
+#   USAGE = {매핑 경로: {lang: {mode: {"count": {bits: 횟수}}}}} — 매핑 JSON과 같은 모양 (Fn 폴백은 실제 찾은 mode로)
+HITS = [0] * len(CMAP.table)
+_hits_path = MAPPING_PATH    # HITS가 가리키는 CMAP의 매핑 경로
+USAGE = {}
+
+# 전역 훅 핸들 (한 번 설치 후 유지)
+HOOK = None
 
 # 합성 이벤트 보호
 injecting = 0
 
-# 멀티탭 상태
-pending_chord_seen = False   # 이번 프레스에서 안정화된 비트패턴을 캡쳐했는가
-pending_bits = [0,0,0,0,0]   # 이번 프레스에서 캡쳐된 비트패턴
-series_bits = None           # 멀티탭 시리즈의 기준 비트패턴
-tap_count = 0                # 누적 탭 수(1/2/3)
-series_deadline = 0.0        # 이 시각까지 다음 탭이 없으면 확정 발사
+# 출력 단계: worker → (A_TEXT|A_KEY, value, 지연레코드) FIFO → injector 스레드가 keyboard로 주입
+_outq = queue.Queue(maxsize=OUTQ_MAX)
+A_EDIT = 4                # 출력 큐 전용 kind: value = (지울 글자 수, 쓸 텍스트) — 한글 조합 교체
+A_SEQ = 5                 # 출력 큐 전용 kind: value = ((A_TEXT|A_KEY, 값), ...) — 매크로 확장 한 묶음
+HANGUL = HangulComposer() # KO 조합 상태 (worker만 갱신, 훅은 interrupted만 세움)
+
+# 매크로: 트라이는 load_macros_file()이 참조 교체 (main()은 별도 스레드에서 로드 → 시작 지연 없음)
+#   진행 상태(버퍼·데드라인)는 worker만 갱신. 기본 레이어(Fn·ctrl 아님)의 합주만 매크로 입력
+MACRO = MacroMatcher({}, MACRO_POLICY, MACRO_TIMEOUT)
+MACRO_EXPIRE = (0, 0, None)   # fires 안의 표시: 매크로 시간 초과 처리 (mask 0은 실제 합주가 아님)
+
+# 잠정 출력 (SPECULATE): 엔진의 잠정 탭 (mask, count | SPECULATIVE)에서 TEXT 값을 바로 주입하고
+#   _spec = (mask, count, act, 한글 조합 mark, 주입한 편집, slot_base) — worker만 갱신
+#   같은 mask의 다음 탭 → 주입한 만큼 지우고(HANGUL.undo) 새 count로, 최종 확정이 같은 값이면 출력 없이 기록만
+_spec = None
+spec_hits = spec_rollbacks = 0
+
+# 세션 녹화 (chordboard_record.Recorder, 켜져 있을 때만). add()는 _cv 보유 상태에서 (훅·worker 공용)
+REC = None
+_KEY_CODE = {b: i for i, b in enumerate(KEY_BITS)}   # 엔진 비트 → 키 인덱스 (녹화 레코드)
+
+# 합주별 단계 지연 (press → stable → release → emit → 주입 완료)
+LATENCY = LatencyRing(LATENCY_RING_SIZE)
+
+# 훅 콜백 소요 시간 (초)
+hook_calls = 0
+hook_max = 0.0
+
+# 스케줄러: 훅 콜백이 상태를 바꾸고 notify → worker는 다음 데드라인까지만 대기
+clock = time.perf_counter    # 단조·고해상도 (ENGINE의 모든 시각 기준)
+_cv = threading.Condition()
+wakeups = 0                  # worker 깨어남 누적 횟수
+wakeups_per_sec = 0.0        # wakeup_rate()가 1초 이상 간격으로 갱신
+_wk_t0 = clock()
+_wk_n0 = 0
+_timer_hi = False            # timeBeginPeriod(1) 적용 중?
+
+# 매핑 핫 리로드: 읽기·검증·컴파일은 호출 스레드에서, 교체는 worker가 emit 사이에 (_cv 보유)
+#   → emit은 항상 한 테이블만 보고, 진행 중인 멀티탭 시리즈(ENGINE)는 그대로 이어짐
+_next_map = None             # 교체 대기 중인 (MAP, CMAP, 매핑 경로)
+_reload_lock = threading.Lock()
+_worker_alive = False        # False면 (리플레이 등) reload_mapping()이 바로 교체
+last_reload = None           # (성공, ms, 재컴파일 slot 수, 재사용 slot 수, 오류|None, time.time())
+
+# UI 이벤트: 상태가 바뀐 곳에서 (종류, 값)을 게시. 구독자가 없으면(None) 아무것도 안 함
+#   keys(현재 마스크, 왼손 << 5 | 오른손) / state(active·lang·mode·hand·ctrl·fn — 값은 구독자가 직접 읽음) / last(ENGINE.last)
+#   latency(LATENCY 기록 추가) / layout(5키 재지정) / reload(last_reload)
+#   learn((손, 지금까지 누른 키, None|"applied"|"canceled"))
+_events = None
+_KEY_EVENTS = tuple(("keys", m) for m in range(1024))   # 키 이벤트마다 튜플을 만들지 않도록 미리 생성 (값 = key_mask())
+
+# 현재 (lang, mode, fn)의 테이블 오프셋 — lang/mode/fn/hand 변경 시 _refresh_reach()로 갱신
+slot_base = 0                # CMAP.table[slot_base | cnt<<5 | mask]
+reach_base = 0               # CMAP.reach[reach_base | mask] = 도달 가능한 최대 count (없으면 0)
 
 # ── 유틸 ───────────────────────────────────────────────────────
-WORDS_TO_CHARS = {"backslash": "\\"}
-
-def normalize_value(v: str) -> str:
-    nv = v
-    if isinstance(nv, str) and nv.lower().startswith("window+"):
-        nv = "windows+" + nv.split("+", 1)[1]
-    if isinstance(nv, str) and nv.lower() in ("window+tap", "windows+tap"):
-        nv = "windows+tab"
-    nv = (nv
-          .replace("Arrow Left", "left")
-          .replace("Arrow Right", "right")
-          .replace("Arrow Up", "up")
-          .replace("Arrow Down", "down"))
-    return nv
-
-def emit(bits_list, count_int):
-    global last_bits, last_cnt, last_value, last_ts
-    bstr = "".join(str(b) for b in bits_list)
-    cnt_key = str(max(1, min(3, count_int)))  # 1..3
-
-    for mode_to_use in (('Fn' if fn_mode else None), mode):
-        if mode_to_use is None:
-            continue
-        modesect = MAP.get(lang, {}).get(mode_to_use, {})
-        val = modesect.get(cnt_key, {}).get(bstr)
-        if val is not None:
-            print(f"[SEND] ({lang},{mode_to_use}) hand={hand} bits={bits_list} cnt={cnt_key} → {val}")
-            last_bits = bits_list[:]; last_cnt = int(cnt_key); last_value = val; last_ts = time.time()
-            send_value(val)
-            return
+def _refresh_reach():
+    global slot_base, reach_base, _cross_on
+    slot = CMAP.slot(lang, mode, fn_mode)
+    slot_base = slot << 7
+    reach_base = slot << 5
+    for eng in ENGINES.values():
+        eng.reach_base = reach_base
+    _cross_on = two_hands and lang in CMAP.cross
+    _publish("state")
+
+def _log_state(name, value):
+    if LOG.info: LOG.add(INFO, "STATE", lang, mode, value=name, extra=value)
+
+def recent_log(n=20, kinds=None):
+    """최근 로그 레코드 최대 n개 (chordboard_log 레코드 튜플, 오래된 것 → 최신). UI·진단용."""
+    return LOG.recent(n, kinds)
+
+def set_log_level(level):
+    LOG.set_level(level)
+    _publish("state")
+
+def subscribe_events():
+    """UI 이벤트 큐(queue.SimpleQueue) 생성·반환. 항목: (종류, 값). 구독자는 하나 (다시 부르면 교체)."""
+    global _events
+    _events = queue.SimpleQueue()
+    return _events
+
+def unsubscribe_events():
+    """구독 해제 (UI를 닫을 때). 기다리던 구독자에게는 None을 넣어 깨움."""
+    global _events
+    q, _events = _events, None
+    if q is not None:
+        q.put(None)
+
+def _publish(kind, value=None):
+    q = _events
+    if q is not None:
+        q.put((kind, value))
+
+_refresh_reach()
+
+def emit(mask, count_int, ts=None):
+    """ts: (press, stable, release) clock() 시각 — 있으면 지연 레코드를 출력과 함께 넘김.
+    잠정 탭·잠정 출력이 걸린 확정은 _speculate()가 먼저 처리.
+    매크로가 있으면 먼저 트라이를 한 단계 진행 (버퍼에 들어간 합주는 나중에 확정/원래 값으로)."""
+    if (count_int & SPECULATIVE or _spec is not None) and mask and _speculate(mask, count_int, ts):
+        return
+    if MACRO.tries or MACRO.buf:
+        cnt = 1 if count_int < 1 else (3 if count_int > 3 else count_int)
+        if mask:
+            trie = MACRO.tries.get(lang) if mode == "기본" and not fn_mode and not ctrl_mode and mask < 32 else None
+            if trie is not None:
+                out = MACRO.feed(trie, (cnt << 5) | mask, (mask, cnt, ts), clock())
+            else:
+                out = MACRO.flush() + [(None, (mask, cnt, ts))] if MACRO.buf else None
         else:
-            for other_cnt, group in modesect.items():
-                if other_cnt != cnt_key and bstr in group:
-                    print(f"[HINT] same bits exist under count={other_cnt} (expected cnt={cnt_key})")
-                    break
-    print(f"[MISS] ({lang},{mode}) hand={hand} bits={bits_list} cnt={cnt_key} → 매핑 없음")
-    last_bits = bits_list[:]; last_cnt = int(cnt_key); last_value = None; last_ts = time.time()
+            out = MACRO.expire(clock())     # MACRO_EXPIRE
+        if out is not None:
+            for m, item in out:
+                if m is None:
+                    _emit(*item)
+                else:
+                    _emit_macro(m, *item)
+            return
+    _emit(mask, count_int, ts)
+
+def _speculate(mask, count_int, ts):
+    """(worker) 잠정 탭이면 되돌릴 수 있는 값(줄바꿈 없는 TEXT)만 바로 주입하고 True.
+    확정이면 잠정 출력과 맞춰 봄: 같은 값 → 주입 없이 emit 기록만 하고 True, 다르면 되돌린 뒤 False (평소대로 emit)."""
+    global _spec, spec_hits
+    tentative = count_int & SPECULATIVE
+    cnt = count_int & 3
+    s, _spec = _spec, None
+    if s is not None and s[0] == mask:
+        if not tentative and s[1] == cnt and s[5] == slot_base and CMAP.table[slot_base | (cnt << 5) | mask] is s[2]:
+            spec_hits += 1
+            _emit(mask, cnt, ts, sent=True)
+            return True
+        if s[1] < cnt or not tentative:
+            _retract(s)
+    if not tentative:
+        return False
+    act = CMAP.table[slot_base | (cnt << 5) | mask]
+    if act is None or act.kind != A_TEXT or ctrl_mode or MACRO.buf or not act.value.isprintable():
+        return True                 # 키 조합·명령 등 → 최종 확정 때 평소대로
+    trie = MACRO.tries.get(lang) if MACRO.tries and mode == "기본" and not fn_mode else None
+    if trie is not None and (cnt << 5) | mask in trie:
+        return True                 # 매크로 접두사 → 매크로 매칭에 맡김
+    mark = HANGUL.mark()
+    edit = HANGUL.feed(act.value) if HANGUL_COMPOSE and lang == "KO" else None
+    if edit is None:
+        if HANGUL.history or HANGUL.interrupted:
+            HANGUL.commit()
+        edit = (0, act.value)
+    _spec = (mask, cnt, act, mark, edit, slot_base)
+    if LOG.debug: LOG.add(DEBUG, "SPEC", lang, act.layer, mask, cnt, act.raw, hand)
+    _outq.put((A_EDIT, edit, (lang + "/" + act.layer, ts[0], ts[1], ts[2], clock()) if ts else None))
+    return True
+
+def _retract(s):
+    """(worker) 잠정 출력 s를 지움. 그 뒤 다른 키·포커스 이동이 있었으면 커서가 옮겨졌을 수 있어 그대로 둠."""
+    global spec_rollbacks
+    spec_rollbacks += 1
+    if LOG.debug: LOG.add(DEBUG, "ROLLBACK", lang, s[2].layer, s[0], s[1], s[2].raw, hand)
+    if not HANGUL.interrupted:
+        _outq.put((A_EDIT, HANGUL.undo(s[3], s[4]), None))
+
+def speculation_stats():
+    """잠정 출력 (그대로 확정된 수, 지우고 교체한 수)."""
+    return spec_hits, spec_rollbacks
+
+def _record(t, kind, key, value):
+    """(worker) emit 레코드 하나 — 녹화 중일 때만 부름."""
+    with _cv:
+        rec = REC
+        if rec is not None:
+            rec.add(t, kind, key, slot_base >> 7, value)
+
+def _emit_macro(m, mask, cnt, ts):
+    """매크로 확장: 출력 큐에 A_SEQ 한 항목 (injector가 한 묶음으로 주입)."""
+    t_emit = clock()
+    if REC is not None: _record(t_emit, K_MACRO, cnt, (cnt << 5) | mask)
+    if LOG.info: LOG.add(INFO, "MACRO", lang, mode, mask, cnt, m.raw, m.seq)
+    ENGINE.last = (mask, cnt, m.raw, time.time())
+    _publish("last", ENGINE.last)
+    if emit_hook is not None: emit_hook(mask, cnt, m)
+    HANGUL.commit()
+    _outq.put((A_SEQ, m.items, (lang + "/macro", ts[0], ts[1], ts[2], t_emit) if ts else None))
+
+def _emit(mask, count_int, ts=None, sent=False):
+    """sent=True: 잠정 출력으로 이미 주입된 값 (기록·사용 횟수만)."""
+    t_emit = clock()
+    if mask > 31:
+        _emit_cross(mask, ts, t_emit)
+        return
+    cnt = 1 if count_int < 1 else (3 if count_int > 3 else count_int)
+    idx = slot_base | (cnt << 5) | mask
+    act = CMAP.table[idx]
+    if REC is not None: _record(t_emit, K_EMIT if act is not None else K_MISS, cnt, idx)
+    if act is not None:
+        HITS[idx] += 1
+        if LOG.info: LOG.add(INFO, "SEND", lang, act.layer, mask, cnt, act.raw, hand)
+        ENGINE.last = (mask, cnt, act.raw, time.time())
+        _publish("last", ENGINE.last)
+        if emit_hook is not None: emit_hook(mask, cnt, act)
+        if not sent:
+            send_action(act, (lang + "/" + act.layer, ts[0], ts[1], ts[2], t_emit) if ts else None)
+        return
+    if LOG.debug:
+        hint = CMAP.hints.get(idx)
+        if hint is not None:
+            LOG.add(DEBUG, "HINT", lang, mode, mask, cnt, f"same bits under count={hint[1]}")
+    if LOG.info: LOG.add(INFO, "MISS", lang, mode, mask, cnt, None, hand)
+    ENGINE.last = (mask, cnt, None, time.time())
+    _publish("last", ENGINE.last)
+    if emit_hook is not None: emit_hook(mask, cnt, None)
+    if ts:
+        LATENCY.add(lang + "/" + mode, ts[0], ts[1], ts[2], t_emit, t_emit)
+        _publish("latency")
+
+def _emit_cross(mask, ts, t_emit):
+    """두 손 교차 합주 (10비트 mask, count 1) → CMAP.cross[lang]."""
+    act = CMAP.cross.get(lang, {}).get(mask)
+    if REC is not None: _record(t_emit, K_CROSS if act is not None else K_CROSS_MISS, 1, mask)
+    if act is not None:
+        if LOG.info: LOG.add(INFO, "SEND", lang, act.layer, mask, 1, act.raw, "BOTH")
+        ENGINE.last = (mask, 1, act.raw, time.time())
+        _publish("last", ENGINE.last)
+        if emit_hook is not None: emit_hook(mask, 1, act)
+        send_action(act, (lang + "/" + CROSS, ts[0], ts[1], ts[2], t_emit) if ts else None)
+        return
+    if LOG.info: LOG.add(INFO, "MISS", lang, CROSS, mask, 1, None, "BOTH")
+    ENGINE.last = (mask, 1, None, time.time())
+    _publish("last", ENGINE.last)
+    if emit_hook is not None: emit_hook(mask, 1, None)
+    if ts:
+        LATENCY.add(lang + "/" + CROSS, ts[0], ts[1], ts[2], t_emit, t_emit)
+        _publish("latency")
+
+def snapshot():
+    """합주 상태의 불변 스냅샷 (chordboard_engine.Snapshot). 어느 스레드에서나 락 없이 호출."""
+    return ENGINE.snapshot()
+
+def key_mask():
+    """지금 눌린 키의 10비트 마스크 (왼손 << 5 | 오른손). LED·공유 메모리용, 어느 스레드에서나."""
+    return (_LEFT.mask << 5) | _RIGHT.mask
+
+def latency_stats(layer=None):
+    """{stage: (p50, p95, p99, n)} (초). layer="EN/기본" 처럼 지정하면 해당 레이어만."""
+    return LATENCY.stats(layer)
+
+def latency_stats_by_layer():
+    return LATENCY.stats_by_layer()
 
 def run_command(cmd: str):
-    global mode, lang, ctrl_mode, fn_mode, active
     name, _, arg = (cmd or "").partition('=')
-    name = name.strip(); arg = arg.strip()
+    _dispatch_command(name.strip(), arg.strip(), cmd)
 
+def _dispatch_command(name, arg, cmd=None):
+    global mode, lang, ctrl_mode, fn_mode, active
     if name == 'toggle_active':
         set_active(not active)
     elif name == 'toggle_lang':
         toggle_lang()
     elif name == 'toggle_hand':
         toggle_hand()
+    elif name == 'set_two_hands':
+        set_two_hands(arg.lower() in ('1','true','on','yes'))
+    elif name == 'toggle_two_hands':
+        set_two_hands(not two_hands)
     elif name == 'set_active':
         val = arg.lower() in ('1','true','on','yes')
         set_active(val)
@@ -122,170 +482,979 @@ def run_command(cmd: str):
         set_hand(arg.upper() if arg else arg)
     elif name == 'set_lang':
         if arg in ('EN','KO'):
-            lang = arg; print(f"[STATE] lang = {lang}")
+            lang = arg; _refresh_reach(); _log_state("lang", lang)
     elif name == 'set_mode':
         if arg in ('기본','SHIFT','SWITCH','Fn'):
-            mode = arg; print(f"[STATE] mode = {mode}")
+            mode = arg; _refresh_reach(); _log_state("mode", mode)
     elif name == 'toggle_ctrl':
-        ctrl_mode = not ctrl_mode; print(f"[STATE] ctrl_mode = {ctrl_mode}")
+        ctrl_mode = not ctrl_mode; _publish("state"); _log_state("ctrl_mode", ctrl_mode)
     elif name == 'toggle_fn':
-        fn_mode = not fn_mode; print(f"[STATE] fn_mode = {fn_mode}")
+        fn_mode = not fn_mode; _refresh_reach(); _log_state("fn_mode", fn_mode)
+    elif name == 'set_roll':
+        set_roll(arg.lower() in ('1','true','on','yes'))
+    elif name == 'toggle_roll':
+        set_roll(not ROLL_MODE[hand])
+    elif name == 'set_speculate':
+        set_speculate(arg.lower() in ('1','true','on','yes'))
+    elif name == 'toggle_speculate':
+        set_speculate(not SPECULATE)
+    elif name == 'set_log':
+        if arg.lower() in ('debug','info','warn','error','off'):
+            set_log_level(arg.lower())
+    elif name == 'set_profile':
+        set_profile(arg)
+    elif name == 'reload_mapping':
+        # worker(emit) 안에서 호출됨 → 컴파일은 별도 스레드로
+        threading.Thread(target=reload_mapping, daemon=True).start()
+    elif name == 'save_usage':
+        save_usage()
+    elif name == 'learn':
+        start_learn(arg.upper() or None)
+    elif name == 'cancel_learn':
+        cancel_learn()
+    elif name == 'record':
+        # 파일 생성·마무리는 worker 밖에서
+        threading.Thread(target=set_recording, args=(arg.lower() in ('1','true','on','yes'),), daemon=True).start()
+    elif name == 'status':
+        # CPU 사용률 샘플링(1초)이 worker를 막지 않도록 별도 스레드
+        threading.Thread(target=report_status, daemon=True).start()
+    elif name == 'open_ui':
+        if UI_OPENER is not None:
+            UI_OPENER()
+        else:
+            LOG.add(WARN, "CMD", value="open_ui: UI is already running (headless daemon only)")
+    elif name == 'reload_macros':
+        threading.Thread(target=load_macros_file, daemon=True).start()
     elif name in ('exit','quit'):
         try: set_active(False)
         except Exception: pass
-        os._exit(0)
+        quit_app()
     else:
-        print(f"[CMD] Unknown command: {cmd!r}")
+        LOG.add(WARN, "CMD", value=f"unknown command {cmd if cmd is not None else name!r}")
 
 def send_value(val: str):
+    send_action(compile_value(val))
+
+def send_action(act, rec=None):
+    """rec: (layer, press, stable, release, emit) 지연 레코드 — 주입 완료 시점에 LATENCY에 기록."""
     global mode, ctrl_mode, fn_mode, injecting
+    kind = act.kind
 
-    if val in ("shift", "switch", "ctrl", "Fn", "fn"):
-        if val == "shift":
-            mode = "SHIFT" if mode == "기본" else "기본"; print(f"[STATE] mode = {mode}")
-        elif val == "switch":
-            mode = "SWITCH" if mode != "SWITCH" else "기본"; print(f"[STATE] mode = {mode}")
-        elif val == "ctrl":
-            ctrl_mode = not ctrl_mode; print(f"[STATE] ctrl_mode = {ctrl_mode}")
-        else:  # Fn
-            fn_mode = not fn_mode; print(f"[STATE] fn_mode = {fn_mode}")
+    if kind == A_TOGGLE:
+        v = act.value
+        if v == "shift":
+            mode = "SHIFT" if mode == "기본" else "기본"; _log_state("mode", mode)
+        elif v == "switch":
+            mode = "SWITCH" if mode != "SWITCH" else "기본"; _log_state("mode", mode)
+        elif v == "ctrl":
+            ctrl_mode = not ctrl_mode; _log_state("ctrl_mode", ctrl_mode)
+        else:  # fn
+            fn_mode = not fn_mode; _log_state("fn_mode", fn_mode)
+        _refresh_reach()
+        if rec: LATENCY.add(*rec, clock()); _publish("latency")
         return
 
-    if isinstance(val, str) and val.startswith('cmd:'):
-        run_command(val[4:]); return
+    if kind == A_CMD:
+        _dispatch_command(act.value, act.arg, act.raw[4:])
+        if rec: LATENCY.add(*rec, clock()); _publish("latency")
+        return
 
-    raw = WORDS_TO_CHARS.get(val, val)
-    injecting += 1
-    try:
-        if isinstance(raw, str) and len(raw) == 1:
-            if ctrl_mode:
-                keyboard.send(f"ctrl+{raw}"); ctrl_mode = False
-            else:
-                keyboard.write(raw)
-            return
-        norm = normalize_value(raw)
-        if ctrl_mode and isinstance(norm, str) and "+" not in norm and len(norm) == 1:
-            keyboard.send(f"ctrl+{norm}"); ctrl_mode = False
+    if kind == A_TEXT and ctrl_mode:
+        ctrl_mode = False
+        _publish("state")
+        HANGUL.commit()
+        _outq.put((A_KEY, "ctrl+" + act.value, rec))
+        return
+    if HANGUL_COMPOSE and lang == "KO":
+        # 자모 → 음절 조합 편집, 조합 중 backspace → 자모 하나 되돌림 (그 외 출력은 조합 확정)
+        if kind == A_TEXT:
+            edit = HANGUL.feed(act.value)
+        elif act.value == "backspace":
+            edit = HANGUL.backspace()
         else:
-            keyboard.send(norm)
-    finally:
-        injecting = max(0, injecting-1)
-
-def _remove_hooks():
-    global HOOK_PRESS, HOOK_RELEASE
-    for d in (HOOK_PRESS, HOOK_RELEASE):
-        for k, h in list(d.items()):
-            try: keyboard.unhook(h)
-            except Exception: pass
-        d.clear()
-
-def _install_hooks(suppress=True):
-    global HOOK_PRESS, HOOK_RELEASE
-    _remove_hooks()
-    HOOK_PRESS, HOOK_RELEASE = {}, {}
-    for k in CHORD_KEYS:
+            edit = None
+            HANGUL.commit()
+        if edit is not None:
+            _outq.put((A_EDIT, edit, rec))
+            return
+    elif HANGUL.history:
+        HANGUL.commit()
+    _outq.put((kind, act.value, rec))   # 큐가 가득 차면 여기서 대기 (worker 스레드만 호출)
+
+def injector():
+    """출력 큐 소비자. 연속된 TEXT/EDIT는 keyboard.write 한 번으로 합쳐서 주입."""
+    get, get_nowait = _outq.get, _outq.get_nowait
+    while True:
+        batch = [get()]
+        try:
+            while len(batch) < OUTQ_MAX:
+                batch.append(get_nowait())
+        except queue.Empty:
+            pass
+        _inject_batch(batch)
+
+def flush_output():
+    """injector 스레드 없이 큐에 쌓인 출력을 지금 주입 (리플레이용)."""
+    batch = []
+    try:
+        while True:
+            batch.append(_outq.get_nowait())
+    except queue.Empty:
+        pass
+    if batch:
+        _inject_batch(batch)
+
+def _flatten_seq(batch):
+    """A_SEQ 항목을 (kind, 값, None) 항목들로 펼침 (지연 레코드는 묶음의 마지막 항목에)."""
+    out = []
+    for kind, value, rec in batch:
+        if kind != A_SEQ:
+            out.append((kind, value, rec))
+            continue
+        last = len(value) - 1
+        out.extend((k, v, rec if j == last else None) for j, (k, v) in enumerate(value))
+    return out
+
+def _inject_batch(batch):
+    global injecting
+    for item in batch:
+        if item[0] == A_SEQ:
+            batch = _flatten_seq(batch)
+            break
+    i, n = 0, len(batch)
+    while i < n:
+        kind, value, rec = batch[i]
+        recs = [rec] if rec else []
+        i += 1
+        back = 0
+        if kind == A_TEXT or kind == A_EDIT:
+            # 연속 구간을 문자열 하나로: 구간 안에서 지울 글자는 문자열에서 바로 지움
+            run = ""
+            while True:
+                if kind == A_TEXT:
+                    run += value
+                else:
+                    b, text = value
+                    if b > len(run):
+                        back += b - len(run); run = ""
+                    elif b:
+                        run = run[:-b]
+                    run += text
+                if i >= n or batch[i][0] not in (A_TEXT, A_EDIT):
+                    break
+                kind, value, r = batch[i]
+                if r: recs.append(r)
+                i += 1
+            kind, value = A_TEXT, run
+        injecting += 1
         try:
-            HOOK_PRESS[k] = keyboard.on_press_key(k, on_press, suppress=suppress)
-            HOOK_RELEASE[k] = keyboard.on_release_key(k, on_release, suppress=suppress)
+            for _ in range(back):
+                keyboard.send("backspace")
+            if kind != A_TEXT:
+                keyboard.send(value)
+            elif value:
+                keyboard.write(value)
         except Exception as e:
-            print(f"[HOOK] install failed for {k}: {e}")
+            LOG.add(WARN, "INJECT", value=repr(value), extra=f"failed: {e}")
+        finally:
+            injecting = max(0, injecting-1)
+        if recs:
+            done = clock()
+            for r in recs:
+                LATENCY.add(*r, done)
+            _publish("latency")
+
+def _key_table(keys):
+    """keys → ({scan_code: 비트}, {이름: 비트})."""
+    scan, names = {}, {}
+    for i, k in enumerate(keys):
+        codes = ()
+        if keyboard is not None:
+            try: codes = keyboard.key_to_scan_codes(k)
+            except Exception: codes = ()
+        if codes:
+            for sc in codes:
+                scan.setdefault(sc, KEY_BITS[i])
+        else:
+            names[k] = KEY_BITS[i]
+    return scan, names
+
+def _rebuild_key_tables():
+    global KEY_TABLES, ALL_KEYS
+    r, l = _key_table(RIGHT_CHORD_KEYS), _key_table(LEFT_CHORD_KEYS)
+    both = tuple({**{k: b << 5 for k, b in lt.items()}, **rt} for rt, lt in zip(r, l))   # 겹치는 키는 오른손
+    KEY_TABLES = {'RIGHT': r, 'LEFT': l, 'BOTH': both}
+    ALL_KEYS = sorted(set(RIGHT_CHORD_KEYS + LEFT_CHORD_KEYS))
+    _select_input()
+
+def _select_input():
+    """hand·two_hands → 키 인덱스·입력 엔진 (참조 교체만, 호출자가 _cv 보유 또는 훅 설치 전)."""
+    global SCAN_INDEX, NAME_INDEX, ENGINE, _LO_ENGINE
+    SCAN_INDEX, NAME_INDEX = KEY_TABLES['BOTH' if two_hands else hand]
+    ENGINE = ENGINES[hand]
+    _LO_ENGINE = _RIGHT if two_hands else ENGINE
+    for h, eng in ENGINES.items():
+        eng.roll = ROLL_MODE[h]
+        eng.speculate = SPECULATE and not two_hands and eng is ENGINE
+
+def _remove_hook():
+    global HOOK
+    if HOOK is not None:
+        try: keyboard.unhook(HOOK)
+        except Exception: pass
+        HOOK = None
+
+def _install_hook():
+    """전역 훅 1개 설치 (suppress=True: 콜백이 False를 돌려주면 그 이벤트 차단)."""
+    global HOOK
+    _remove_hook()
+    _rebuild_key_tables()
+    try:
+        HOOK = keyboard.hook(_on_event, suppress=True)
+    except Exception as e:
+        LOG.add(WARN, "HOOK", value=f"install failed: {e}")
+
+def _reset_chord_state():
+    global _cross_since, _cross_mask, _cross_held, _spec
+    with _cv:
+        for eng in ENGINES.values():
+            eng.reset()
+        _cross_since = 0.0
+        _cross_mask = _cross_held = 0
+        _cross_fires.clear()
+        _spec = None                # 잠정 출력은 화면에 남은 그대로
+        HANGUL.interrupted = True
+        _cv.notify()
+    _publish(*_KEY_EVENTS[0])
 
 def set_active(on: bool):
-    global active, bits, pressing, pending_chord_seen, tap_count, series_bits, series_deadline
+    global active
     active = on
-    if on:
-        _install_hooks(suppress=True)
-    else:
-        _remove_hooks()
-        bits = [0,0,0,0,0]; pressing = False
-        pending_chord_seen = False; tap_count = 0
-        series_bits = None; series_deadline = 0.0
-    print(f"[MODE] Chord mode {'ON' if on else 'OFF'} (hand={hand})")
+    _set_timer_resolution(on)
+    if not on:
+        _reset_chord_state()
+    _publish("state")
+    _log_state("active", on)
 
 def toggle_active(): set_active(not active)
 
 def set_hand(new_hand: str):
-    global hand, CHORD_KEYS, KEY_INDEX, bits, pressing, pending_chord_seen, tap_count, series_bits, series_deadline
+    global hand, CHORD_KEYS
     if new_hand not in ('LEFT','RIGHT'): return
-    if active: _remove_hooks()
-    hand = new_hand
-    CHORD_KEYS = RIGHT_CHORD_KEYS if hand == 'RIGHT' else LEFT_CHORD_KEYS
-    KEY_INDEX = {k: i for i, k in enumerate(CHORD_KEYS)}
-    bits = [0,0,0,0,0]; pressing = False
-    pending_chord_seen = False; tap_count = 0; series_bits = None; series_deadline = 0.0
-    if active: _install_hooks(suppress=True)
-    print(f"[STATE] hand = {hand}  (keys={CHORD_KEYS})")
+    if not KEY_TABLES: _rebuild_key_tables()
+    with _cv:
+        hand = new_hand
+        CHORD_KEYS = RIGHT_CHORD_KEYS if hand == 'RIGHT' else LEFT_CHORD_KEYS
+        _select_input()
+    _reset_chord_state()
+    _refresh_reach()
+    _log_state("hand", hand)
+
+def set_two_hands(on: bool):
+    """두 손 동시 모드 ON/OFF: 양손 5키를 함께 인식 (손마다 엔진, 같은 worker·출력 큐) + CROSS 레이어."""
+    global two_hands
+    if not KEY_TABLES: _rebuild_key_tables()
+    with _cv:
+        two_hands = bool(on)
+        _select_input()
+    _reset_chord_state()
+    _refresh_reach()
+    _log_state("two_hands", two_hands)
+
+def set_chord_keys(which: str, keys):
+    """손별 5키 재지정 (학습 모드). 테이블만 다시 계산, 훅은 그대로."""
+    global RIGHT_CHORD_KEYS, LEFT_CHORD_KEYS
+    keys = list(keys)[:5]
+    if which not in ('LEFT','RIGHT') or len(keys) != 5: return
+    if which == 'RIGHT':
+        RIGHT_CHORD_KEYS = keys
+    else:
+        LEFT_CHORD_KEYS = keys
+    _rebuild_key_tables()
+    set_hand(hand)
+    _publish("layout")
 
 def toggle_hand(): set_hand('LEFT' if hand == 'RIGHT' else 'RIGHT')
 
+def start_learn(which=None):
+    """학습 모드 시작: which 손(기본 = 현재 손)의 5키를 누른 순서대로 받아 set_chord_keys (ESC 취소).
+    반환: 시작했는가."""
+    global _learn
+    which = which or hand
+    if keyboard is None or _learn is not None or which not in ('LEFT','RIGHT'):
+        return False
+    set_active(False)
+    keys = []
+    def on_ev(e):
+        if e.event_type != "down":
+            return
+        if e.name == "esc":
+            _end_learn(False)
+            return
+        if e.name not in keys:
+            keys.append(e.name)
+            _publish("learn", (which, tuple(keys), None))
+        if len(keys) >= 5:
+            _end_learn(True)
+    _learn = (which, keys, keyboard.hook(on_ev))
+    _publish("learn", (which, (), None))
+    _log_state("learn", which)
+    return True
+
+def cancel_learn():
+    _end_learn(False)
+
+def _end_learn(apply):
+    global _learn
+    if _learn is None:
+        return
+    which, keys, handle = _learn
+    _learn = None
+    try: keyboard.unhook(handle)
+    except Exception: pass
+    if apply:
+        set_chord_keys(which, keys[:5])
+    result = "applied" if apply else "canceled"
+    _publish("learn", (which, tuple(keys), result))
+    _log_state("learn", f"{which} {result} {keys[:5]}")
+
+def set_profile(name: str):
+    """프로필 전환: 캐시된 컴파일 매핑으로 참조 교체 (처음 쓰는 매핑만 로드) + lang/mode/hand 적용.
+    반환: 성공 여부."""
+    global profile, lang, mode, _next_map
+    prof = PROFILES.get(name)
+    if prof is None:
+        LOG.add(WARN, "PROFILE", value=f"unknown profile {name!r}")
+        return False
+    try:
+        with _reload_lock:
+            raw, cm = LAYOUTS.get(prof.mapping)
+    except (OSError, ValueError) as e:
+        LOG.add(WARN, "PROFILE", value=name, extra=f"mapping load failed, keeping current: {e}")
+        return False
+    with _cv:
+        profile = name
+        if cm is not (_next_map[1] if _next_map is not None else CMAP):
+            _next_map = (raw, cm, prof.mapping)
+            if _worker_alive:
+                _cv.notify()
+            else:
+                _swap_map()
+        if prof.lang: lang = prof.lang
+        if prof.mode: mode = prof.mode
+    HANGUL.interrupted = True
+    if prof.hand and prof.hand != hand:
+        set_hand(prof.hand)
+    _refresh_reach()
+    if LOG.info: LOG.add(INFO, "PROFILE", lang, mode, value=name, extra=f"hand={hand}")
+    return True
+
+def _check_foreground():
+    """합주 시작 때 (worker, 락 밖) 전경 창이 바뀌었으면 매칭되는 프로필로 전환."""
+    global _fg_check, _fg_key
+    _fg_check = False
+    src = FOREGROUND_SOURCE
+    if src is None:
+        return
+    try:
+        fg = src()
+    except Exception:
+        return
+    if fg is None or fg == _fg_key:
+        return
+    _fg_key = fg
+    name = match_profile(PROFILE_INDEX, *fg)
+    if name != profile:
+        set_profile(name)
+
+def set_roll(on: bool, which=None):
+    """롤링 합주 인식 ON/OFF (which: 'LEFT'/'RIGHT', 기본 = 현재 손)."""
+    which = which or hand
+    if which not in ROLL_MODE: return
+    ROLL_MODE[which] = bool(on)
+    if which == hand or two_hands:
+        with _cv:
+            ENGINES[which].roll = ROLL_MODE[which]
+        _reset_chord_state()
+    _publish("state")
+    _log_state(f"roll[{which}]", ROLL_MODE[which])
+
+def set_speculate(on: bool):
+    """잠정 출력 ON/OFF (한 손 모드만 — 두 손 모드에서는 꺼진 것과 같음)."""
+    global SPECULATE
+    SPECULATE = bool(on)
+    with _cv:
+        _select_input()
+    _publish("state")
+    _log_state("speculate", SPECULATE)
+
 def toggle_lang():
     global lang
     lang = "KO" if lang == "EN" else "EN"
-    print(f"[STATE] lang = {lang}")
-
-def on_press(e):
-    global injecting, last_change_ts, pressing, pending_chord_seen
-    if injecting > 0 or not active: return
-    name = e.name
-    if name in KEY_INDEX:
-        i = KEY_INDEX[name]
-        if bits[i] == 0:
-            bits[i] = 1
-            last_change_ts = time.time()
-            pressing = True
-            try: keyboard.suppress_event()
-            except Exception: pass
-
-def on_release(e):
-    global injecting, last_change_ts, pressing, pending_chord_seen, pending_bits, series_bits, tap_count, series_deadline
-    if injecting > 0 or not active: return
-    name = e.name
-    if name in KEY_INDEX:
-        i = KEY_INDEX[name]
-        if bits[i] == 1:
-            bits[i] = 0
-            last_change_ts = time.time()
-            if sum(bits) == 0:
-                # 전체 릴리즈: 이번 프레스의 안정 비트가 있다면 탭 누적
-                if pending_chord_seen:
-                    if series_bits is None:
-                        series_bits = pending_bits[:]
-                    else:
-                        if "".join(str(b) for b in pending_bits) != "".join(str(b) for b in series_bits):
-                            emit(series_bits, tap_count)
-                            tap_count = 0
-                            series_bits = pending_bits[:]
-                    tap_count = min(3, tap_count + 1)
-                    series_deadline = time.time() + TAP_GAP
-                    pending_chord_seen = False
-                pressing = False
-            try: keyboard.suppress_event()
-            except Exception: pass
+    _refresh_reach()
+    _log_state("lang", lang)
+
+def _on_event(e):
+    """전역 훅 콜백 (모든 키 이벤트). True=통과, False=차단."""
+    if not active or injecting > 0:
+        return True
+    bit = SCAN_INDEX.get(e.scan_code)
+    if bit is None:
+        bit = NAME_INDEX.get(e.name) if NAME_INDEX else None
+        if bit is None:
+            if e.event_type == "down":
+                HANGUL.interrupted = True   # 다른 키 입력 → 커서가 옮겨졌을 수 있으니 조합 확정
+            return True
+    global _fg_check
+    t0 = clock()
+    eng = _LO_ENGINE
+    if bit > 16:                    # 두 손 모드의 왼손 키 (비트 << 5)
+        eng = _LEFT
+        bit >>= 5
+    with _cv:
+        down = e.event_type == "down"
+        if down and not eng.mask and FOREGROUND_SOURCE is not None:
+            _fg_check = True        # 합주 시작 → worker가 전경 창으로 프로필 확인
+        if _cross_on:
+            changed = _cross_key(eng, bit, down, t0)
+        elif down:
+            changed = eng.down(bit, t0)
+        else:
+            changed = eng.up(bit, t0)
+        if changed:
+            _cv.notify()    # DEBOUNCE/TAP_GAP 데드라인 재무장 / fires 처리
+            if REC is not None:
+                REC.add(t0, K_DOWN if down else K_UP,
+                        _KEY_CODE[bit] | (KEY_LEFT if eng is _LEFT else 0) | (KEY_ROLL if eng.roll else 0)
+                        | (KEY_TWO_HANDS if two_hands else 0),
+                        slot_base >> 7, (_LEFT.mask << 5) | _RIGHT.mask)
+    if changed and _events is not None:
+        _events.put(_KEY_EVENTS[(_LEFT.mask << 5) | _RIGHT.mask])
+    _note_hook_time(t0)
+    return False
+
+def _cross_key(eng, bit, down, t):
+    """(_cv 보유, 두 손 모드 + CROSS 레이어) 키 이벤트 하나. 교차 합주 중이면 엔진 대신 여기서 누적."""
+    global _cross_since, _cross_mask, _cross_held
+    if _cross_mask:
+        b = bit << 5 if eng is _LEFT else bit
+        if down:
+            if _cross_held & b:
+                return False
+            _cross_mask |= b
+            _cross_held |= b
+            return True
+        eng.up(bit, t)              # 캡처 때 눌려 있던 키 → 엔진의 stale 정리
+        if not _cross_held & b:
+            return False
+        _cross_held ^= b
+        if not _cross_held:
+            _cross_fires.append((_cross_mask, 1, (_cross_ts[0], _cross_ts[1], t)))
+            _cross_mask = 0
+        return True
+    changed = eng.down(bit, t) if down else eng.up(bit, t)
+    if changed:
+        both = (_LEFT.mask & ~_LEFT.stale) and (_RIGHT.mask & ~_RIGHT.stale)
+        _cross_since = t if both else 0.0
+    return changed
+
+def _cross_capture(now):
+    """(_cv 보유) 양손이 DEBOUNCE 동안 함께 눌림 → 두 엔진의 프레스를 떼어 내 교차 합주 시작."""
+    global _cross_since, _cross_mask, _cross_held, _cross_ts
+    _cross_ts = (min(_LEFT.press_ts, _RIGHT.press_ts), now)
+    _cross_mask = _cross_held = (_LEFT.abandon() << 5) | _RIGHT.abandon()
+    _cross_since = 0.0
+
+def _note_hook_time(t0):
+    global hook_calls, hook_max
+    dt = clock() - t0
+    hook_calls += 1
+    if dt > hook_max:
+        hook_max = dt
+
+def hook_stats(reset=False):
+    """(훅 콜백 호출 수, 최대 소요 시간[초]). reset=True면 측정값 초기화."""
+    global hook_calls, hook_max
+    stats = (hook_calls, hook_max)
+    if reset:
+        hook_calls, hook_max = 0, 0.0
+    return stats
+
+def resource_usage(sample=1.0):
+    """(RSS 바이트|None, 스레드 수, sample초 동안의 CPU 사용률 %) — 헤드리스/UI 실행 비교용. sample초 동안 블록."""
+    t0, c0 = time.perf_counter(), os.times()
+    time.sleep(sample)
+    t1, c1 = time.perf_counter(), os.times()
+    cpu = ((c1.user - c0.user) + (c1.system - c0.system)) / (t1 - t0) * 100.0
+    return _rss(), threading.active_count(), cpu
+
+def _rss():
+    """현재 작업 집합(RSS) 바이트. 얻을 수 없으면 None."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            class PMC(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            pmc = PMC()
+            pmc.cb = ctypes.sizeof(PMC)
+            k32 = ctypes.windll.kernel32
+            k32.GetCurrentProcess.restype = wintypes.HANDLE
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(k32.GetCurrentProcess(), ctypes.byref(pmc), pmc.cb):
+                return None
+            return pmc.WorkingSetSize
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def status_line(sample=1.0):
+    """상태 한 줄 요약 (헤드리스에서 창 대신). sample초 동안 CPU를 재므로 worker·훅 밖에서 호출."""
+    rss, threads, cpu = resource_usage(sample)
+    p50, p95, _, n = LATENCY.stats()["response"]
+    _, hmax = hook_stats()
+    parts = [f"chord {'ON' if active else 'OFF'}", f"{lang} {'Fn → ' if fn_mode else ''}{mode}",
+             f"hand {'BOTH' if two_hands else hand}", f"profile {profile}",
+             f"keys R={RIGHT_CHORD_KEYS} L={LEFT_CHORD_KEYS}"]
+    if _learn is not None:
+        parts.append(f"learning {_learn[0]} {len(_learn[1])}/5")
+    if SPECULATE or spec_hits or spec_rollbacks:
+        parts.append(f"speculative {spec_hits} kept / {spec_rollbacks} rolled back")
+    rec = REC
+    if rec is not None:
+        parts.append(f"recording {rec.written} records ({len(rec.files)} file(s), {rec.dropped} dropped)")
+    parts += [f"response p50 {p50 * 1e3:.1f} p95 {p95 * 1e3:.1f} ms (n={n})" if n else "response -",
+              f"hook max {hmax * 1e6:.0f} µs",
+              f"wakeups/s {wakeup_rate():.1f}", f"rss {rss / 2**20:.1f} MB" if rss is not None else "rss -",
+              f"threads {threads}", f"cpu {cpu:.2f}%"]
+    return " | ".join(parts)
+
+def report_status(sample=1.0):
+    """status_line()을 STATUS 로그 레코드로 (콘솔·로그 파일에 보임). 반환: 그 줄."""
+    line = status_line(sample)
+    LOG.add(INFO, "STATUS", value=line)
+    return line
+
+def _record_meta():
+    """녹화 파일 헤더 메타 (새 파일마다)."""
+    return {"mapping": _hits_path, "langs": list(CMAP.langs), "layers": list(CMAP.layers),
+            "keys": {"RIGHT": list(RIGHT_CHORD_KEYS), "LEFT": list(LEFT_CHORD_KEYS)},
+            "debounce": _RIGHT.debounce, "tap_gap": _RIGHT.tap_gap}
+
+def set_recording(on: bool):
+    """세션 녹화 ON/OFF (RECORD_DIR에 .cbr, 읽기는 chordboard_record.py). 파일 생성·정리는 락 밖에서."""
+    global REC
+    new = None
+    if on and REC is None:
+        try:
+            new = Recorder(RECORD_DIR, RECORD_FILE_BYTES, RECORD_FILES, _record_meta)
+        except OSError as e:
+            LOG.add(WARN, "RECORD", value=RECORD_DIR, extra=f"cannot start: {e}")
+            return
+    with _cv:
+        if not on:
+            old, REC = REC, None
+        elif REC is None:
+            old, REC = None, new
+        else:
+            old = None              # 이미 녹화 중
+    if new is not None and REC is not new:
+        new.close()
+        for f in new.files:
+            try: os.remove(f)
+            except OSError: pass
+        return
+    if old is not None:
+        old.close()
+        if LOG.info: LOG.add(INFO, "RECORD", value=old.files[-1] if old.files else RECORD_DIR,
+                             extra=f"stopped: {old.written} records in {len(old.files)} file(s), {old.dropped} dropped")
+    elif new is not None and LOG.info:
+        LOG.add(INFO, "RECORD", value=new.files[0], extra="started")
+    _publish("state")
+
+def _next_deadline():
+    """다음으로 worker가 깨어나야 할 시각 (clock() 기준). 없으면 None → 이벤트가 올 때까지 대기."""
+    if not active:
+        return None
+    d = _LO_ENGINE.next_deadline()
+    if two_hands:
+        for x in (_LEFT.next_deadline(), _cross_since + _RIGHT.debounce if _cross_since else None):
+            if x is not None and (d is None or x < d):
+                d = x
+    if MACRO.buf and not _typing():     # 합주 입력 중에는 매크로 대기 보류
+        if d is None or MACRO.deadline < d:
+            return MACRO.deadline
+    return d
+
+def _typing():
+    """(_cv 보유) 눌린 키·진행 중인 멀티탭 시리즈·교차 합주가 있는가."""
+    lo = _LO_ENGINE
+    if lo.mask or lo.series_mask:
+        return True
+    return two_hands and bool(_LEFT.mask or _LEFT.series_mask or _cross_mask)
+
+def _release_ts(fire):
+    return fire[2][2]
+
+def _collect_fires():
+    """(_cv 보유 상태에서) 지금 처리할 확정 목록. DEBOUNCE 캡처와 TAP_GAP 만료도 여기서 처리.
+    두 손 모드: 양손 엔진·교차 합주의 확정을 릴리즈 시각 순으로 합침."""
+    if active:
+        now = clock()
+        if two_hands:
+            if _cross_since and now >= _cross_since + _RIGHT.debounce:
+                _cross_capture(now)
+            fire = [*_RIGHT.collect(now), *_LEFT.collect(now), *_cross_fires]
+            _cross_fires.clear()
+            if len(fire) > 1:
+                fire.sort(key=_release_ts)
+        else:
+            fire = _LO_ENGINE.collect(now)
+        if MACRO.buf and not _typing() and now >= MACRO.deadline:
+            fire = list(fire) + [MACRO_EXPIRE]
+        return fire
+    fire = [f for eng in ENGINES.values() for f in eng.fires] + _cross_fires
+    for eng in ENGINES.values():
+        eng.fires = []
+    _cross_fires.clear()
+    return fire
+
+def pump():
+    """worker/injector 스레드 없이 현재 clock() 시각까지 한 번 처리 (리플레이·테스트용).
+    반환: 다음 데드라인 (없으면 None)."""
+    if _fg_check: _check_foreground()
+    with _cv:
+        if _next_map is not None: _swap_map()
+        fire = _collect_fires()
+    for mask, cnt, ts in fire:
+        emit(mask, cnt, ts)
+    flush_output()
+    with _cv:
+        return _next_deadline()
 
 def worker():
-    global pending_chord_seen, pending_bits, series_deadline, last_bits, last_cnt, last_value, last_ts, series_bits, tap_count
+    global wakeups, _worker_alive
+    with _cv:
+        _worker_alive = True
+        while True:
+            if (not _LO_ENGINE.fires and not (two_hands and (_LEFT.fires or _cross_fires))
+                    and _next_map is None and not _fg_check):
+                deadline = _next_deadline()
+                if deadline is None:
+                    _cv.wait()
+                else:
+                    remaining = deadline - clock()
+                    if remaining > SPIN_MARGIN:
+                        _cv.wait(remaining - SPIN_MARGIN)
+                    elif remaining > 0:
+                        # 마지막 구간은 락을 놓고 양보-스핀 → OS 타이머 해상도와 무관하게 sub-ms 정확도
+                        _cv.release()
+                        try:
+                            while clock() < deadline:
+                                time.sleep(0)
+                        finally:
+                            _cv.acquire()
+                wakeups += 1
+
+            if _fg_check:
+                _cv.release()
+                try:
+                    _check_foreground()
+                finally:
+                    _cv.acquire()
+            if _next_map is not None:
+                _swap_map()
+            fire = _collect_fires()
+            if fire:
+                # emit(명령 처리·큐잉)은 락 밖에서 → 훅 콜백이 대기하지 않음
+                _cv.release()
+                try:
+                    for mask, cnt, ts in fire:
+                        emit(mask, cnt, ts)
+                finally:
+                    _cv.acquire()
+
+def wakeup_rate():
+    """worker 초당 깨어남 횟수 (직전 측정 후 1초 이상 지났을 때만 갱신). 유휴 상태면 ~0."""
+    global _wk_t0, _wk_n0, wakeups_per_sec
+    now = clock()
+    dt = now - _wk_t0
+    if dt >= 1.0:
+        n = wakeups
+        wakeups_per_sec = (n - _wk_n0) / dt
+        _wk_t0, _wk_n0 = now, n
+    return wakeups_per_sec
+
+def _set_timer_resolution(on: bool):
+    """합주 ON 동안만 Windows 시스템 타이머를 1ms로 (대기 타임아웃 해상도 15.6ms → 1ms)."""
+    global _timer_hi
+    if on == _timer_hi or sys.platform != "win32":
+        return
+    try:
+        import ctypes
+        winmm = ctypes.windll.winmm
+        (winmm.timeBeginPeriod if on else winmm.timeEndPeriod)(1)
+        _timer_hi = on
+    except Exception:
+        pass
+
+# ── 매핑 핫 리로드 ─────────────────────────────────────────────
+def reload_mapping(path=None):
+    """매핑 파일을 다시 읽어 검증·컴파일(바뀐 레이어만)하고 교체. 실패하면 기존 테이블 유지.
+    path 기본값은 현재 프로필의 매핑. 다른 프로필의 매핑이면 캐시만 갱신. 반환: last_reload 튜플."""
+    global _next_map, last_reload
+    with _reload_lock:
+        path = path or PROFILES[profile].mapping
+        current = path == PROFILES[profile].mapping
+        t0 = time.perf_counter()
+        try:
+            if current:
+                prev = _next_map[1] if _next_map is not None else CMAP
+            else:
+                prev = (LAYOUTS.peek(path) or (None, None))[1]
+            raw, cm = load_mapping(path, prev)
+        except (OSError, ValueError) as e:      # json 오류도 ValueError
+            last_reload = (False, (time.perf_counter() - t0) * 1e3, 0, 0, str(e), time.time())
+            _publish("reload", last_reload)
+            LOG.add(WARN, "MAP", value=path, extra=f"reload failed, keeping current mapping: {e}")
+            return last_reload
+        ms = (time.perf_counter() - t0) * 1e3
+        LAYOUTS.put(path, (raw, cm))
+        if current:
+            with _cv:
+                _next_map = (raw, cm, path)
+                if _worker_alive:
+                    _cv.notify()
+                else:
+                    _swap_map()
+        last_reload = (True, ms, cm.rebuilt, cm.reused, None, time.time())
+        _publish("reload", last_reload)
+        if LOG.info:
+            LOG.add(INFO, "MAP", value=path, extra=f"reloaded in {ms:.1f} ms (recompiled {cm.rebuilt}/{cm.rebuilt + cm.reused} layer slots)")
+        return last_reload
+
+def _swap_map():
+    """(_cv 보유) 대기 중인 매핑으로 교체. 이전 매핑의 사용 횟수는 USAGE로."""
+    global MAP, CMAP, _next_map, HITS, _hits_path
+    _fold_hits(USAGE, CMAP, HITS, _hits_path)
+    MAP, CMAP, _hits_path = _next_map
+    HITS = [0] * len(CMAP.table)
+    _next_map = None
+    for eng in ENGINES.values():
+        eng.reach = CMAP.reach
+    _refresh_reach()
+
+# ── 매크로 ─────────────────────────────────────────────────────
+def load_macros_file(path=None):
+    """macros.json을 읽어 트라이 교체 (진행 중인 버퍼는 다음 합주·시간 초과 때 원래 값으로). 반환: 항목 수 (실패 시 None)."""
+    path = path or MACROS_PATH
+    t0 = time.perf_counter()
+    try:
+        tries, n = load_macros(path)
+    except OSError:
+        return None
+    except ValueError as e:
+        LOG.add(WARN, "MACROS", value=path, extra=f"not loaded: {e}")
+        return None
+    MACRO.tries = tries             # 참조 교체 (worker는 emit마다 한 번 읽음)
+    if LOG.info: LOG.add(INFO, "MACROS", value=path, extra=f"{n} macros in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    return n
+
+# ── 사용 횟수 ──────────────────────────────────────────────────
+def _fold_hits(usage, cm, hits, path, reset=True):
+    """테이블 인덱스 카운터 → usage[path][lang][mode][count][bits]에 더함 (reset이면 카운터 0으로)."""
+    per_lang = 2 * len(cm.layers)
+    out = usage.setdefault(path, {})
+    for idx, n in enumerate(hits):
+        if not n:
+            continue
+        act = cm.table[idx]
+        slot = idx >> 7
+        if act is None or slot >= cm.empty_slot:
+            continue
+        group = out.setdefault(cm.langs[slot // per_lang], {}).setdefault(act.layer, {}).setdefault(str((idx >> 5) & 3), {})
+        b = format(idx & 31, "05b")
+        group[b] = group.get(b, 0) + n
+        if reset:
+            hits[idx] = 0
+    return usage
+
+def usage_counts():
+    """지금까지의 사용 횟수 (USAGE + 현재 매핑 카운터, 복사본). 카운터는 건드리지 않음 — 어느 스레드에서나."""
+    with _cv:                # _swap_map과 엇갈리지 않게 (CMAP, HITS, 경로)를 한 번에
+        usage = json.loads(json.dumps(USAGE))
+        cm, hits, path = CMAP, list(HITS), _hits_path
+    return _fold_hits(usage, cm, hits, path, reset=False)
+
+def load_usage(path=None):
+    """usage.json을 USAGE 기준값으로 (시작 시 1회). 잘못된 파일은 무시."""
+    global USAGE
+    path = path or USAGE_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError:
+        return
+    except ValueError as e:
+        LOG.add(WARN, "USAGE", value=path, extra=f"ignored: {e}")
+        return
+    if isinstance(data, dict):
+        USAGE = data
+
+def save_usage(path=None):
+    """사용 횟수를 usage.json에 저장 (임시 파일 → 교체). 반환: 총 횟수."""
+    path = path or USAGE_PATH
+    usage = usage_counts()
+    total = sum(n for langs in usage.values() for modes in langs.values() for groups in modes.values()
+                for group in groups.values() for n in group.values())
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(usage, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        LOG.add(WARN, "USAGE", value=path, extra=f"save failed: {e}")
+    return total
+
+def _usage_saver():
+    """사용 횟수 주기 저장 (데몬 스레드). 바뀐 것이 없으면 쓰지 않음."""
+    last = None
     while True:
-        now = time.time()
-        if active:
-            if pressing and not pending_chord_seen and (now - last_change_ts) >= DEBOUNCE:
-                pending_bits = bits[:]
-                pending_chord_seen = True
-            if (not pressing) and series_bits is not None and tap_count>0 and series_deadline>0 and now >= series_deadline:
-                emit(series_bits, tap_count)
-                series_bits = None
-                series_deadline = 0.0
-                tap_count = 0
-        time.sleep(0.003)
-
-def main():
+        time.sleep(USAGE_SAVE_INTERVAL)
+        n = sum(HITS)
+        if n != last:
+            save_usage()
+            last = n
+
+def quit_app():
+    """사용 횟수 저장·녹화 파일 정리 후 프로세스 종료."""
+    save_usage()
+    set_recording(False)
+    os._exit(0)
+
+def _mapping_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _dir_waiter(dirpath):
+    """디렉터리 변경 대기 함수 wait(timeout). Windows는 FindFirstChangeNotification, 그 외는 sleep 폴링."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            k32 = ctypes.windll.kernel32
+            k32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+            # FILE_NOTIFY_CHANGE_LAST_WRITE | FILE_NOTIFY_CHANGE_SIZE | FILE_NOTIFY_CHANGE_FILE_NAME(저장 시 rename하는 편집기)
+            h = k32.FindFirstChangeNotificationW(dirpath, False, 0x10 | 0x08 | 0x01)
+            if h and h != ctypes.c_void_p(-1).value:
+                h = ctypes.c_void_p(h)
+                def wait(timeout):
+                    if k32.WaitForSingleObject(h, 0xFFFFFFFF) == 0:   # INFINITE, WAIT_OBJECT_0
+                        k32.FindNextChangeNotification(h)
+                return wait
+        except Exception:
+            pass
+    return time.sleep
+
+def watch_mapping(path=None):
+    """매핑 파일 감시 루프 (데몬 스레드). 변경이 멈추면(편집기의 나눠 쓰기) reload_mapping()."""
+    path = path or MAPPING_PATH
+    stamp = _mapping_stamp(path)
+    wait = _dir_waiter(os.path.dirname(os.path.abspath(path)))
+    while True:
+        wait(MAPPING_POLL)
+        new = _mapping_stamp(path)
+        if new is None or new == stamp:
+            continue
+        while True:
+            time.sleep(0.1)
+            settled = _mapping_stamp(path)
+            if settled == new:
+                break
+            new = settled
+        stamp = new
+        if new is not None:
+            reload_mapping(path)
+
+# ── 시작 시간 보고 ─────────────────────────────────────────────
+def _process_uptime():
+    """이 프로세스 생성 후 경과 시간(초). Windows 외에는 None."""
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+        k32 = ctypes.windll.kernel32
+        k32.GetCurrentProcess.restype = wintypes.HANDLE
+        ft = [wintypes.FILETIME() for _ in range(5)]
+        if not k32.GetProcessTimes(k32.GetCurrentProcess(), *(ctypes.byref(x) for x in ft[:4])):
+            return None
+        k32.GetSystemTimePreciseAsFileTime(ctypes.byref(ft[4]))
+        to100ns = lambda x: (x.dwHighDateTime << 32) | x.dwLowDateTime
+        return (to100ns(ft[4]) - to100ns(ft[0])) / 1e7
+    except Exception:
+        return None
+
+def startup_report(stages=None):
+    """시작 단계별 소요 시간 한 줄 요약을 출력하고 USER_DIR/startup.log에 추가. stages: 추가할 {단계: ms}."""
+    if stages:
+        STARTUP.update(stages)
+    src = "json" if MAPPING_SOURCE == "json" else "cache"
+    parts = [f"{k} {v:.1f}" + (f" ({src})" if k == "mapping" else "") for k, v in STARTUP.items()]
+    up = _process_uptime()
+    if up is not None:
+        parts.append(f"since process start {up * 1e3:.0f}")
+    line = "[STARTUP] " + " | ".join(parts) + " ms"
+    print(line)
+    try:
+        os.makedirs(USER_DIR, exist_ok=True)
+        with open(os.path.join(USER_DIR, "startup.log"), "a", encoding="utf-8") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S ") + line + "\n")
+    except OSError:
+        pass
+    return line
+
+def use_io(kb=None, clock_fn=None):
+    """입출력 백엔드(keyboard 모듈 호환 객체)와 시계 교체. None이면 그대로 둠. 새 백엔드에 전역 훅 설치."""
+    global keyboard, clock
+    if kb is not None:
+        _remove_hook()
+        keyboard = kb
+        _install_hook()
+    if clock_fn is not None:
+        clock = clock_fn
+
+def main(report=True):
+    """report=False: 시작 보고는 호출자(UI)가 첫 화면 표시 후에."""
+    if keyboard is None:
+        raise RuntimeError("python-keyboard 모듈이 필요합니다 (py -3 -m pip install keyboard)")
+    t = time.perf_counter()
+    _install_hook()
+    STARTUP["hook install"] = (time.perf_counter() - t) * 1e3
     keyboard.add_hotkey("ctrl+alt+m", lambda: set_active(not active))
     keyboard.add_hotkey("ctrl+alt+l", toggle_lang)
     keyboard.add_hotkey("ctrl+alt+h", toggle_hand)
     keyboard.add_hotkey("ctrl+alt+left", lambda: set_hand('LEFT'))
     keyboard.add_hotkey("ctrl+alt+right", lambda: set_hand('RIGHT'))
-    keyboard.add_hotkey("ctrl+alt+q", lambda: os._exit(0))
+    keyboard.add_hotkey("ctrl+alt+q", quit_app)
 
+    LOG.start(LOG_PATH, LOG_MAX_BYTES, LOG_BACKUPS)
+    load_usage()
     threading.Thread(target=worker, daemon=True).start()
+    threading.Thread(target=injector, daemon=True).start()
+    if MAPPING_WATCH:
+        threading.Thread(target=watch_mapping, daemon=True).start()
+    threading.Thread(target=_usage_saver, daemon=True).start()
+    threading.Thread(target=load_macros_file, daemon=True).start()
+    if RECORD:
+        threading.Thread(target=set_recording, args=(True,), daemon=True).start()
 
     print("Ready.")
     print(f" - Chord keys (RIGHT): {RIGHT_CHORD_KEYS}")
@@ -295,6 +1464,9 @@ def main():
     print(" - Toggle language   : Ctrl+Alt+L")
     print(" - Toggle hand       : Ctrl+Alt+H (or Ctrl+Alt+←/→)")
     print(" - Quit              : Ctrl+Alt+Q")
+    if report:
+        startup_report()
+    print(f" - Mapping           : {MAPPING_PATH} (저장하면 자동 리로드)" if MAPPING_WATCH else f" - Mapping           : {MAPPING_PATH}")
     keyboard.wait()
 
 if __name__ == "__main__":